@@ -1,11 +1,32 @@
 import streamlit as st
 import requests
 import pandas as pd
+import numpy as np
 import json
 import os
-from datetime import datetime
-from io import BytesIO
+import re
+import sqlite3
+import time
+import hashlib
+import math
+import threading
+import shutil
+import uuid
+import tempfile
+import weakref
+import atexit
+from contextlib import closing, contextmanager
+from collections import Counter, OrderedDict, defaultdict, deque, namedtuple
+from functools import lru_cache, wraps
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
+from packaging.version import Version
+from ats_fetch import (ENRICH_WORKERS, PageCache, PageFetcher, board_slugs, board_url, enrichment_source, parse_board,
+                       parse_greenhouse_job, parse_job_posting_html, parse_lever_posting, probe_boards)
+try:
+    import results_archive  # docs/results_archive.py; needs pyarrow
+except ImportError:
+    results_archive = None
 
 load_dotenv()
 
@@ -21,13 +42,144 @@ API_KEY = os.getenv("GOOGLE_API_KEY") or get_secret("GOOGLE_API_KEY")
 SEARCH_ENGINE_ID = os.getenv("GOOGLE_CX") or get_secret("GOOGLE_CX")
 QUOTA_FILE = "quota_usage.json"
 HISTORY_FILE = "search_history.json"
+SEARCH_JOURNAL_DB = "search_journal.db"
+PAGE_CACHE_DB = "page_cache.db"
+ATS_BOARDS_DB = "ats_boards.db"
+JOBS_DB = "background_jobs.db"
+HIRING_TRENDS_DB = "hiring_trends.db"
+PEOPLE_DB = "people.db"
+COMPANY_INDEX_DB = "companies.db"
 SAVED_SEARCHES_FILE = "saved_searches.json"
+TENANT_STORE_DB = "tenant_store.db"
+RESPONSE_CACHE_DB = "search_responses.db"
+RESULTS_ARCHIVE_DIR = "results_archive"
 DAILY_LIMIT = 100
+RESULT_CACHE_MAX_BYTES = 64 * 1024 * 1024  # resident per browser session
+RESULT_CACHE_GLOBAL_MAX_BYTES = 512 * 1024 * 1024  # resident across all sessions
+RESULT_SPILL_DIR = "result_spill"
+RESULT_SPILL_MAX_BYTES = 256 * 1024 * 1024  # on disk per browser session
 
 if not API_KEY or not SEARCH_ENGINE_ID:
     st.error("Missing Google Custom Search credentials. Set GOOGLE_API_KEY and GOOGLE_CX via environment variables or Streamlit secrets.")
     st.stop()
 
+# --- PROFILING ---
+# Opt-in developer mode: ATS_PROFILE=1 (or ?profile=1) times the hot paths and page sections
+# and shows a per-rerun breakdown at the bottom of the page. ATS_PROFILE=dump (or ?profile=dump)
+# also writes a whole-rerun pyinstrument (or cProfile, if pyinstrument isn't installed) dump.
+PROFILE_DIR = "profiles"
+PROFILE_MODE = (os.getenv("ATS_PROFILE") or st.query_params.get("profile") or "").lower()
+PROFILING = PROFILE_MODE not in ("", "0", "off", "false")
+# Module globals are rebuilt on every rerun, so these only ever hold the current rerun
+PROFILE_STARTED = time.perf_counter()
+PROFILE_SPANS = []
+PROFILE_LAST_MARK = [PROFILE_STARTED]
+# Background workers keep the globals of the rerun that started them, so only this rerun's
+# own thread records spans (nothing would ever render or clear what the workers appended)
+PROFILE_THREAD = threading.current_thread()
+
+@contextmanager
+def profile_span(name):
+    """Time a block into this rerun's breakdown (no-op unless profiling, or off the rerun's thread)."""
+    if not PROFILING or threading.current_thread() is not PROFILE_THREAD:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        PROFILE_SPANS.append((name, time.perf_counter() - started))
+
+def profiled(name):
+    """Decorator form of profile_span."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not PROFILING:
+                return func(*args, **kwargs)
+            with profile_span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def profile_mark(section):
+    """Close the page section that just ran (including its Streamlit rendering) as a span."""
+    if PROFILING:
+        now = time.perf_counter()
+        PROFILE_SPANS.append((f"section: {section}", now - PROFILE_LAST_MARK[0]))
+        PROFILE_LAST_MARK[0] = now
+
+def start_profiler():
+    """Start a whole-rerun profiler: pyinstrument if installed, else cProfile.
+    
+    Returns None when another session's rerun is being profiled: on Python 3.12+ cProfile
+    refuses to enable while another profiler is active.
+    """
+    try:
+        from pyinstrument import Profiler
+        profiler = Profiler()
+        profiler.start()
+    except ImportError:
+        import cProfile
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            return None  # another session's rerun is being profiled
+    st.session_state["rerun_profiler"] = profiler
+    return profiler
+
+def dump_profiler(profiler, suffix=""):
+    """Stop the rerun profiler and write its dump (.html flame view or .prof for snakeviz). Returns the path."""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stem = os.path.join(PROFILE_DIR, f"rerun_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}")
+    if suffix:
+        stem = f"{stem}_{suffix}"
+    if hasattr(profiler, "output_html"):
+        profiler.stop()
+        with open(f"{stem}.html", "w") as f:
+            f.write(profiler.output_html())
+        return f"{stem}.html"
+    profiler.disable()
+    profiler.dump_stats(f"{stem}.prof")
+    return f"{stem}.prof"
+
+def render_profile():
+    """Per-rerun span breakdown, shown at the bottom of the page when profiling."""
+    if not PROFILING:
+        return
+    profile_mark("rest of page")
+    total = time.perf_counter() - PROFILE_STARTED
+    dump_path = dump_profiler(st.session_state.pop("rerun_profiler")) if PROFILER else None
+    
+    spans = pd.DataFrame(PROFILE_SPANS, columns=["Span", "Seconds"])
+    breakdown = spans.groupby("Span")["Seconds"].agg(["count", "sum", "max"]).reset_index()
+    breakdown.columns = ["Span", "Calls", "Total (ms)", "Max (ms)"]
+    breakdown[["Total (ms)", "Max (ms)"]] = (breakdown[["Total (ms)", "Max (ms)"]] * 1000).round(1)
+    breakdown["% of Rerun"] = (breakdown["Total (ms)"] / (total * 1000) * 100).round(1)
+    
+    with st.expander(f"⏱️ Profile: this rerun took {total * 1000:.0f} ms"):
+        st.dataframe(breakdown.sort_values("Total (ms)", ascending=False), use_container_width=True, hide_index=True)
+        st.caption("Sections add up to the whole rerun and include the spans that ran inside them.")
+        mb = lambda n: f"{n / 1024 / 1024:.1f} MB"
+        process, session = result_governor().stats(), result_governor().stats(result_cache())
+        st.caption(
+            f"Result cache: this session holds {mb(session['resident_bytes'])} in memory and {mb(session['spilled_bytes'])} "
+            f"on disk; {process['sessions']} sessions hold {mb(process['resident_bytes'])} in memory and "
+            f"{mb(process['spilled_bytes'])} on disk ({process.get('spilled', 0)} spills, "
+            f"{process.get('reloaded', 0)} reloads, {process.get('dropped', 0)} dropped)."
+        )
+        if dump_path:
+            st.caption(f"Profiler dump written to `{dump_path}`")
+        elif PROFILE_MODE == "dump":
+            st.caption("No profiler dump for this rerun: another session was being profiled.")
+
+# The rerun profiler lives in session state until render_profile dumps it. A rerun cut short
+# by st.rerun() or a widget interrupt never gets there, so stop and dump its profiler here
+if "rerun_profiler" in st.session_state:
+    dump_profiler(st.session_state.pop("rerun_profiler"), "interrupted")
+PROFILER = start_profiler() if PROFILE_MODE == "dump" else None
+
 # --- JOB FIELDS / CATEGORIES ---
 JOB_FIELDS = {
     "🔐 Cybersecurity": {
@@ -125,6 +277,16 @@ JOB_FIELDS = {
     }
 }
 
+# --- EXPERIENCE LEVELS ---
+EXPERIENCE_MAP = {
+    "Any": None,
+    "Entry Level": '("entry level" OR "junior" OR "associate" OR "new grad")',
+    "Mid Level": '("mid level" OR "2-5 years" OR "3+ years")',
+    "Senior": '("senior" OR "sr." OR "5+ years")',
+    "Lead": '("lead" OR "principal" OR "staff")',
+    "Manager": '("manager" OR "director")'
+}
+
 # --- EXPANDED ATS SITES ---
 ATS_SITES = {
     "All Platforms (ATS + LinkedIn)": [
@@ -152,95 +314,541 @@ ATS_SITES = {
     "Workday Only": ["site:myworkdayjobs.com"],
 }
 
+# --- TENANTS ---
+# On a shared deployment every signed-in user gets their own quota counter, search history,
+# saved searches and background jobs. Without Streamlit auth everyone is the default tenant,
+# which is also where the legacy JSON files are imported.
+DEFAULT_TENANT = "default"
+TENANT_CONTEXT = threading.local()  # background workers run jobs on behalf of their submitter
+
+def current_tenant():
+    """Tenant id for this session: the signed-in user's email, else the shared default tenant."""
+    tenant = getattr(TENANT_CONTEXT, "tenant", None)
+    if tenant:
+        return tenant
+    try:
+        if st.user.is_logged_in:
+            return (st.user.email or DEFAULT_TENANT).lower()
+    except Exception:
+        pass
+    return DEFAULT_TENANT
+
+TENANT_STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS quota_usage (
+    tenant TEXT NOT NULL,
+    day TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (tenant, day)
+);
+CREATE INDEX IF NOT EXISTS idx_quota_day ON quota_usage (day);
+CREATE TABLE IF NOT EXISTS saved_searches (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tenant TEXT NOT NULL,
+    name TEXT NOT NULL,
+    type TEXT,
+    result_count INTEGER,
+    results TEXT NOT NULL,
+    created TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_saved_searches_tenant ON saved_searches (tenant, id);
+"""
+
+def tenant_store_connection():
+    """Open the shared tenant store, importing the legacy quota and saved-search files on first use."""
+    is_new = not os.path.exists(TENANT_STORE_DB)
+    conn = sqlite3.connect(TENANT_STORE_DB, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(TENANT_STORE_SCHEMA)
+    if is_new:
+        with conn:
+            if os.path.exists(QUOTA_FILE):
+                with open(QUOTA_FILE, "r") as f:
+                    try:
+                        legacy = json.load(f)
+                        conn.execute("INSERT INTO quota_usage (tenant, day, count) VALUES (?, ?, ?)",
+                                     (DEFAULT_TENANT, legacy["date"], legacy["count"]))
+                    except:
+                        pass
+            if os.path.exists(SAVED_SEARCHES_FILE):
+                with open(SAVED_SEARCHES_FILE, "r") as f:
+                    try:
+                        legacy = json.load(f)
+                    except:
+                        legacy = []
+                conn.executemany(
+                    "INSERT INTO saved_searches (tenant, name, type, result_count, results, created) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(DEFAULT_TENANT, s.get("name", ""), s.get("type", ""), len(s.get("results", [])),
+                      json.dumps(s.get("results", [])), s.get("created", "")) for s in legacy]
+                )
+    return conn
+
 # --- QUOTA MANAGEMENT ---
+# DAILY_LIMIT is the API key's budget shared by every tenant; TENANT_DAILY_LIMIT caps what
+# one tenant may spend of it (defaults to the whole budget).
+TENANT_DAILY_LIMIT = int(os.getenv("ATS_TENANT_DAILY_LIMIT") or DAILY_LIMIT)
+
+def quota_budgets(tenant=None):
+    """(tenant searches left, global searches left, tenant searches used) for today."""
+    today_str = datetime.now().strftime("%Y-%m-%d")
+    tenant = tenant or current_tenant()
+    with closing(tenant_store_connection()) as conn:
+        row = conn.execute(
+            "SELECT COALESCE(SUM(count), 0) AS total, COALESCE(SUM(CASE WHEN tenant = ? THEN count END), 0) AS mine "
+            "FROM quota_usage WHERE day = ?", (tenant, today_str)
+        ).fetchone()
+    return max(0, TENANT_DAILY_LIMIT - row["mine"]), max(0, DAILY_LIMIT - row["total"]), row["mine"]
+
+@profiled("io: quota")
 def get_quota_status():
     """Checks how many searches are left for today."""
-    today_str = datetime.now().strftime("%Y-%m-%d")
-    
-    if not os.path.exists(QUOTA_FILE):
-        return DAILY_LIMIT, 0
-        
-    with open(QUOTA_FILE, "r") as f:
-        try:
-            data = json.load(f)
-            if data["date"] == today_str:
-                used = data["count"]
-                remaining = max(0, DAILY_LIMIT - used)
-                return remaining, used
-            else:
-                return DAILY_LIMIT, 0
-        except:
-            return DAILY_LIMIT, 0
+    tenant_left, global_left, used = quota_budgets()
+    return min(tenant_left, global_left), used
 
+@profiled("io: quota")
 def increment_quota():
     """Increments the search counter by 1."""
     today_str = datetime.now().strftime("%Y-%m-%d")
-    _, used = get_quota_status()
-    
-    new_data = {"date": today_str, "count": used + 1}
-    with open(QUOTA_FILE, "w") as f:
-        json.dump(new_data, f)
-
-# --- SEARCH HISTORY ---
-def load_search_history():
-    """Load search history from file."""
-    if not os.path.exists(HISTORY_FILE):
-        return []
-    with open(HISTORY_FILE, "r") as f:
-        try:
-            return json.load(f)
-        except:
-            return []
-
-def save_search_history(query, mode, results_count):
-    """Save a search to history."""
-    history = load_search_history()
-    history.insert(0, {
-        "query": query,
-        "mode": mode,
-        "results": results_count,
-        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M")
-    })
-    # Keep only last 20 searches
-    history = history[:20]
-    with open(HISTORY_FILE, "w") as f:
-        json.dump(history, f)
+    with closing(tenant_store_connection()) as conn, conn:
+        conn.execute(
+            "INSERT INTO quota_usage (tenant, day, count) VALUES (?, ?, 1) "
+            "ON CONFLICT (tenant, day) DO UPDATE SET count = count + 1",
+            (current_tenant(), today_str)
+        )
+
+# --- SEARCH JOURNAL ---
+# Append-only record of every search. Each insert is O(1); the legacy
+# search_history.json (last 20 searches) is imported once, for the default tenant,
+# when the journal is created.
+JOURNAL_SCHEMA = """
+CREATE TABLE IF NOT EXISTS searches (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tenant TEXT NOT NULL DEFAULT 'default',
+    timestamp TEXT NOT NULL,
+    query TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    template TEXT,
+    pages INTEGER,
+    quota INTEGER,
+    latency_ms REAL,
+    raw_count INTEGER,
+    unique_count INTEGER,
+    new_count INTEGER
+);
+CREATE TABLE IF NOT EXISTS search_results (
+    search_id INTEGER NOT NULL,
+    url_key TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_searches_tenant_query ON searches (tenant, query, id);
+CREATE INDEX IF NOT EXISTS idx_searches_tenant_template ON searches (tenant, template);
+CREATE INDEX IF NOT EXISTS idx_search_results_search ON search_results (search_id);
+"""
+
+def result_url_key(item):
+    """Short stable key for a result's URL, ignoring its query string and any trailing slash."""
+    base_url = item.get('link', '').split('?')[0].rstrip('/')
+    return hashlib.sha1(base_url.encode('utf-8')).hexdigest()[:16]
+
+def journal_connection():
+    """Open the search journal, creating it (and importing legacy history) on first use."""
+    is_new = not os.path.exists(SEARCH_JOURNAL_DB)
+    conn = sqlite3.connect(SEARCH_JOURNAL_DB)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(JOURNAL_SCHEMA)
+    if is_new and os.path.exists(HISTORY_FILE):
+        with open(HISTORY_FILE, "r") as f:
+            try:
+                legacy = json.load(f)
+            except:
+                legacy = []
+        with conn:
+            for entry in reversed(legacy):
+                conn.execute(
+                    "INSERT INTO searches (timestamp, query, mode, unique_count) VALUES (?, ?, ?, ?)",
+                    (entry.get("timestamp", ""), entry.get("query", ""), entry.get("mode", ""), entry.get("results"))
+                )
+    return conn
+
+@profiled("io: search journal")
+def record_search(query, mode, results, raw_count=None, pages=1, quota=None, latency=None, template=None, archive=True):
+    """Append a search to the journal. `results` are the deduplicated result items.
+    
+    They're archived too unless `archive` is False (callers that enrich first archive later).
+    """
+    url_keys = {result_url_key(item) for item in results}
+    tenant = current_tenant()
+    with closing(journal_connection()) as conn, conn:
+        previous = conn.execute(
+            "SELECT id FROM searches WHERE tenant = ? AND query = ? ORDER BY id DESC LIMIT 1", (tenant, query)
+        ).fetchone()
+        if previous:
+            seen = {row["url_key"] for row in conn.execute(
+                "SELECT url_key FROM search_results WHERE search_id = ?", (previous["id"],)
+            )}
+            new_count = len(url_keys - seen)
+        else:
+            new_count = len(url_keys)
+        cursor = conn.execute(
+            """INSERT INTO searches (tenant, timestamp, query, mode, template, pages, quota, latency_ms,
+                                     raw_count, unique_count, new_count)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (tenant, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), query, mode, template, pages,
+             quota if quota is not None else pages,
+             round(latency * 1000, 1) if latency is not None else None,
+             raw_count if raw_count is not None else len(results), len(results), new_count)
+        )
+        conn.executemany(
+            "INSERT INTO search_results (search_id, url_key) VALUES (?, ?)",
+            [(cursor.lastrowid, key) for key in url_keys]
+        )
+    if archive:
+        archive_results(results, mode, query, template)
+    return new_count
+
+@profiled("io: search journal")
+def load_search_history(limit=20):
+    """Load the most recent searches from the journal."""
+    with closing(journal_connection()) as conn:
+        rows = conn.execute(
+            "SELECT timestamp, query, mode, unique_count AS results FROM searches WHERE tenant = ? ORDER BY id DESC LIMIT ?",
+            (current_tenant(), limit)
+        ).fetchall()
+    return [dict(row) for row in rows]
 
 def clear_search_history():
-    """Clear all search history."""
-    if os.path.exists(HISTORY_FILE):
+    """Clear the current tenant's search history."""
+    tenant = current_tenant()
+    with closing(journal_connection()) as conn, conn:
+        conn.execute("DELETE FROM search_results WHERE search_id IN (SELECT id FROM searches WHERE tenant = ?)", (tenant,))
+        conn.execute("DELETE FROM searches WHERE tenant = ?", (tenant,))
+    if tenant == DEFAULT_TENANT and os.path.exists(HISTORY_FILE):
         os.remove(HISTORY_FILE)
 
+@profiled("io: search journal")
+def query_yield_stats(group_by="query"):
+    """Rank queries (or templates) by unique and new results per quota unit spent."""
+    column = "template" if group_by == "template" else "query"
+    with closing(journal_connection()) as conn:
+        rows = conn.execute(f"""
+            SELECT {column} AS name, MIN(mode) AS mode, COUNT(*) AS runs,
+                   SUM(COALESCE(quota, 0)) AS quota,
+                   SUM(COALESCE(unique_count, 0)) AS unique_results,
+                   SUM(COALESCE(new_count, 0)) AS new_results,
+                   AVG(latency_ms) AS avg_latency_ms,
+                   MAX(timestamp) AS last_run
+            FROM searches
+            WHERE tenant = ? AND {column} IS NOT NULL AND quota IS NOT NULL
+            GROUP BY {column}
+        """, (current_tenant(),)).fetchall()
+    stats = []
+    for row in rows:
+        row = dict(row)
+        units = max(row["quota"], 1)
+        row["unique_per_unit"] = round(row["unique_results"] / units, 2)
+        row["new_per_unit"] = round(row["new_results"] / units, 2)
+        stats.append(row)
+    return sorted(stats, key=lambda r: (r["unique_per_unit"], r["new_per_unit"]), reverse=True)
+
+# --- PEOPLE STORE ---
+# Every linkedin.com/in/ result is merged into one entity per canonical profile slug, so the
+# same person found by Company, Alumni and Recruiter searches is one row with a headline
+# history. People are indexed by company, school and role for instant lookups, and a hit
+# whose title and snippet haven't changed only bumps last_seen.
+PEOPLE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS people (
+    tenant TEXT NOT NULL,
+    slug TEXT NOT NULL,
+    name TEXT,
+    headline TEXT,
+    company TEXT,
+    school TEXT,
+    role TEXT,
+    location TEXT,
+    source_hash TEXT,
+    first_seen TEXT,
+    last_seen TEXT,
+    seen_count INTEGER DEFAULT 0,
+    PRIMARY KEY (tenant, slug)
+);
+CREATE TABLE IF NOT EXISTS people_headlines (
+    tenant TEXT NOT NULL,
+    slug TEXT NOT NULL,
+    headline TEXT NOT NULL,
+    first_seen TEXT,
+    last_seen TEXT,
+    PRIMARY KEY (tenant, slug, headline)
+);
+CREATE TABLE IF NOT EXISTS people_index (
+    tenant TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    value_key TEXT NOT NULL,
+    slug TEXT NOT NULL,
+    PRIMARY KEY (tenant, kind, value_key, slug)
+);
+CREATE INDEX IF NOT EXISTS idx_people_last_seen ON people (tenant, last_seen);
+CREATE INDEX IF NOT EXISTS idx_people_index_slug ON people_index (tenant, slug);
+"""
+LINKEDIN_PROFILE_RE = re.compile(r'linkedin\.com/in/([^/?#\s]+)', re.IGNORECASE)
+PROFILE_TITLE_SUFFIX_RE = re.compile(r'\s*[|\-–]\s*LinkedIn\s*$', re.IGNORECASE)
+PROFILE_EXPERIENCE_RE = re.compile(r'\bExperience:\s*([^·|\n]+?)\s*(?:·|\||$)')
+PROFILE_EDUCATION_RE = re.compile(r'\bEducation:\s*([^·|\n]+?)\s*(?:·|\||$)')
+# Title segments are separated by " - ", " – " or "|" (a bare hyphen is part of a name: Jean-Luc)
+PROFILE_SEPARATOR_RE = re.compile(r'\s*\|\s*|\s+[-–]\s+')
+# "Austin, Texas", "London, England, United Kingdom", "Greater Boston Area"
+PROFILE_LOCATION_RE = re.compile(r'^[A-Z][^,]*(?:,\s*[A-Z][^,]*){1,2}$|\b(?:Area|Metroplex|Metropolitan)$')
+PEOPLE_INDEX_KINDS = ("company", "school", "role")
+
+def profile_slug(link):
+    """Canonical LinkedIn profile slug: same for uk.linkedin.com/in/Jane-Doe/de and www.linkedin.com/in/jane-doe."""
+    match = LINKEDIN_PROFILE_RE.search(link or '')
+    return requests.utils.unquote(match.group(1)).strip().lower() if match else None
+
+def people_index_key(kind, value):
+    """Lookup key for the people index (companies by canonical company id)."""
+    if kind == "company":
+        return company_index().resolve(value, "title") if (value or '').strip() else ""
+    return " ".join((value or '').lower().split())
+
+def people_connection():
+    conn = sqlite3.connect(PEOPLE_DB, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(PEOPLE_SCHEMA)
+    return conn
+
+def parse_profile(item, hints=None):
+    """Name, headline, company, school, role and location from a LinkedIn profile result.
+    
+    `hints` ({"company": [...], "school": [...]}) are what the search asked for; one is only
+    used when the result's own text doesn't name a company/school but does mention the hint.
+    """
+    title = PROFILE_TITLE_SUFFIX_RE.sub('', item.get('title', ''))
+    snippet = item.get('snippet', '')
+    parts = [p.strip() for p in PROFILE_SEPARATOR_RE.split(title) if p.strip()]
+    # "Name - Role - City, State": the last segment is where they are, not who they work for
+    location = ""
+    if len(parts) >= 3 and PROFILE_LOCATION_RE.search(parts[-1]) and not COMPANY_SUFFIX_RE.search(parts[-1]):
+        location = parts.pop()
+    name = parts[0] if parts else ""
+    headline = " - ".join(parts[1:])
+    
+    company = parts[-1] if len(parts) >= 3 else ""
+    if not company:
+        for separator in (" at ", " @ "):
+            if separator in headline:
+                company = headline.split(separator)[-1].strip()
+                break
+    experience = PROFILE_EXPERIENCE_RE.search(snippet)
+    company = company or (experience.group(1).strip() if experience else "")
+    education = PROFILE_EDUCATION_RE.search(snippet)
+    school = education.group(1).strip() if education else ""
+    
+    text, hints = f"{title} {snippet}".lower(), hints or {}
+    company = company or next((h for h in hints.get("company", []) if h and h.lower() in text), "")
+    school = school or next((h for h in hints.get("school", []) if h and h.lower() in text), "")
+    
+    role = (parts[1] if len(parts) >= 3 else headline.split(" at ")[0].split(" @ ")[0]).strip()
+    return {
+        "name": name, "headline": headline, "company": company, "school": school, "role": role,
+        "location": item.get('extracted', {}).get('location', '') or location
+    }
+
+@profiled("io: people store")
+def record_people(results, hints=None, now=None):
+    """Merge LinkedIn profile results into the current tenant's people store. Returns (new, updated, unchanged)."""
+    now = (now or datetime.now()).strftime("%Y-%m-%d %H:%M:%S")
+    tenant = current_tenant()
+    profiles = {}
+    for item in results:
+        slug = profile_slug(item.get('link'))
+        if slug:
+            profiles[slug] = item
+    if not profiles:
+        return 0, 0, 0
+    
+    counts = Counter()
+    with closing(people_connection()) as conn, conn:
+        known = {}
+        slugs = list(profiles)
+        for offset in range(0, len(slugs), 500):  # stay under SQLite's bound-parameter limit
+            chunk = slugs[offset:offset + 500]
+            known.update({row["slug"]: row["source_hash"] for row in conn.execute(
+                f"SELECT slug, source_hash FROM people WHERE tenant = ? AND slug IN ({','.join('?' * len(chunk))})",
+                [tenant, *chunk]
+            )})
+        
+        for slug, item in profiles.items():
+            source_hash = hashlib.sha1(f"{item.get('title', '')}\n{item.get('snippet', '')}".encode('utf-8')).hexdigest()[:16]
+            if known.get(slug) == source_hash:
+                # Seen exactly like this before: nothing to re-parse or re-index
+                conn.execute("UPDATE people SET last_seen = ?, seen_count = seen_count + 1 WHERE tenant = ? AND slug = ?",
+                             (now, tenant, slug))
+                counts["unchanged"] += 1
+                continue
+            
+            person = parse_profile(item, hints)
+            # Keep what an earlier, richer result said when this one leaves a field blank
+            conn.execute(
+                """INSERT INTO people (tenant, slug, name, headline, company, school, role, location,
+                                       source_hash, first_seen, last_seen, seen_count)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
+                   ON CONFLICT (tenant, slug) DO UPDATE SET
+                       name = COALESCE(NULLIF(excluded.name, ''), name),
+                       headline = COALESCE(NULLIF(excluded.headline, ''), headline),
+                       company = COALESCE(NULLIF(excluded.company, ''), company),
+                       school = COALESCE(NULLIF(excluded.school, ''), school),
+                       role = COALESCE(NULLIF(excluded.role, ''), role),
+                       location = COALESCE(NULLIF(excluded.location, ''), location),
+                       source_hash = excluded.source_hash,
+                       last_seen = excluded.last_seen,
+                       seen_count = seen_count + 1""",
+                (tenant, slug, person["name"], person["headline"], person["company"], person["school"],
+                 person["role"], person["location"], source_hash, now, now)
+            )
+            if person["headline"]:
+                conn.execute(
+                    """INSERT INTO people_headlines (tenant, slug, headline, first_seen, last_seen) VALUES (?, ?, ?, ?, ?)
+                       ON CONFLICT (tenant, slug, headline) DO UPDATE SET last_seen = excluded.last_seen""",
+                    (tenant, slug, person["headline"], now, now)
+                )
+            
+            merged = conn.execute("SELECT company, school, role FROM people WHERE tenant = ? AND slug = ?", (tenant, slug)).fetchone()
+            conn.execute("DELETE FROM people_index WHERE tenant = ? AND slug = ?", (tenant, slug))
+            conn.executemany(
+                "INSERT OR IGNORE INTO people_index (tenant, kind, value_key, slug) VALUES (?, ?, ?, ?)",
+                [(tenant, kind, people_index_key(kind, merged[kind]), slug) for kind in PEOPLE_INDEX_KINDS
+                 if people_index_key(kind, merged[kind])]
+            )
+            counts["updated" if slug in known else "new"] += 1
+    return counts["new"], counts["updated"], counts["unchanged"]
+
+@profiled("io: people store")
+def find_people(company=None, school=None, role=None, limit=500):
+    """People matching every given filter (prefix match on the index keys), most recently seen first."""
+    tenant = current_tenant()
+    joins, params = [], []
+    for kind, value in (("company", company), ("school", school), ("role", role)):
+        if kind == "company":  # "PANW" finds Palo Alto Networks; an unknown prefix like "palo" still works
+            key = (company_index().lookup(value) or normalize_company_key(value)) if (value or '').strip() else ""
+        else:
+            key = people_index_key(kind, value)
+        if key:
+            alias = f"i_{kind}"
+            joins.append(f"JOIN people_index {alias} ON {alias}.tenant = p.tenant AND {alias}.slug = p.slug "
+                         f"AND {alias}.kind = '{kind}' AND {alias}.value_key >= ? AND {alias}.value_key < ?")
+            params += [key, key + "\uffff"]
+    with closing(people_connection()) as conn:
+        rows = conn.execute(
+            f"""SELECT DISTINCT p.slug, p.name, p.headline, p.company, p.school, p.role, p.location,
+                       p.first_seen, p.last_seen, p.seen_count,
+                       (SELECT COUNT(*) FROM people_headlines h WHERE h.tenant = p.tenant AND h.slug = p.slug) AS headlines
+                FROM people p {' '.join(joins)}
+                WHERE p.tenant = ?
+                ORDER BY p.last_seen DESC LIMIT ?""",
+            [*params, tenant, limit]
+        ).fetchall()
+    return [dict(row) for row in rows]
+
+def headline_history(slug):
+    """A person's headlines over time, oldest first."""
+    with closing(people_connection()) as conn:
+        rows = conn.execute(
+            "SELECT headline, first_seen, last_seen FROM people_headlines WHERE tenant = ? AND slug = ? ORDER BY first_seen",
+            (current_tenant(), slug)
+        ).fetchall()
+    return [dict(row) for row in rows]
+
+# --- RESULTS ARCHIVE ---
+# Every normalized result is also appended to a date-partitioned Parquet archive
+# (docs/results_archive.py), so past harvests can be analysed with SQL without quota.
+ARCHIVE_EXAMPLE_SQL = """SELECT company, COUNT(DISTINCT url_key) AS postings, MAX(posted_date) AS latest
+FROM results
+WHERE source = 'Lever' AND role ILIKE '%SOC Analyst%'
+  AND date >= current_date - INTERVAL 90 DAY
+GROUP BY company
+ORDER BY postings DESC"""
+
+def as_text(value):
+    return str(value) if value not in (None, "") and not (isinstance(value, float) and math.isnan(value)) else None
+
+def as_float(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(value) else value
+
+def as_date(value):
+    if value in (None, ""):
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if hasattr(value, "year"):
+        return value
+    parsed = pd.to_datetime(str(value), errors="coerce")
+    return None if pd.isna(parsed) else parsed.date()
+
+def archive_record(item, mode, query, template, now):
+    """One result as an archive row (ARCHIVE_SCHEMA in results_archive.py)."""
+    row, fields = batch_row(item), posting_fields(item)
+    return {
+        "archived_at": now, "mode": mode, "query": query, "template": template,
+        "url": item.get('link', ''), "url_key": result_url_key(item),
+        "title": item.get('title', ''), "snippet": item.get('snippet', ''),
+        "company": as_text(row["Company"]), "source": row["Source"],
+        "location": as_text(fields.get("location")), "employment_type": as_text(fields.get("employmentType")),
+        "salary_min": as_float(fields.get("salaryMin")), "salary_max": as_float(fields.get("salaryMax")),
+        "salary_currency": as_text(fields.get("salaryCurrency")), "salary_period": as_text(fields.get("salaryPeriod")),
+        "posted_date": as_date(fields.get("postedDate")), "remote": bool(row["Remote"]),
+        "field": as_text(row["Field"]), "role": as_text(row["Role"]),
+        "seniority": as_text(row["Seniority"]), "skills": as_text(row["Skills"])
+    }
+
+@profiled("io: results archive")
+def archive_results(results, mode, query, template=None):
+    """Append deduplicated results to the current tenant's archive partition for today."""
+    if results_archive is None or not results:
+        return
+    extract_fields([item for item in results if 'extracted' not in item])
+    now = datetime.now().replace(microsecond=0)
+    try:
+        results_archive.append([archive_record(item, mode, query, template, now) for item in results],
+                               current_tenant(), root=RESULTS_ARCHIVE_DIR, now=now)
+    except Exception as e:
+        st.toast(f"⚠️ Results weren't archived: {e}")
+
 # --- SAVED SEARCHES ---
+@profiled("io: saved searches")
 def load_saved_searches():
-    """Load saved searches from file."""
-    if not os.path.exists(SAVED_SEARCHES_FILE):
-        return []
-    with open(SAVED_SEARCHES_FILE, "r") as f:
-        try:
-            return json.load(f)
-        except:
-            return []
+    """List the current tenant's saved searches (without their results)."""
+    with closing(tenant_store_connection()) as conn:
+        rows = conn.execute(
+            "SELECT id, name, type, result_count, created FROM saved_searches WHERE tenant = ? ORDER BY id",
+            (current_tenant(),)
+        ).fetchall()
+    return [dict(row) for row in rows]
+
+@profiled("io: saved searches")
+def load_saved_results(search_id):
+    """Results of one of the current tenant's saved searches."""
+    with closing(tenant_store_connection()) as conn:
+        row = conn.execute("SELECT results FROM saved_searches WHERE id = ? AND tenant = ?",
+                           (search_id, current_tenant())).fetchone()
+    return json.loads(row["results"]) if row else []
 
+@profiled("io: saved searches")
 def save_search(name, search_type, results):
     """Save a search with its results."""
-    searches = load_saved_searches()
-    searches.append({
-        "name": name,
-        "type": search_type,
-        "results": results,
-        "created": datetime.now().strftime("%Y-%m-%d %H:%M")
-    })
-    with open(SAVED_SEARCHES_FILE, "w") as f:
-        json.dump(searches, f)
-
-def delete_saved_search(index):
-    """Delete a saved search by index."""
-    searches = load_saved_searches()
-    if 0 <= index < len(searches):
-        searches.pop(index)
-        with open(SAVED_SEARCHES_FILE, "w") as f:
-            json.dump(searches, f)
+    with closing(tenant_store_connection()) as conn, conn:
+        conn.execute(
+            "INSERT INTO saved_searches (tenant, name, type, result_count, results, created) VALUES (?, ?, ?, ?, ?, ?)",
+            (current_tenant(), name, search_type, len(results), json.dumps(results),
+             datetime.now().strftime("%Y-%m-%d %H:%M"))
+        )
+
+@profiled("io: saved searches")
+def delete_saved_search(search_id):
+    """Delete one of the current tenant's saved searches."""
+    with closing(tenant_store_connection()) as conn, conn:
+        conn.execute("DELETE FROM saved_searches WHERE id = ? AND tenant = ?", (search_id, current_tenant()))
 
 # --- SEARCH TEMPLATES ---
 SEARCH_TEMPLATES = {
@@ -331,126 +939,2442 @@ def build_boolean_query(must_include, should_include, must_exclude, exact_phrase
         if terms:
             query_parts.append('(' + ' OR '.join([f'"{t}"' for t in terms]) + ')')
     
-    # Exact phrases
-    if exact_phrases:
-        phrases = [p.strip() for p in exact_phrases.split(',') if p.strip()]
-        if phrases:
-            query_parts.extend([f'"{p}"' for p in phrases])
+    # Exact phrases
+    if exact_phrases:
+        phrases = [p.strip() for p in exact_phrases.split(',') if p.strip()]
+        if phrases:
+            query_parts.extend([f'"{p}"' for p in phrases])
+    
+    # Must exclude (NOT logic)
+    if must_exclude:
+        terms = [t.strip() for t in must_exclude.split(',') if t.strip()]
+        if terms:
+            query_parts.extend([f'-{t}' if ' ' not in t else f'-"{t}"' for t in terms])
+    
+    return ' '.join(query_parts)
+
+# --- QUERY AST ---
+# Queries are assembled by string concatenation all over the app, so the same search can be
+# spelled many ways. parse_query turns a query into a canonical AST: a site OR-group, required
+# terms, OR-groups and exclusions, each as a set of normalized terms ('word', '"a phrase"',
+# 'intitle:x'). Equivalent spellings share a canonical string (and therefore cache entries),
+# and a query that only adds exclusions or drops sites can be answered by filtering a complete
+# cached result set of the broader query locally.
+QUERY_TOKEN_RE = re.compile(r'-?[\w.:/-]*"[^"]*"|\(|\)|[^\s()]+')
+QueryAST = namedtuple("QueryAST", ["sites", "required", "any_of", "excluded"])
+
+def normalize_query_term(term):
+    """Canonical spelling of one term: lowercase and single spaces. Quotes are kept, since Google
+    matches "soc" exactly but stems soc."""
+    prefix, quote, phrase = term.lower().partition('"')
+    if not quote:
+        return prefix.rstrip("/") if prefix.startswith("site:") else prefix
+    phrase = " ".join(phrase.rstrip('"').split())
+    return f'{prefix}"{phrase}"'
+
+@lru_cache(maxsize=1024)
+def parse_query(query):
+    """Parse a query string into a QueryAST, or None if it uses syntax beyond flat AND/OR groups."""
+    units, group, pending_or = [], None, False
+    for token in QUERY_TOKEN_RE.findall(query):
+        if token == "(":
+            if group is not None:
+                return None  # nested groups
+            group = []
+        elif token == ")":
+            if group is None:
+                return None
+            unit, group = [t for t in group if t != "OR"], None
+            if pending_or and units:
+                units[-1] = units[-1] + unit
+            else:
+                units.append(unit)
+            pending_or = False
+        elif group is not None:
+            group.append(token if token == "OR" else normalize_query_term(token))
+        elif token == "OR":
+            pending_or = True
+        elif token != "AND":
+            term = normalize_query_term(token)
+            if pending_or and units:
+                units[-1] = units[-1] + [term]
+            else:
+                units.append([term])
+            pending_or = False
+    if group is not None:
+        return None
+    
+    sites, required, any_of, excluded = None, set(), set(), set()
+    for unit in units:
+        negated = [t for t in unit if t.startswith("-")]
+        if negated:
+            if len(unit) > 1:
+                return None  # exclusions inside an OR group
+            excluded.add(unit[0][1:])
+        elif all(t.startswith("site:") for t in unit) and sites is None:
+            sites = frozenset(t[5:] for t in unit)
+        elif len(set(unit)) == 1:
+            required.add(unit[0])
+        else:
+            any_of.add(frozenset(unit))
+    return QueryAST(sites or frozenset(), frozenset(required), frozenset(any_of), frozenset(excluded))
+
+def canonical_query(query):
+    """Canonical spelling of a query, used as its cache key (whitespace-normalized if it can't be parsed)."""
+    ast = parse_query(query)
+    if ast is None:
+        return " ".join(query.split())
+    parts = []
+    if len(ast.sites) == 1:
+        parts.append(f"site:{next(iter(ast.sites))}")
+    elif ast.sites:
+        parts.append("(" + " OR ".join(f"site:{s}" for s in sorted(ast.sites)) + ")")
+    parts.extend(sorted(ast.required))
+    parts.extend("(" + " OR ".join(sorted(group)) + ")" for group in sorted(ast.any_of, key=sorted))
+    parts.extend(f"-{t}" for t in sorted(ast.excluded))
+    return " ".join(parts)
+
+def query_covers(broad, narrow):
+    """True if every result of `narrow` is also a result of `broad` and can be told apart locally.
+    
+    Only site differences qualify (`site:` and `-site:`), because they are decided by the link
+    alone. Extra required or excluded words may only appear in the page body Google indexed,
+    which cached rows don't have.
+    """
+    if broad is None or narrow is None:
+        return False
+    extra_exclusions = narrow.excluded - broad.excluded
+    return (broad.required == narrow.required and broad.any_of == narrow.any_of
+            and broad.excluded <= narrow.excluded
+            and all(term.startswith("site:") for term in extra_exclusions)
+            and (not broad.sites or (narrow.sites and narrow.sites <= broad.sites)))
+
+def site_matches(link, site):
+    """Would `site:<site>` match this URL (subdomains and path prefixes included)?"""
+    location = re.sub(r'^https?://(www\.)?', '', link.lower())
+    host, _, path = location.partition("/")
+    site_host, _, site_path = site.partition("/")
+    return (host == site_host or host.endswith("." + site_host)) and path.startswith(site_path)
+
+def query_matches_row(ast, row):
+    """Check a cached result row's link against a query's sites and site exclusions."""
+    link = row.get("Link") or row.get("Profile") or ""
+    if ast.sites and not any(site_matches(link, site) for site in ast.sites):
+        return False
+    return not any(site_matches(link, term[5:]) for term in ast.excluded if term.startswith("site:"))
+
+# --- COMPANY ATTRIBUTION ---
+# Known alternate names for companies whose ATS slug or ticker differs from the display name
+COMPANY_ALIASES = {
+    "Palo Alto Networks": ["Palo Alto", "paloaltonetworks", "PANW"],
+    "CrowdStrike": ["crowdstrike", "CRWD"],
+    "Microsoft": ["MSFT"],
+    "Google": ["Alphabet", "GOOGL"],
+    "Amazon": ["Amazon Web Services", "AWS", "AMZN"],
+    "Meta": ["Facebook", "META"],
+    "Zscaler": ["ZS"],
+    "Fortinet": ["FTNT"],
+    "Okta": ["OKTA"]
+}
+COMPANY_SUFFIX_RE = re.compile(r'\b(inc|llc|ltd|corp|corporation|co|company|technologies|group)\.?$', re.IGNORECASE)
+# ATS hosts that put the company slug in the first path segment vs. the subdomain
+ATS_PATH_SLUG_HOSTS = [
+    "boards.greenhouse.io", "job-boards.greenhouse.io", "jobs.lever.co", "jobs.ashbyhq.com",
+    "jobs.smartrecruiters.com", "apply.workable.com", "careers.workable.com", "jobs.jobvite.com"
+]
+ATS_SUBDOMAIN_SLUG_HOSTS = ["myworkdayjobs.com", "breezy.hr", "recruitee.com", "bamboohr.com", "icims.com"]
+
+def normalize_company_key(name):
+    """Lowercase alphanumeric key so 'Palo-Alto Networks' and 'paloaltonetworks' compare equal."""
+    return re.sub(r'[^a-z0-9]', '', (name or '').lower())
+
+def ats_company_slug(link):
+    """Extract the company slug from an ATS posting URL, or '' when the host isn't a known ATS."""
+    parts = (link or '').split('?')[0].split('/')
+    if len(parts) < 3:
+        return ""
+    host = parts[2].lower()
+    if any(host == h or host.endswith('.' + h) for h in ATS_PATH_SLUG_HOSTS):
+        return parts[3] if len(parts) > 3 else ""
+    for h in ATS_SUBDOMAIN_SLUG_HOSTS:
+        if host.endswith('.' + h):
+            return host.split('.')[0]
+    return ""
+
+def company_aliases(company):
+    """All names a company may appear under: input, suffix-stripped form and COMPANY_ALIASES entries."""
+    aliases = {company.strip()}
+    stripped = COMPANY_SUFFIX_RE.sub('', company.strip()).strip(' ,')
+    if stripped:
+        aliases.add(stripped)
+    for canonical, extra in COMPANY_ALIASES.items():
+        names = [canonical] + extra
+        if any(normalize_company_key(n) == normalize_company_key(company) for n in names):
+            aliases.update(names)
+    return aliases
+
+def attribute_result(item, companies):
+    """Attribute a search result to one of `companies` by ATS slug, then title/snippet mentions."""
+    slug = ats_company_slug(item.get('link', ''))
+    if slug:  # one alias-index probe: the slug and the searched name resolve to the same company id
+        wanted = {canonical_company_key(company): company for company in companies}
+        slug_company = wanted.get(company_index().lookup(slug))
+        if slug_company:
+            return slug_company
+    slug_key = normalize_company_key(slug)
+    text = f"{item.get('title', '')} {item.get('snippet', '')}".lower()
+    prefix_match = None
+    text_match = None
+    
+    for company in companies:
+        for alias in company_aliases(company):
+            key = normalize_company_key(alias)
+            if not key:
+                continue
+            if slug_key == key:
+                return company
+            if prefix_match is None and slug_key and len(key) >= 4 and slug_key.startswith(key):
+                prefix_match = company
+            if text_match is None and re.search(r'\b' + re.escape(alias.lower()) + r'\b', text):
+                text_match = company
+    return prefix_match or text_match
+
+# --- COMPANY INDEX ---
+# One canonical id per company, shared by every tab: ATS slugs, "Title at Company" parsing,
+# batch tags and typed inputs all resolve through the same alias index, so "palo-alto-networks",
+# "Palo Alto" and "PANW" group, attribute and join as one company. A company's id is the
+# normalize_company_key of its canonical name, matching the company_key columns of the other stores.
+COMPANY_INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS companies (
+    company_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    name_rank INTEGER DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS company_aliases (
+    alias_key TEXT PRIMARY KEY,
+    alias TEXT NOT NULL,
+    company_id TEXT NOT NULL,
+    source TEXT,
+    first_seen TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_company_aliases_company ON company_aliases (company_id);
+"""
+# A canonical name from a better source replaces one from a worse source (a slug-cased guess)
+COMPANY_NAME_RANKS = {"slug": 0, "title": 1, "input": 2, "seed": 3}
+COMPANY_FUZZY_MIN_LENGTH = 5     # shorter keys (tickers) only ever match exactly
+COMPANY_FUZZY_THRESHOLD = 0.6    # trigram Jaccard: accepts "Crowdstrke", rejects "Cloudera" for "Cloudflare"
+COMPANY_FLUSH_SECONDS = 2.0
+
+def company_trigrams(key):
+    padded = f"^{key}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def company_display_name(name):
+    """'palo-alto-networks' -> 'Palo Alto Networks'; names that already look typed are kept."""
+    name = name.strip()
+    if " " not in name and (name.islower() or "-" in name or "_" in name):
+        return re.sub(r'[-_]+', ' ', name).title()
+    return name
+
+class CompanyIndex:
+    """Alias key -> canonical company id in memory, written behind to COMPANY_INDEX_DB.
+    
+    Exact lookups are one dict probe. A name that misses is matched by trigram similarity
+    against the known aliases. Only exact and suffix-stripped hits and new companies are
+    learned; a fuzzy match is a guess, so it is used but never stored as an alias (a wrong
+    one would otherwise be persisted and seed further matches). Seeded from COMPANY_ALIASES;
+    grows from harvested slugs and user inputs.
+    """
+    
+    def __init__(self, path=COMPANY_INDEX_DB):
+        self.path = path
+        self.lock = threading.RLock()
+        self.names, self.name_ranks = {}, {}         # company id -> canonical name, its source rank
+        self.aliases = {}                            # alias key -> company id
+        self.members = defaultdict(set)              # company id -> alias keys
+        self.trigrams = defaultdict(set)             # trigram -> alias keys
+        self.fuzzy_memo = {}
+        self.pending_companies, self.pending_aliases = {}, []
+        self.flushed_at = time.monotonic()
+        with closing(self.connect()) as conn:
+            for row in conn.execute("SELECT company_id, name, name_rank FROM companies"):
+                self.names[row[0]], self.name_ranks[row[0]] = row[1], row[2]
+            for alias_key, company_id in conn.execute("SELECT alias_key, company_id FROM company_aliases"):
+                self.index_alias(alias_key, company_id)
+        for canonical, extra in COMPANY_ALIASES.items():
+            company_id = self.add_company(canonical, "seed")
+            for alias in [canonical] + extra:
+                if normalize_company_key(alias) not in self.aliases:
+                    self.add_alias(alias, company_id, "seed")
+        self.flush()
+        atexit.register(self.flush)
+    
+    def connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.executescript(COMPANY_INDEX_SCHEMA)
+        return conn
+    
+    def index_alias(self, alias_key, company_id):
+        self.aliases[alias_key] = company_id
+        self.members[company_id].add(alias_key)
+        for gram in company_trigrams(alias_key):
+            self.trigrams[gram].add(alias_key)
+        self.fuzzy_memo.clear()
+    
+    def add_company(self, name, source):
+        """Create (or rename, if `source` ranks higher) the company whose id is `name`'s key."""
+        company_id, rank = normalize_company_key(name), COMPANY_NAME_RANKS[source]
+        if company_id not in self.names or rank > self.name_ranks[company_id]:
+            self.names[company_id], self.name_ranks[company_id] = company_display_name(name), rank
+            self.pending_companies[company_id] = (self.names[company_id], rank)
+        if company_id not in self.aliases:
+            self.add_alias(name, company_id, source)
+        return company_id
+    
+    def add_alias(self, alias, company_id, source):
+        alias_key = normalize_company_key(alias)
+        self.index_alias(alias_key, company_id)
+        self.pending_aliases.append((alias_key, alias, company_id, source, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+        if time.monotonic() - self.flushed_at > COMPANY_FLUSH_SECONDS:
+            self.flush()
+    
+    def flush(self):
+        """Write learned companies and aliases (idempotent, so concurrent processes can't conflict)."""
+        with self.lock:
+            companies, aliases = self.pending_companies, self.pending_aliases
+            self.pending_companies, self.pending_aliases = {}, []
+            self.flushed_at = time.monotonic()
+            if not companies and not aliases:
+                return
+            with closing(self.connect()) as conn, conn:
+                conn.executemany(
+                    "INSERT INTO companies (company_id, name, name_rank) VALUES (?, ?, ?) ON CONFLICT (company_id) "
+                    "DO UPDATE SET name = excluded.name, name_rank = excluded.name_rank WHERE excluded.name_rank > name_rank",
+                    [(company_id, name, rank) for company_id, (name, rank) in companies.items()]
+                )
+                conn.executemany("INSERT OR IGNORE INTO company_aliases (alias_key, alias, company_id, source, first_seen) "
+                                 "VALUES (?, ?, ?, ?, ?)", aliases)
+    
+    def fuzzy(self, key):
+        """Company id of the most similar known alias (trigram Jaccard), or None."""
+        if len(key) < COMPANY_FUZZY_MIN_LENGTH:
+            return None
+        if key not in self.fuzzy_memo:
+            grams = company_trigrams(key)
+            shared = Counter(alias_key for gram in grams for alias_key in self.trigrams.get(gram, ()))
+            best, best_score, digits = None, COMPANY_FUZZY_THRESHOLD, re.sub(r'\D', '', key)
+            for alias_key, count in shared.items():
+                score = count / (len(grams) + len(alias_key) - count)  # a padded key has ~len(key) trigrams
+                # "Rapid7" and "Rapid8" are different companies, however close their spelling
+                if (score >= best_score and len(alias_key) >= COMPANY_FUZZY_MIN_LENGTH
+                        and re.sub(r'\D', '', alias_key) == digits):
+                    best, best_score = alias_key, score
+            self.fuzzy_memo[key] = self.aliases[best] if best else None
+        return self.fuzzy_memo[key]
+    
+    def lookup(self, name):
+        """Canonical id for a name without learning anything: exact alias, suffix-stripped alias, then fuzzy."""
+        key = normalize_company_key(name)
+        if not key:
+            return None
+        with self.lock:
+            if key in self.aliases:
+                return self.aliases[key]
+            stripped = normalize_company_key(COMPANY_SUFFIX_RE.sub('', name.strip()))
+            return self.aliases.get(stripped) or self.fuzzy(stripped or key)
+    
+    def resolve(self, name, source="input"):
+        """Canonical id for a name, learning it as an alias (or as a new company) unless it only matched fuzzily."""
+        key = normalize_company_key(name)
+        if not key:
+            return None
+        with self.lock:
+            company_id = self.aliases.get(key)
+            if company_id is None:
+                stripped = COMPANY_SUFFIX_RE.sub('', name.strip()).strip(' ,')
+                company_id = self.aliases.get(normalize_company_key(stripped))
+                if company_id is None:
+                    company_id = self.fuzzy(normalize_company_key(stripped) or key)
+                    if company_id is not None:
+                        return company_id
+                    company_id = self.add_company(stripped or name, source)
+                if key not in self.aliases:
+                    self.add_alias(name, company_id, source)
+            if company_id == key and COMPANY_NAME_RANKS[source] > self.name_ranks.get(company_id, 0):
+                self.add_company(name, source)  # e.g. a typed "Palo Alto Networks" replaces the slug-cased name
+            return company_id
+    
+    def link(self, alias, company_id, source):
+        """Record that `alias` (e.g. a resolved board slug) names an existing company."""
+        with self.lock:
+            if normalize_company_key(alias) and normalize_company_key(alias) not in self.aliases:
+                self.add_alias(alias, company_id, source)
+    
+    def name(self, company_id):
+        return self.names.get(company_id, "")
+    
+    def alias_keys(self, company_id):
+        with self.lock:
+            return set(self.members.get(company_id, ())) | {company_id}
+
+@st.cache_resource
+def company_index():
+    """Load the alias index once per server process."""
+    return CompanyIndex()
+
+def canonical_company_key(name):
+    """Canonical company id for a typed or tagged name (learned if new); '' for a blank name."""
+    if not (name or "").strip():
+        return ""
+    return company_index().resolve(name) or ""
+
+def result_company(item):
+    """(canonical company id, name) for a result: its batch tag, ATS slug, else LinkedIn's 'Title at Company'.
+    
+    The id is stored on the item, so rows, archive records and exports of it agree."""
+    index = company_index()
+    if 'company_id' not in item:
+        link, title = item.get('link', ''), item.get('title', '')
+        name, source = item.get('search_company'), "input"
+        if not name:
+            name, source = ats_company_slug(link), "slug"
+        if not name and "linkedin.com" in link and ' at ' in title:
+            name, source = title.split(' at ')[-1].split(' - ')[0].split(' | ')[0].strip(), "title"
+        item['company_id'] = index.resolve(name, source) if name else None
+    return item['company_id'], index.name(item['company_id']) if item['company_id'] else ""
+
+# --- BATCH COMPANY SEARCH ---
+# Google ignores query terms past ~32 words; packed queries stay under this budget
+QUERY_WORD_LIMIT = 32
+PACK_MAX_COMPANIES = 8
+
+def query_word_count(query):
+    """Approximate how many words Google counts for a query (OR and grouping don't count)."""
+    return len([t for t in re.sub(r'[()"]', ' ', query).split() if t != 'OR'])
+
+def pack_companies(companies, base_query, word_limit=QUERY_WORD_LIMIT, max_companies=PACK_MAX_COMPANIES):
+    """Group companies into packs whose OR'd query stays within the word budget."""
+    base_words = query_word_count(base_query)
+    packs, current, words = [], [], base_words
+    for company in companies:
+        company_words = query_word_count(company)
+        if current and (len(current) >= max_companies or words + company_words > word_limit):
+            packs.append(current)
+            current, words = [], base_words
+        current.append(company)
+        words += company_words
+    if current:
+        packs.append(current)
+    return packs
+
+@profiled("network: batch search")
+def batch_company_search(companies, job_titles, ats_sites, num_results=10, date_restrict=None, pack=False, use_boards=False):
+    """Search multiple companies at once and aggregate results.
+    
+    With use_boards=True, companies found on a selected Greenhouse/Lever/Ashby board are
+    harvested directly from it and only the rest go to Google.
+    With pack=True several companies are OR'd into one query and each result is attributed
+    back locally; results no company in the group can claim are kept untagged. A company
+    only gets its own follow-up query when the packed page came back full and the company
+    took at least its fair share of it, counting the unclaimed results (more likely exist).
+    """
+    all_results = []
+    company_stats = {}
+    companies = [c.strip() for c in companies if c.strip()]
+    
+    if use_boards:
+        platforms = [p for p, spec in ATS_BOARD_PLATFORMS.items() if spec["site"] in ats_sites]
+        if platforms:
+            board_results, board_stats, companies = ats_board_search(companies, job_titles, platforms, date_restrict)
+            all_results.extend(board_results)
+            company_stats.update(board_stats)
+    
+    # Build title query
+    if len(job_titles) == 1:
+        title_query = f'"{job_titles[0]}"'
+    else:
+        title_query = '(' + ' OR '.join([f'"{t}"' for t in job_titles]) + ')'
+    base_query = f'({" OR ".join(ats_sites)}) {title_query}'
+    
+    def search_single(company):
+        search_query = f'({" OR ".join(ats_sites)}) "{company}" {title_query}'
+        return google_search(search_query, num_results=num_results, date_restrict=date_restrict)
+    
+    if not pack:
+        for company in companies:
+            results = search_single(company)
+            
+            # Track stats per company
+            company_stats[company] = len(results)
+            
+            # Tag results with company name
+            for result in results:
+                result['search_company'] = company
+                all_results.append(result)
+        
+        return all_results, company_stats
+    
+    for group in pack_companies(companies, base_query):
+        if len(group) == 1:
+            packed_query = f'{base_query} "{group[0]}"'
+        else:
+            packed_query = f'{base_query} (' + ' OR '.join([f'"{c}"' for c in group]) + ')'
+        results = google_search(packed_query, num_results=10, date_restrict=date_restrict)
+        
+        shares = {company: [] for company in group}
+        unattributed = []
+        for result in results:
+            # A single-company query only asked for that company, whatever its text says
+            company = group[0] if len(group) == 1 else attribute_result(result, group)
+            if company:
+                shares[company].append(result)
+            else:
+                unattributed.append(result)
+        # Kept untagged (batch_row falls back to the ATS slug) rather than dropped
+        all_results.extend(unattributed)
+        
+        page_full = len(results) >= 10
+        fair_share = max(1, 10 // len(group))
+        for company, share in shares.items():
+            # Any unattributed result may be this company's, so it counts toward its share
+            if page_full and fair_share <= len(share) + len(unattributed) and len(share) < num_results:
+                share = search_single(company)
+            share = share[:num_results]
+            company_stats[company] = len(share)
+            for result in share:
+                result['search_company'] = company
+                all_results.append(result)
+    
+    return all_results, company_stats
+
+def batch_row(item):
+    """Table row for one Batch Company Search result."""
+    link = item.get('link', '#')
+    _, company = result_company(item)  # the batch tag, else the ATS slug
+    
+    source = "Other"
+    if "greenhouse.io" in link:
+        source = "Greenhouse"
+    elif "lever.co" in link:
+        source = "Lever"
+    elif "ashbyhq.com" in link:
+        source = "Ashby"
+    elif "linkedin.com" in link:
+        source = "LinkedIn"
+    elif "myworkdayjobs.com" in link:
+        source = "Workday"
+    
+    row = {
+        "Company": company,
+        "Title": item.get('title', 'N/A'),
+        "Source": source,
+        **taxonomy_columns(item),
+        "Remote": is_remote(item),
+        "Score": item.get('score', 0.0),
+        "Link": link
+    }
+    row.update(enriched_columns(item))
+    return row
+
+@profiled("pandas: batch payload")
+def build_batch_payload(all_results, company_stats, job_titles, companies_count, enrich=False, boards=False):
+    """Dedupe, extract, enrich, classify and rank raw batch results into the cached table payload (None if empty)."""
+    all_results = extract_fields(deduplicate_results(all_results))
+    if enrich:
+        enrich_results([r for r in all_results if 'enriched' not in r])
+    all_results = rank_results(classify_results(all_results), ranking_terms(job_titles))
+    if not all_results:
+        return None
+    
+    # Format results
+    data = [batch_row(item) for item in all_results]
+    
+    stats = [
+        {"Company": comp, "Jobs Found": count}
+        for comp, count in sorted(company_stats.items(), key=lambda x: x[1], reverse=True)
+    ]
+    return {"data": data, "stats": stats, "companies": companies_count}
+
+# --- POSTING DATES ---
+# pagemap metatag keys that carry a publish/posting timestamp, most specific first
+DATE_METATAG_KEYS = [
+    "dateposted", "article:published_time", "og:article:published_time",
+    "datepublished", "date", "pubdate", "article:modified_time", "og:updated_time"
+]
+RELATIVE_DATE_RE = re.compile(r'\b(\d+)\s+(minute|hour|day|week|month)s?\s+ago\b', re.IGNORECASE)
+ABSOLUTE_DATE_RE = re.compile(r'\b([A-Z][a-z]{2})[a-z]*\.?\s+(\d{1,2}),\s+(\d{4})\b')
+ISO_DATE_RE = re.compile(r'(\d{4})-(\d{2})-(\d{2})')
+RELATIVE_DATE_DAYS = {"minute": 0, "hour": 0, "day": 1, "week": 7, "month": 30}
+
+def extract_posted_date(item, now=None):
+    """Best-effort posting date for a search result, from pagemap metatags or the snippet."""
+    now = now or datetime.now()
+    
+    # 1. Structured metatags (ISO timestamps)
+    for tags in item.get('pagemap', {}).get('metatags', []):
+        lowered = {k.lower(): v for k, v in tags.items()}
+        for key in DATE_METATAG_KEYS:
+            match = ISO_DATE_RE.search(str(lowered.get(key, '')))
+            if match:
+                try:
+                    return datetime(*[int(g) for g in match.groups()]).date()
+                except ValueError:
+                    continue
+    
+    # 2. Snippet prefix ("3 days ago ..." or "Jan 5, 2026 ...")
+    snippet = item.get('snippet', '')
+    match = RELATIVE_DATE_RE.search(snippet)
+    if match:
+        days = int(match.group(1)) * RELATIVE_DATE_DAYS[match.group(2).lower()]
+        return (now - timedelta(days=days)).date()
+    match = ABSOLUTE_DATE_RE.search(snippet)
+    if match:
+        try:
+            return datetime.strptime(f"{match.group(1)} {match.group(2)} {match.group(3)}", "%b %d %Y").date()
+        except ValueError:
+            pass
+    return None
+
+# --- SNIPPET FIELD EXTRACTION ---
+# Typed target_cols fields read from what the search API already returned (title, snippet,
+# og:description and other pagemap metatags), so tables can be filtered and exported without
+# opening each posting. The regexes run once over a whole result set via pandas .str methods.
+SNIPPET_SALARY_RE = re.compile(
+    r'(?P<currency>[$€£])\s?(?P<low>\d[\d,]*(?:\.\d+)?)\s?(?P<low_k>k)?(?!\s?(?:m|mm|b|bn|million|billion)\b)'
+    r'(?:\s?(?:-|–|—|to)\s?[$€£]?\s?(?P<high>\d[\d,]*(?:\.\d+)?)\s?(?P<high_k>k)?)?'
+    r'(?:\s?(?:/|per|an|a)\s?(?P<unit>hour|hr|year|yr|annum|month|mo|week|wk|day)\b)?',
+    re.IGNORECASE
+)
+SNIPPET_LOCATION_RE = re.compile(r'\bLocations?\s*[:\-–]\s*(?P<location>[A-Z][^.;|·\n]{1,60}?)(?=\s*(?:[.;|·\n]|$| - ))')
+CITY_REGION_RE = re.compile(
+    r'(?P<location>\b[A-Z][a-zA-Z.\'-]+(?: [A-Z][a-zA-Z.\'-]+)*, '
+    r'(?:[A-Z]{2}|United States|USA|Canada|United Kingdom|UK|India|Germany|Ireland|Australia)\b)'
+)
+EMPLOYMENT_TYPE_RE = re.compile(r'\b(?P<type>full[- ]?time|part[- ]?time|contractor|contract|internship|intern|temporary|freelance)\b', re.IGNORECASE)
+EMPLOYMENT_TYPES = {
+    "fulltime": "Full-time", "parttime": "Part-time", "contract": "Contract", "contractor": "Contract",
+    "internship": "Internship", "intern": "Internship", "temporary": "Temporary", "freelance": "Freelance"
+}
+SALARY_CURRENCIES = {"$": "USD", "€": "EUR", "£": "GBP"}
+SNIPPET_SALARY_UNITS = {"hour": "hour", "hr": "hour", "year": "year", "yr": "year", "annum": "year",
+                        "month": "month", "mo": "month", "week": "week", "wk": "week", "day": "day"}
+DESCRIPTION_METATAG_KEYS = ["og:description", "twitter:description", "description"]
+LOCATION_METATAG_KEYS = ["joblocation", "job:location", "og:locality", "geo.placename"]
+
+def result_metatags(item):
+    """All of a result's pagemap metatags merged into one lowercase-keyed dict."""
+    merged = {}
+    for tags in item.get('pagemap', {}).get('metatags', []):
+        for key, value in tags.items():
+            merged.setdefault(key.lower(), value)
+    return merged
+
+@profiled("cpu: field extraction")
+def extract_fields(results, now=None):
+    """Fill item['extracted'] with typed fields for a whole result set (no page fetches)."""
+    if not results:
+        return results
+    metas = [result_metatags(item) for item in results]
+    text = pd.Series([
+        " | ".join([item.get('title', ''), item.get('snippet', '')] + [str(meta.get(k, '')) for k in DESCRIPTION_METATAG_KEYS])
+        for item, meta in zip(results, metas)
+    ])
+    
+    # Salary: "$120k - $150k", "$45/hr", "£60,000 a year"
+    salary = text.str.extract(SNIPPET_SALARY_RE)
+    low = pd.to_numeric(salary["low"].str.replace(",", "", regex=False), errors="coerce")
+    high = pd.to_numeric(salary["high"].str.replace(",", "", regex=False), errors="coerce")
+    high = high * np.where(salary["high_k"].notna(), 1000, 1)
+    # "$120-150k" puts the k on the upper bound only
+    low = low * np.where(salary["low_k"].notna() | ((low < 1000) & (high >= 1000)), 1000, 1)
+    high = high.fillna(low)
+    valid = low.between(10, 2_000_000) & (high >= low)
+    unit = salary["unit"].str.lower().map(SNIPPET_SALARY_UNITS)
+    period = unit.where(unit.notna(), pd.Series(np.where(low < 500, "hour", "year"), index=low.index))
+    
+    # Location: metatag, then a "Location:" label, then a "City, ST" mention
+    labelled = text.str.extract(SNIPPET_LOCATION_RE)["location"]
+    city = text.str.extract(CITY_REGION_RE)["location"]
+    meta_location = pd.Series([next((str(m[k]) for k in LOCATION_METATAG_KEYS if m.get(k)), None) for m in metas])
+    remote = text.str.contains(REMOTE_RE)
+    location = meta_location.fillna(labelled).fillna(city).where(lambda s: s.notna() | ~remote, "Remote")
+    
+    employment = (text.str.extract(EMPLOYMENT_TYPE_RE)["type"].str.lower()
+                  .str.replace(r'[- ]', '', regex=True).map(EMPLOYMENT_TYPES))
+    
+    columns = pd.DataFrame({
+        "location": location.str.strip(),
+        "employmentType": employment,
+        "salaryMin": low.where(valid),
+        "salaryMax": high.where(valid),
+        "salaryCurrency": salary["currency"].map(SALARY_CURRENCIES).where(valid),
+        "salaryPeriod": period.where(valid)
+    }).astype(object)
+    columns = columns.where(columns.notna(), None)
+    
+    for item, fields, is_remote_posting in zip(results, columns.to_dict("records"), remote.tolist()):
+        posted = extract_posted_date(item, now)
+        fields["postedDate"] = posted.isoformat() if posted else None
+        fields["remote"] = is_remote_posting
+        item['extracted'] = {k: v for k, v in fields.items() if v is not None}
+    return results
+
+def posting_fields(item):
+    """A result's typed fields: fetched enrichment where available, else the snippet extraction."""
+    return {**item.get('extracted', {}), **item.get('enriched', {})}
+
+# --- COMPETITOR ANALYSIS ---
+COMPETITOR_TIMEFRAMES = {
+    "Past Week": {"date_restrict": "w1", "days": 7},
+    "Past Month": {"date_restrict": "m1", "days": 31},
+    "Past 3 Months": {"date_restrict": "m3", "days": 92}
+}
+
+@profiled("network: competitor analysis")
+def competitor_hiring_analysis(companies, role, platforms, timeframes):
+    """Compare hiring activity with one query per company over the widest selected window.
+    
+    Sampled results are bucketed locally by posting date and the API's totalResults is
+    split across the buckets in the same proportion. Undated results only count toward
+    the widest window, which dateRestrict already guarantees they fall inside.
+    
+    Returns (rows, {company: sampled items}); a company whose search failed has neither.
+    """
+    timeframes = sorted(timeframes, key=lambda t: COMPETITOR_TIMEFRAMES[t]["days"])
+    widest = timeframes[-1]
+    today = datetime.now().date()
+    analysis_data, sampled_items = [], {}
+    
+    for company in companies:
+        query = f'({" OR ".join(platforms)}) "{company}" "{role}"'
+        response = google_search_response(
+            query,
+            num_results=10,
+            date_restrict=COMPETITOR_TIMEFRAMES[widest]["date_restrict"]
+        )
+        if not response:
+            continue  # quota or HTTP error (already reported): no count beats a false zero
+        items = sampled_items[company] = response.get('items', [])
+        total = int(response.get('searchInformation', {}).get('totalResults', len(items)) or 0)
+        total = max(total, len(items))
+        ages = []
+        for item in items:
+            posted = extract_posted_date(item)
+            ages.append((today - posted).days if posted else None)
+        
+        for timeframe in timeframes:
+            if timeframe == widest:
+                sampled = len(items)
+            else:
+                max_age = COMPETITOR_TIMEFRAMES[timeframe]["days"]
+                sampled = sum(1 for age in ages if age is not None and age <= max_age)
+            share = sampled / len(items) if items else 0
+            analysis_data.append({
+                "Company": company,
+                "Time Period": timeframe,
+                "Job Postings": int(round(total * share)),
+                "Sampled": sampled
+            })
+    
+    return analysis_data, sampled_items
+
+# --- HIRING TRENDS ---
+# Every competitor count is appended to hiring_counts and folded into day/week rollups in the
+# same transaction, so trend charts read a handful of pre-aggregated rows however long the
+# history gets. Posting ids seen by any search land in hiring_postings with first/last seen.
+HIRING_TRENDS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS hiring_counts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    observed_at TEXT NOT NULL,
+    company_key TEXT NOT NULL,
+    company TEXT,
+    role_key TEXT NOT NULL,
+    platforms TEXT,
+    timeframe TEXT NOT NULL,
+    postings INTEGER,
+    sampled INTEGER
+);
+CREATE TABLE IF NOT EXISTS hiring_rollups (
+    grain TEXT NOT NULL,
+    period TEXT NOT NULL,
+    company_key TEXT NOT NULL,
+    role_key TEXT NOT NULL,
+    platforms TEXT NOT NULL DEFAULT '',
+    timeframe TEXT NOT NULL,
+    company TEXT,
+    samples INTEGER,
+    postings_sum INTEGER,
+    postings_max INTEGER,
+    last_postings INTEGER,
+    PRIMARY KEY (grain, role_key, platforms, timeframe, company_key, period)
+);
+CREATE TABLE IF NOT EXISTS hiring_postings (
+    company_key TEXT NOT NULL,
+    posting_key TEXT NOT NULL,
+    company TEXT,
+    title TEXT,
+    link TEXT,
+    first_seen TEXT,
+    last_seen TEXT,
+    PRIMARY KEY (company_key, posting_key)
+);
+CREATE INDEX IF NOT EXISTS idx_hiring_postings_first_seen ON hiring_postings (first_seen, company_key);
+"""
+TREND_GRAINS = {"Daily": "day", "Weekly": "week"}
+
+def trends_connection():
+    """Open the hiring time-series store."""
+    conn = sqlite3.connect(HIRING_TRENDS_DB, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(HIRING_TRENDS_SCHEMA)
+    return conn
+
+def trend_periods(moment):
+    """Rollup periods for a timestamp: the day and the Monday that starts its week."""
+    day = moment.date()
+    return {"day": day.isoformat(), "week": (day - timedelta(days=day.weekday())).isoformat()}
+
+def record_postings(conn, items, default_company=""):
+    """Upsert harvested postings; returns how many had not been seen before."""
+    today = datetime.now().strftime("%Y-%m-%d")
+    before = conn.total_changes
+    rows = [
+        (canonical_company_key(item.get('search_company') or default_company), result_url_key(item),
+         item.get('search_company') or default_company, item.get('title', ''), item.get('link', ''), today, today)
+        for item in items if item.get('link')
+    ]
+    conn.executemany(
+        "INSERT OR IGNORE INTO hiring_postings (company_key, posting_key, company, title, link, first_seen, last_seen) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+    )
+    new = conn.total_changes - before
+    conn.executemany("UPDATE hiring_postings SET last_seen = ? WHERE company_key = ? AND posting_key = ?",
+                     [(today, row[0], row[1]) for row in rows])
+    return new
+
+def platforms_key(platforms):
+    """One series per platform selection: counts over different sites aren't comparable."""
+    return " OR ".join(sorted(platforms))
+
+def fold_rollups(conn, moment, company_key, company, role_key, platforms, counts):
+    """Fold one observation's [(timeframe, postings)] into its day and week rollups."""
+    for grain, period in trend_periods(moment).items():
+        conn.executemany(
+            """INSERT INTO hiring_rollups (grain, period, company_key, role_key, platforms, timeframe, company,
+                                           samples, postings_sum, postings_max, last_postings)
+               VALUES (?, ?, ?, ?, ?, ?, ?, 1, ?, ?, ?)
+               ON CONFLICT (grain, role_key, platforms, timeframe, company_key, period) DO UPDATE SET
+                   samples = samples + 1,
+                   postings_sum = postings_sum + excluded.postings_sum,
+                   postings_max = MAX(postings_max, excluded.postings_max),
+                   last_postings = excluded.last_postings""",
+            [(grain, period, company_key, role_key, platforms, timeframe, company, postings, postings, postings)
+             for timeframe, postings in counts]
+        )
+
+def record_hiring_counts(company, role, platforms, rows, items=()):
+    """Append one company's competitor counts and fold them into the day/week rollups."""
+    now = datetime.now()
+    company_key, role_key = canonical_company_key(company), " ".join(role.lower().split())
+    with closing(trends_connection()) as conn, conn:
+        conn.executemany(
+            "INSERT INTO hiring_counts (observed_at, company_key, company, role_key, platforms, timeframe, postings, sampled) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(now.strftime("%Y-%m-%d %H:%M:%S"), company_key, company, role_key, platforms_key(platforms),
+              row["Time Period"], row["Job Postings"], row["Sampled"]) for row in rows]
+        )
+        fold_rollups(conn, now, company_key, company, role_key, platforms_key(platforms),
+                     [(row["Time Period"], row["Job Postings"]) for row in rows])
+        record_postings(conn, items, company)
+
+def record_batch_postings(results):
+    """Store posting ids harvested by a batch search (those tagged with search_company)."""
+    with closing(trends_connection()) as conn, conn:
+        return record_postings(conn, [item for item in results if item.get('search_company')])
+
+def hiring_trend(companies, role, platforms, timeframe, grain="day"):
+    """Rollup series for a role/platforms/timeframe: rows of period, company, postings (latest count in the period)."""
+    keys = [canonical_company_key(c) for c in companies]
+    if not keys or not os.path.exists(HIRING_TRENDS_DB):
+        return pd.DataFrame(columns=["period", "company", "postings"])
+    with closing(trends_connection()) as conn:
+        return pd.read_sql_query(
+            f"""SELECT period, company, last_postings AS postings FROM hiring_rollups
+                WHERE grain = ? AND role_key = ? AND platforms = ? AND timeframe = ?
+                  AND company_key IN ({','.join('?' * len(keys))})
+                ORDER BY period""",
+            conn, params=[grain, " ".join(role.lower().split()), platforms_key(platforms), timeframe] + keys
+        )
+
+def new_postings_trend(companies, grain="week"):
+    """Newly seen posting ids per company per day/week."""
+    keys = [canonical_company_key(c) for c in companies]
+    if not keys or not os.path.exists(HIRING_TRENDS_DB):
+        return pd.DataFrame(columns=["period", "company", "new_postings"])
+    with closing(trends_connection()) as conn:
+        df = pd.read_sql_query(
+            f"""SELECT first_seen, company, COUNT(*) AS new_postings FROM hiring_postings
+                WHERE company_key IN ({','.join('?' * len(keys))}) GROUP BY first_seen, company_key""",
+            conn, params=keys
+        )
+    if df.empty:
+        return df.rename(columns={"first_seen": "period"})
+    df["period"] = [trend_periods(datetime.fromisoformat(d))[grain] for d in df["first_seen"]]
+    return df.groupby(["period", "company"], as_index=False)["new_postings"].sum()
+
+# --- DEDUPLICATION ---
+class ResultDeduper:
+    """Incremental deduplicate_results: remembers URLs and titles across pages."""
+    
+    def __init__(self):
+        self.seen_urls = set()
+        self.seen_titles = set()
+    
+    @profiled("cpu: dedupe")
+    def add(self, results):
+        """Return the results not seen on any earlier page (or earlier in this one)."""
+        unique_results = []
+        for item in results:
+            url = item.get('link', '')
+            title = item.get('title', '').lower().strip()
+            
+            # Normalize URL (remove tracking parameters)
+            base_url = url.split('?')[0].rstrip('/')
+            
+            # Create a simple title fingerprint (first 50 chars, lowercase)
+            title_key = ''.join(title[:50].split())
+            
+            # Skip if we've seen this URL or very similar title
+            if base_url in self.seen_urls:
+                continue
+            if title_key in self.seen_titles:
+                continue
+                
+            self.seen_urls.add(base_url)
+            self.seen_titles.add(title_key)
+            unique_results.append(item)
+        return unique_results
+
+def deduplicate_results(results):
+    """Remove duplicate job listings based on URL and title similarity."""
+    return ResultDeduper().add(results)
+
+# --- RELEVANCE RANKING & FACETS ---
+TOKEN_RE = re.compile(r'[a-z0-9+#]+(?:\.[a-z0-9]+)*')
+QUERY_STOPWORDS = {"or", "and", "site", "the", "of", "a", "an", "in", "at", "to", "for"}
+BM25_K1 = 1.5
+BM25_B = 0.75
+REMOTE_RE = re.compile(r'\b(?:remote|work from home|wfh|telecommute|anywhere)\b', re.IGNORECASE)
+
+def tokenize(text):
+    """Lowercase word tokens, keeping tech terms like c++, c# and node.js intact."""
+    return TOKEN_RE.findall((text or '').lower())
+
+class BM25Index:
+    """BM25 index over a fixed result set; each query term is scored across all docs with numpy."""
+    
+    def __init__(self, docs, k1=BM25_K1, b=BM25_B):
+        tokenized = [tokenize(doc) for doc in docs]
+        self.size = len(docs)
+        doc_len = np.array([len(tokens) for tokens in tokenized], dtype=float)
+        avg_len = doc_len.mean() if self.size and doc_len.mean() else 1.0
+        self.k1 = k1
+        self.norm = k1 * (1 - b + b * doc_len / avg_len)
+        postings = {}
+        for doc_id, tokens in enumerate(tokenized):
+            for term, tf in Counter(tokens).items():
+                postings.setdefault(term, ([], []))
+                postings[term][0].append(doc_id)
+                postings[term][1].append(tf)
+        self.postings = {term: (np.array(ids), np.array(tfs, dtype=float)) for term, (ids, tfs) in postings.items()}
+    
+    def score(self, terms):
+        scores = np.zeros(self.size)
+        for term in set(terms):
+            if term not in self.postings:
+                continue
+            ids, tf = self.postings[term]
+            idf = math.log(1 + (self.size - len(ids) + 0.5) / (len(ids) + 0.5))
+            scores[ids] += idf * tf * (self.k1 + 1) / (tf + self.norm[ids])
+        return scores
+
+@lru_cache(maxsize=32)
+def build_rank_index(docs):
+    """Build (and memoize) the BM25 index for a result set, keyed by its document texts."""
+    return BM25Index(docs)
+
+def ranking_terms(*parts):
+    """Flatten titles, skills, experience and location inputs into BM25 query terms."""
+    terms = []
+    for part in parts:
+        for text in ([part] if isinstance(part, str) else (part or [])):
+            terms.extend(t for t in tokenize(text) if t not in QUERY_STOPWORDS)
+    return terms
+
+@profiled("cpu: ranking")
+def rank_results(results, terms):
+    """Sort results by BM25 relevance of title+snippet to `terms`, storing item['score']."""
+    if not results or not terms:
+        return results
+    docs = tuple(f"{item.get('title', '')} {item.get('snippet', '')}" for item in results)
+    scores = build_rank_index(docs).score(terms)
+    for item, score in zip(results, scores):
+        item['score'] = round(float(score), 2)
+    order = np.argsort(-scores, kind='stable')
+    return [results[i] for i in order]
+
+def is_remote(item):
+    """Remote facet from the title, snippet, metatags or enriched location."""
+    if item.get('extracted', {}).get('remote'):
+        return True
+    text = f"{item.get('title', '')} {item.get('snippet', '')} {item.get('enriched', {}).get('location', '')}"
+    return bool(REMOTE_RE.search(text))
+
+@profiled("pandas: results table")
+def render_faceted_table(df, key, link_column="Link", link_label="Apply"):
+    """Render a result table with local facet filters (no new search). Returns the filtered frame."""
+    facet_columns = [c for c in ("Source", "Company", "Field", "Seniority", "Type") if c in df.columns and df[c].nunique() > 1]
+    if facet_columns or "Remote" in df.columns:
+        mask = pd.Series(True, index=df.index)
+        cols = st.columns(len(facet_columns) + 1)
+        for col, name in zip(cols, facet_columns):
+            with col:
+                options = sorted(v for v in df[name].dropna().unique() if v != "")
+                chosen = st.multiselect(name, options, key=f"{key}_facet_{name}")
+                if chosen:
+                    mask &= df[name].isin(chosen)
+        if "Remote" in df.columns:
+            with cols[-1]:
+                if st.checkbox("Remote only", key=f"{key}_facet_remote"):
+                    mask &= df["Remote"].astype(bool)
+                if "Salary Max" in df.columns and (df["Salary Max"] != "").any():
+                    if st.checkbox("Salary listed", key=f"{key}_facet_salary"):
+                        mask &= df["Salary Max"] != ""
+        if not mask.all():
+            st.caption(f"Showing {int(mask.sum())} of {len(df)} results")
+        df = df[mask]
+    
+    st.dataframe(
+        df,
+        column_config={link_column: st.column_config.LinkColumn(link_label)},
+        use_container_width=True,
+        hide_index=True
+    )
+    return df
+
+# --- TITLE & SKILL TAXONOMY ---
+# Seniority vocabulary beyond the EXPERIENCE_MAP query terms (titles abbreviate a lot)
+SENIORITY_EXTRA_TERMS = {
+    "Intern": ["intern", "internship", "co-op"],
+    "Entry Level": ["jr", "entry", "graduate"],
+    "Mid Level": ["mid", "ii"],
+    "Senior": ["sr", "iii"],
+    "Lead": ["architect"],
+    "Manager": ["head of", "vp", "vice president"]
+}
+# When a text mentions several levels, the first in this order wins
+SENIORITY_PRIORITY = ["Intern", "Manager", "Lead", "Senior", "Entry Level", "Mid Level"]
+TAXONOMY_CACHE_SIZE = 200_000  # tags kept per process, keyed by a hash of the title/snippet text
+
+class TaxonomyMatcher:
+    """Aho-Corasick automaton over word tokens, so every pattern is found in one linear pass."""
+    
+    def __init__(self):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        self.vocabulary = set()
+        self.tags = OrderedDict()  # text hash -> classify_result tags, LRU (reruns re-tag the same results)
+        self.lock = threading.Lock()
+    
+    def add(self, phrase, payload):
+        tokens = tokenize(phrase)
+        if not tokens:
+            return
+        self.vocabulary.update(tokens)
+        node = 0
+        for token in tokens:
+            if token not in self.goto[node]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+                self.goto[node][token] = len(self.goto) - 1
+            node = self.goto[node][token]
+        self.output[node].append((len(tokens), payload))
+    
+    def build(self):
+        """Compute failure links breadth-first (call once after all patterns are added)."""
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for token, child in self.goto[node].items():
+                queue.append(child)
+                state = self.fail[node]
+                while state and token not in self.goto[state]:
+                    state = self.fail[state]
+                self.fail[child] = self.goto[state].get(token, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+        return self
+    
+    def scan(self, tokens):
+        """Return [(end token index, matches ending there)] for every position with a pattern match."""
+        goto, fail, output, vocabulary = self.goto, self.fail, self.output, self.vocabulary
+        hits = []
+        node = 0
+        for i, token in enumerate(tokens):
+            if token not in vocabulary:
+                node = 0  # no pattern contains it, so every state falls back to the root
+                continue
+            while node and token not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(token, 0)
+            if output[node]:
+                hits.append((i, output[node]))
+        return hits
+
+@st.cache_resource
+def build_taxonomy():
+    """Compile JOB_FIELDS titles/skills and the seniority vocabulary into one matcher (once per process)."""
+    matcher = TaxonomyMatcher()
+    for field, data in JOB_FIELDS.items():
+        for title in data["titles"]:
+            matcher.add(title, ("title", field, title))
+        for skill in data["skills"]:
+            matcher.add(skill, ("skill", field, skill))
+    for level, query in EXPERIENCE_MAP.items():
+        if query:
+            for term in re.findall(r'"([^"]+)"', query):
+                matcher.add(term, ("seniority", None, level))
+    for level, terms in SENIORITY_EXTRA_TERMS.items():
+        for term in terms:
+            matcher.add(term, ("seniority", None, level))
+    return matcher.build()
+
+def classify_result(item, matcher=None):
+    """Tag a result with field, canonical title, seniority and matched skills.
+    
+    Title matches in the result title outrank those in the snippet, and longer titles
+    outrank shorter ones ("Junior SOC Analyst" over "SOC Analyst"). Seniority is read
+    from the title only, since snippets often mention other roles. Tags are cached by a
+    hash of the title and snippet and shared between results with the same text, so
+    treat them as read-only.
+    """
+    matcher = matcher or build_taxonomy()
+    title, snippet = item.get('title') or '', item.get('snippet') or ''
+    text_hash = hashlib.sha1(f"{title}\n{snippet}".encode('utf-8')).hexdigest()[:16]
+    with matcher.lock:
+        tags = matcher.tags.get(text_hash)
+        if tags is not None:
+            matcher.tags.move_to_end(text_hash)
+            return tags
+    
+    title_tokens = tokenize(title)
+    tokens = title_tokens + tokenize(snippet)
+    best_title, best_rank = None, None
+    field_votes = {}
+    skills, levels = [], set()
+    
+    title_length = len(title_tokens)
+    for end, matches in matcher.scan(tokens):
+        for length, (kind, field, value) in matches:
+            in_title = end - length + 1 < title_length
+            if kind == "title":
+                rank = (in_title, length)
+                if best_rank is None or rank > best_rank:
+                    best_title, best_rank = (field, value), rank
+                field_votes[field] = field_votes.get(field, 0) + (2 if in_title else 1)
+            elif kind == "skill":
+                if value not in skills:
+                    skills.append(value)
+                field_votes[field] = field_votes.get(field, 0) + 1
+            elif kind == "seniority" and in_title:
+                levels.add(value)
+    
+    if best_title and best_rank[0]:
+        field = best_title[0]
+    else:
+        field = max(field_votes, key=field_votes.get) if field_votes else None
+    tags = {
+        "field": field,
+        "title": best_title[1] if best_title else None,
+        "seniority": next((level for level in SENIORITY_PRIORITY if level in levels), "Unspecified"),
+        "skills": skills
+    }
+    with matcher.lock:
+        matcher.tags[text_hash] = tags
+        if len(matcher.tags) > TAXONOMY_CACHE_SIZE:
+            matcher.tags.popitem(last=False)
+    return tags
+
+@profiled("cpu: taxonomy")
+def classify_results(results):
+    """Tag every result in place with item['taxonomy']."""
+    matcher = build_taxonomy()
+    for item in results:
+        item['taxonomy'] = classify_result(item, matcher)
+    return results
+
+def taxonomy_columns(item):
+    """Display columns for a classified result."""
+    tags = item.get('taxonomy') or classify_result(item)
+    return {
+        "Field": tags["field"] or "",
+        "Role": tags["title"] or "",
+        "Seniority": tags["seniority"],
+        "Skills": ", ".join(tags["skills"])
+    }
+
+# --- SESSION RESULT CACHE ---
+# Each tab/tool keeps its result sets in an LRU keyed by (slot, query) so reruns caused by
+# other widgets re-render from memory instead of losing the results or re-searching.
+# A process-wide governor accounts for every session's resident result bytes. Past the
+# per-session or global budget the coldest result sets are spilled to Arrow files on disk
+# and read back in the next time they are shown.
+class ResultCache(OrderedDict):
+    """One session's result sets, {(slot, key): entry} in LRU order, plus the key each slot shows."""
+
+class ResultMemoryGovernor:
+    """Tracks result-cache bytes across sessions and spills the coldest sets to disk."""
+    
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.sessions = weakref.WeakValueDictionary()  # expired sessions drop out on their own
+        self.counters = Counter()
+        shutil.rmtree(RESULT_SPILL_DIR, ignore_errors=True)  # left over from a previous server process
+    
+    def register(self, cache):
+        cache.session_id = uuid.uuid4().hex
+        cache.current = {}
+        cache.spill_dir = os.path.join(RESULT_SPILL_DIR, cache.session_id)
+        weakref.finalize(cache, shutil.rmtree, cache.spill_dir, True)
+        with self.lock:
+            self.sessions[cache.session_id] = cache
+    
+    def resident_bytes(self, cache):
+        return sum(e["bytes"] for e in cache.values() if e["payload"] is not None)
+    
+    def spilled_bytes(self, cache):
+        return sum(e["disk_bytes"] for e in cache.values() if e["payload"] is None)
+    
+    def drop(self, cache, cache_key):
+        entry = cache.pop(cache_key)
+        if entry["spilled"]:
+            shutil.rmtree(entry["spilled"], ignore_errors=True)
+        if cache.current.get(cache_key[0]) == cache_key[1]:
+            cache.current.pop(cache_key[0])
+    
+    def spill(self, cache, cache_key):
+        """Move one result set to disk (or drop it if it can't be written as Arrow)."""
+        entry = cache[cache_key]
+        path = os.path.join(cache.spill_dir, hashlib.sha1(repr(cache_key).encode('utf-8')).hexdigest()[:16])
+        try:
+            entry["disk_bytes"] = write_spill(path, entry["payload"])
+        except Exception:
+            shutil.rmtree(path, ignore_errors=True)
+            self.drop(cache, cache_key)
+            self.counters["dropped"] += 1
+            return
+        entry["payload"], entry["spilled"] = None, path
+        self.counters["spilled"] += 1
+        # Disk is bounded too: forget the coldest spilled sets past the session's allowance
+        for old_key in [k for k, e in cache.items() if e["payload"] is None]:
+            if self.spilled_bytes(cache) <= RESULT_SPILL_MAX_BYTES:
+                break
+            self.drop(cache, old_key)
+            self.counters["dropped"] += 1
+    
+    def load(self, cache, cache_key):
+        """An entry's payload, reading it back from disk if it was spilled (None if that fails)."""
+        with self.lock:
+            entry = cache[cache_key]
+            if entry["payload"] is None:
+                try:
+                    entry["payload"] = read_spill(entry["spilled"])
+                except Exception:
+                    self.drop(cache, cache_key)
+                    self.counters["dropped"] += 1
+                    return None
+                shutil.rmtree(entry["spilled"], ignore_errors=True)
+                entry["spilled"], entry["disk_bytes"] = None, 0
+                self.counters["reloaded"] += 1
+            entry["used"] = time.monotonic()
+            cache.move_to_end(cache_key)
+            self.enforce(cache)
+            return entry["payload"]
+    
+    def enforce(self, cache):
+        """Spill until this session and the whole process are back within budget.
+        
+        Each session's most recently used result set always stays resident.
+        """
+        with self.lock:
+            while self.resident_bytes(cache) > RESULT_CACHE_MAX_BYTES:
+                coldest = next((k for k, e in list(cache.items())[:-1] if e["payload"] is not None), None)
+                if coldest is None:
+                    break
+                self.spill(cache, coldest)
+            while self.stats()["resident_bytes"] > RESULT_CACHE_GLOBAL_MAX_BYTES:
+                candidates = [
+                    (e["used"], session, k) for session in list(self.sessions.values())
+                    for k, e in list(session.items())[:-1] if e["payload"] is not None
+                ]
+                if not candidates:
+                    break
+                _, session, coldest = min(candidates, key=lambda c: c[0])
+                self.spill(session, coldest)
+    
+    def stats(self, cache=None):
+        """Memory accounting for the process, or for one session's cache."""
+        with self.lock:
+            caches = [cache] if cache is not None else list(self.sessions.values())
+            return {
+                "sessions": len(caches),
+                "result_sets": sum(len(c) for c in caches),
+                "resident_bytes": sum(self.resident_bytes(c) for c in caches),
+                "spilled_bytes": sum(self.spilled_bytes(c) for c in caches),
+                **({} if cache is not None else dict(self.counters))
+            }
+
+@st.cache_resource
+def result_governor():
+    """One memory governor per server process."""
+    return ResultMemoryGovernor()
+
+SPILL_ABSENT_COLUMN = "__absent__"  # per row, the columns it didn't have (so they aren't read back as None)
+
+def records_table(pa, rows):
+    """Arrow table from a list of dicts, with the union of their keys as columns."""
+    columns = list(dict.fromkeys(key for row in rows for key in row))
+    table = {column: [row.get(column) for row in rows] for column in columns}
+    absent = [[column for column in columns if column not in row] or None for row in rows]
+    if any(absent):
+        table[SPILL_ABSENT_COLUMN] = absent
+    return pa.table(table)
+
+def table_records(table):
+    """The list of dicts records_table was built from."""
+    rows = table.to_pylist()
+    if SPILL_ABSENT_COLUMN in table.column_names:
+        for row in rows:
+            for column in row.pop(SPILL_ABSENT_COLUMN) or ():
+                del row[column]
+    return rows
+
+def is_records(value):
+    return isinstance(value, list) and all(isinstance(row, dict) for row in value)
+
+def write_spill(path, payload):
+    """Write a payload as Arrow IPC files: one per list of records, the rest as JSON. Returns bytes written."""
+    import pyarrow as pa
+    parts = {"rows": payload} if is_records(payload) else {k: v for k, v in payload.items() if is_records(v)}
+    rest = {} if is_records(payload) else {k: v for k, v in payload.items() if k not in parts}
+    os.makedirs(path, exist_ok=True)
+    for name, rows in parts.items():
+        table = records_table(pa, rows)
+        with pa.OSFile(os.path.join(path, f"{name}.arrow"), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    with open(os.path.join(path, "payload.json"), "w") as f:
+        json.dump({"records": is_records(payload), "parts": list(parts), "rest": rest}, f, default=str)
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+def read_spill(path):
+    """Rebuild a spilled payload from its Arrow and JSON files (the rows come back as Python objects)."""
+    import pyarrow as pa
+    with open(os.path.join(path, "payload.json"), "r") as f:
+        layout = json.load(f)
+    parts = {}
+    for name in layout["parts"]:
+        with pa.OSFile(os.path.join(path, f"{name}.arrow"), "rb") as source:
+            parts[name] = table_records(pa.ipc.open_file(source).read_all())
+    return parts["rows"] if layout["records"] else {**layout["rest"], **parts}
+
+def result_cache():
+    """This session's result cache: {(slot, key): {"payload", "bytes", ...}} in LRU order."""
+    if 'result_cache' not in st.session_state:
+        cache = ResultCache()
+        result_governor().register(cache)
+        st.session_state.result_cache = cache
+    return st.session_state.result_cache
+
+def estimate_bytes(payload):
+    """Approximate in-memory size of a result payload."""
+    return len(json.dumps(payload, default=str))
+
+def cache_results(slot, key, payload, query=None, options=None, complete=False, partial=False):
+    """Store a tool's latest result set; empty payloads just clear what the slot shows.
+    
+    `query` (a QueryAST), `options` (everything else that shapes the results) and `complete`
+    (Google had no more results) let narrower searches be answered from this entry. `partial`
+    marks the rows of a search that hasn't finished (or was stopped).
+    """
+    cache, governor = result_cache(), result_governor()
+    with governor.lock:
+        if not payload:
+            cache.current.pop(slot, None)
+            return
+        if (slot, key) in cache:
+            governor.drop(cache, (slot, key))
+        cache[(slot, key)] = {"payload": payload, "bytes": estimate_bytes(payload), "used": time.monotonic(),
+                              "spilled": None, "disk_bytes": 0,
+                              "query": query, "options": options, "complete": complete, "partial": partial}
+        cache.current[slot] = key
+        governor.enforce(cache)
+
+def cached_results(slot, key=None):
+    """Return (payload, key) for `key` if cached, else the slot's most recent result set, else (None, None)."""
+    cache, governor = result_cache(), result_governor()
+    with governor.lock:
+        for candidate in (key, cache.current.get(slot)):
+            if candidate is not None and (slot, candidate) in cache:
+                payload = governor.load(cache, (slot, candidate))
+                if payload is not None:
+                    cache.current[slot] = candidate
+                    return payload, candidate
+    return None, None
+
+def results_partial(slot, key):
+    """True if the cached result set for `key` is the unranked rows of an unfinished search."""
+    cache, governor = result_cache(), result_governor()
+    with governor.lock:
+        entry = cache.get((slot, key))
+    return bool(entry and entry["partial"])
+
+def reuse_cached_results(slot, key, query, options):
+    """Answer a search from a complete cached result set of an equivalent or broader query.
+    
+    The broader rows are filtered locally and cached under `key`. Returns True if it did.
+    """
+    cache = result_cache()
+    for (entry_slot, entry_key), entry in reversed(list(cache.items())):
+        if (entry_slot == slot and entry["complete"] and entry["options"] == options
+                and query_covers(entry["query"], query)):
+            payload = result_governor().load(cache, (entry_slot, entry_key)) or []
+            rows = [row for row in payload if query_matches_row(query, row)]
+            if not rows:
+                return False
+            cache_results(slot, key, rows, query=query, options=options, complete=True)
+            st.toast(f"Answered from cached results for `{entry_key.split(' | ')[0]}` (no quota used)")
+            return True
+    return False
+
+# --- PROGRESSIVE RESULTS ---
+# Searches stream each page (or company) into a live table as it arrives instead of
+# waiting for the whole run. Every batch is deduplicated against what is already shown and
+# the partial result set is cached (marked partial until a full search replaces it), so
+# pressing Stop (or any other widget, which interrupts the run) leaves the rows found so far
+# on screen.
+def job_row(item):
+    """Table row for one Jobs tab result."""
+    link = item.get('link', '#')
+    _, company = result_company(item)
+    source = "Other"
+    
+    if "greenhouse.io" in link:
+        source = "Greenhouse"
+    elif "lever.co" in link:
+        source = "Lever"
+    elif "linkedin.com" in link:
+        source = "LinkedIn"
+    elif "myworkdayjobs.com" in link:
+        source = "Workday"
+    
+    row = {
+        "Title": item.get('title', 'N/A'),
+        "Company": company,
+        "Source": source,
+        **taxonomy_columns(item),
+        "Remote": is_remote(item),
+        "Score": item.get('score', 0.0),
+        "Link": link
+    }
+    row.update(enriched_columns(item))
+    return row
+
+def people_row(item):
+    """Table row for one People tab result (record_people has already learned its company)."""
+    person = parse_profile(item)
+    company_id = company_index().lookup(person["company"]) if person["company"] else None
+    return {
+        "Name": person["name"] or "Unknown",
+        "Title": person["headline"],
+        "Company": company_index().name(company_id) if company_id else "",
+        "Location": person["location"],
+        "Profile": item.get('link', '')
+    }
+
+class ProgressiveResults:
+    """Live table for a running search: dedupes each batch against what's shown and appends it."""
+    
+    def __init__(self, slot, key, to_row, column_config=None, to_payload=list):
+        self.slot, self.key, self.to_row, self.to_payload = slot, key, to_row, to_payload
+        self.column_config = column_config
+        self.deduper = ResultDeduper()
+        self.items, self.rows = [], []
+        self.raw_count = self.duplicates = 0
+        self.status = st.empty()
+        self.stop = st.empty()
+        self.stop.button("⏹ Stop", key=f"{slot}_stop")
+        self.table = st.empty()
+    
+    def add(self, results, step):
+        """Show one batch of raw results. Returns the ones that weren't duplicates."""
+        fresh = extract_fields(self.deduper.add(results))
+        self.raw_count += len(results)
+        self.duplicates += len(results) - len(fresh)
+        self.items.extend(fresh)
+        self.rows.extend(self.to_row(item) for item in fresh)
+        self.status.caption(f"⏳ {step} · {len(fresh)} new, {len(results) - len(fresh)} duplicates · "
+                            f"{len(self.rows)} unique so far ({self.duplicates} duplicates skipped)")
+        if self.rows:
+            self.table.dataframe(pd.DataFrame(self.rows), column_config=self.column_config,
+                                 use_container_width=True, hide_index=True)
+            cache_results(self.slot, self.key, self.to_payload(self.rows), partial=True)
+        return fresh
+    
+    def finish(self):
+        """Clear the live view; the caller renders the final, ranked table."""
+        for placeholder in (self.status, self.stop, self.table):
+            placeholder.empty()
+
+# --- EXPORT FUNCTIONS ---
+EXPORT_CHUNK_ROWS = 5000
+DEFERRED_DOWNLOADS = Version(st.__version__) >= Version("1.52.0")  # download_button accepts a callable for data
+EXPORT_FORMATS = {
+    "CSV": {"ext": "csv", "mime": "text/csv"},
+    "JSONL": {"ext": "jsonl", "mime": "application/x-ndjson"},
+    "Excel": {"ext": "xlsx", "mime": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"},
+    "Parquet": {"ext": "parquet", "mime": "application/vnd.apache.parquet"}
+}
+
+def write_csv(df, output, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Write a DataFrame as CSV in row chunks so the full text is never held twice."""
+    for offset in range(0, max(len(df), 1), chunk_rows):
+        chunk = df.iloc[offset:offset + chunk_rows]
+        output.write(chunk.to_csv(index=False, header=(offset == 0)).encode('utf-8'))
+
+def write_jsonl(df, output, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Write a DataFrame as JSON Lines (one record per line) in row chunks."""
+    for offset in range(0, len(df), chunk_rows):
+        chunk = df.iloc[offset:offset + chunk_rows]
+        text = chunk.to_json(orient='records', lines=True, date_format='iso', force_ascii=False).rstrip('\n')
+        output.write((text + '\n').encode('utf-8'))
+
+def write_excel(sheets, output):
+    """Write one or more DataFrames as sheets of a workbook, streaming rows when xlsxwriter is available."""
+    try:
+        import xlsxwriter  # noqa: F401
+        engine, writer_kwargs = 'xlsxwriter', {'engine_kwargs': {'options': {'constant_memory': True}}}
+    except ImportError:
+        engine, writer_kwargs = 'openpyxl', {}
+    with pd.ExcelWriter(output, engine=engine, **writer_kwargs) as writer:
+        for sheet_name, frame in sheets.items():
+            frame.to_excel(writer, index=False, sheet_name=sheet_name[:31])
+
+def export_dataframe(sheets, fmt):
+    """Serialize {sheet name: DataFrame} to bytes for a download button.
+    
+    Single-table formats export the first sheet. The writers stream into a temporary file,
+    which is read back once and closed, so no file handle outlives the export.
+    """
+    primary = next(iter(sheets.values()))
+    with tempfile.TemporaryFile() as output:
+        if fmt == "CSV":
+            write_csv(primary, output)
+        elif fmt == "JSONL":
+            write_jsonl(primary, output)
+        elif fmt == "Excel":
+            write_excel(sheets, output)
+        elif fmt == "Parquet":
+            primary.to_parquet(output, index=False)
+        output.seek(0)
+        return output.read()
+
+def render_export(df, file_stem, key, sheets=None, label="📥 Download", use_container_width=False):
+    """Render a download menu whose files are only generated when a format is clicked."""
+    sheets = sheets or {"Results": df}
+    with st.popover(label, use_container_width=use_container_width):
+        for fmt, spec in EXPORT_FORMATS.items():
+            if fmt != "Excel" and len(sheets) > 1:
+                caption = f"{fmt} (first sheet)"
+            elif fmt == "Excel" and len(sheets) > 1:
+                caption = f"Excel ({len(sheets)} sheets)"
+            else:
+                caption = fmt
+            file_name = f"{file_stem}.{spec['ext']}"
+            if DEFERRED_DOWNLOADS:
+                # Deferred: the callable only runs when this button is clicked
+                st.download_button(caption, lambda fmt=fmt: export_dataframe(sheets, fmt), file_name, spec['mime'],
+                                   key=f"{key}_{spec['ext']}", on_click="ignore", use_container_width=True)
+            elif fmt == "CSV":
+                # Older Streamlit builds the file on every rerun, so only offer the cheapest format
+                st.download_button(caption, export_dataframe(sheets, fmt), file_name, spec['mime'],
+                                   key=f"{key}_{spec['ext']}", use_container_width=True)
+
+# --- GOOGLE SEARCH ---
+# Responses are cached across tenants, so the same query from different people within
+# RESPONSE_CACHE_SECONDS costs quota once. Every request (cached or not) is also logged per
+# tenant and day; the overnight prefetch ranks tomorrow's likely requests from that log.
+RESPONSE_CACHE_SECONDS = 6 * 3600
+RESPONSE_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    fetched_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    body TEXT NOT NULL,
+    prefetched TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_responses_expires ON responses (expires_at);
+CREATE TABLE IF NOT EXISTS request_log (
+    tenant TEXT NOT NULL,
+    key TEXT NOT NULL,
+    day TEXT NOT NULL,
+    query TEXT NOT NULL,
+    num INTEGER,
+    date_restrict TEXT,
+    start INTEGER,
+    hits INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (tenant, key, day)
+);
+CREATE INDEX IF NOT EXISTS idx_request_log_day ON request_log (day);
+"""
+
+def response_cache_connection():
+    conn = sqlite3.connect(RESPONSE_CACHE_DB, timeout=30)
+    conn.executescript(RESPONSE_CACHE_SCHEMA)
+    return conn
+
+def response_cache_key(query, num_results, date_restrict, start):
+    """Key for one Custom Search request: reordered terms, sites or OR groups share an entry.
+    
+    Same canonical_query as the session result cache (whitespace-normalized text for queries
+    it can't parse), so semantically identical requests cost quota once across tenants.
+    """
+    request = json.dumps([canonical_query(query), num_results, date_restrict or "", start])
+    return hashlib.sha1(request.encode('utf-8')).hexdigest()
+
+def cached_response(key):
+    """A fresh cached response for `key`, or None."""
+    with closing(response_cache_connection()) as conn:
+        row = conn.execute("SELECT body, prefetched FROM responses WHERE key = ? AND expires_at > ?",
+                           (key, time.time())).fetchone()
+        if row and row[1]:
+            with conn:  # count prefetch hits so the sidebar can show what it saved
+                conn.execute("UPDATE prefetch_runs SET hits = hits + 1 WHERE day = ?", (row[1],))
+    return json.loads(row[0]) if row else None
+
+def store_response(key, data, expires_at=None, prefetched=None):
+    """Cache a response and drop expired ones."""
+    now = time.time()
+    with closing(response_cache_connection()) as conn, conn:
+        conn.execute("INSERT OR REPLACE INTO responses (key, fetched_at, body, expires_at, prefetched) "
+                     "VALUES (?, ?, ?, ?, ?)",
+                     (key, now, json.dumps(data), expires_at or now + RESPONSE_CACHE_SECONDS, prefetched))
+        conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+
+def log_request(key, query, num_results, date_restrict, start):
+    """Count one request by the current tenant today (cache hits included)."""
+    with closing(response_cache_connection()) as conn, conn:
+        conn.execute(
+            "INSERT INTO request_log (tenant, key, day, query, num, date_restrict, start, hits) VALUES (?, ?, ?, ?, ?, ?, ?, 1) "
+            "ON CONFLICT (tenant, key, day) DO UPDATE SET hits = hits + 1",
+            (current_tenant(), key, datetime.now().strftime("%Y-%m-%d"), query, num_results, date_restrict, start)
+        )
+
+def google_search(query, num_results=10, date_restrict=None, start=1):
+    """Search Google Custom Search API with pagination support."""
+    return google_search_response(query, num_results=num_results, date_restrict=date_restrict, start=start).get('items', [])
+
+def fetch_search(query, num_results=10, date_restrict=None, start=1):
+    """One paid Custom Search request, charged to the current tenant. Raises on HTTP errors."""
+    url = "https://www.googleapis.com/customsearch/v1"
+    params = {
+        'key': API_KEY, 
+        'cx': SEARCH_ENGINE_ID, 
+        'q': query, 
+        'num': num_results,
+        'start': start  # Pagination: 1-based index
+    }
+    if date_restrict: 
+        params['dateRestrict'] = date_restrict
+    
+    response = requests.get(url, params=params)
+    response.raise_for_status()
+    
+    # Only increment if successful
+    increment_quota()
+    return response.json()
+
+class SearchFailed(Exception):
+    """A search that got no response: out of quota, or an HTTP/network error."""
+    
+    def __init__(self, message, quota_exhausted=False):
+        super().__init__(message)
+        self.quota_exhausted = quota_exhausted
+
+def search_failed(message, quota_exhausted=False):
+    """Show a failed search, or raise it in a background job so the sub-query isn't checkpointed as empty."""
+    if getattr(TENANT_CONTEXT, "tenant", None):
+        raise SearchFailed(message, quota_exhausted)
+    st.error(message)
+    return {}
+
+@profiled("network: google_search")
+def google_search_response(query, num_results=10, date_restrict=None, start=1):
+    """Search Google Custom Search API and return the full JSON response (items + searchInformation)."""
+    # 1. Another tenant (or last night's prefetch) may already have paid for this exact request
+    cache_key = response_cache_key(query, num_results, date_restrict, start)
+    log_request(cache_key, query, num_results, date_restrict, start)
+    cached = cached_response(cache_key)
+    if cached is not None:
+        return cached
+    
+    # 2. Check Quota
+    tenant_left, global_left, _ = quota_budgets()
+    if global_left <= 0:
+        return search_failed(f"🚨 Daily Quota Exceeded ({DAILY_LIMIT}/{DAILY_LIMIT}). Try again tomorrow!", quota_exhausted=True)
+    if tenant_left <= 0:
+        return search_failed(f"🚨 Your daily share of the quota is used up ({TENANT_DAILY_LIMIT}/{TENANT_DAILY_LIMIT}). "
+                             "Try again tomorrow!", quota_exhausted=True)
+
+    try:
+        data = fetch_search(query, num_results, date_restrict, start)
+    except Exception as e:
+        return search_failed(f"Error: {e}")
+    store_response(cache_key, data)
+    return data
+
+# --- RESULT ENRICHMENT ---
+# Fetching and parsing live in docs/ats_fetch.py, importable (and testable) without Streamlit
+ENRICHED_DISPLAY_COLUMNS = {
+    "postedDate": "Posted",
+    "location": "Location",
+    "employmentType": "Type",
+    "salaryMin": "Salary Min",
+    "salaryMax": "Salary Max",
+    "salaryPeriod": "Per"
+}
+
+@profiled("network: enrichment")
+def enrich_results(results, cache_path=PAGE_CACHE_DB, workers=ENRICH_WORKERS):
+    """Fetch posting details for search results and store them under item['enriched'].
+    
+    Greenhouse and Lever results are resolved through one board-level JSON request per
+    company; everything else falls back to the posting page's JSON-LD. Returns fetch stats.
+    """
+    sources = {}
+    for item in results:
+        link = item.get('link', '')
+        if link.startswith('http'):
+            sources[id(item)] = enrichment_source(link)
+    
+    cache = PageCache(cache_path)
+    fetcher = PageFetcher(cache, workers=workers)
+    try:
+        bodies = fetcher.fetch_many([url for _, url, _ in sources.values()], workers=workers)
+    finally:
+        fetcher.close()
+        cache.close()
+    
+    # Index board payloads by job id once per board
+    boards = {}
+    for kind, url, _ in set(sources.values()):
+        if kind == "html" or url in boards:
+            continue
+        try:
+            payload = json.loads(bodies.get(url) or 'null')
+        except ValueError:
+            payload = None
+        if kind == "greenhouse":
+            jobs = (payload or {}).get("jobs", []) if isinstance(payload, dict) else []
+            boards[url] = {str(job.get("id")): parse_greenhouse_job(job) for job in jobs}
+        else:
+            postings = payload if isinstance(payload, list) else []
+            boards[url] = {str(p.get("id")): parse_lever_posting(p) for p in postings}
+    
+    for item in results:
+        if id(item) not in sources:
+            continue
+        kind, url, job_id = sources[id(item)]
+        if kind == "html":
+            fields = parse_job_posting_html(bodies.get(url))
+        else:
+            fields = boards.get(url, {}).get(job_id, {})
+        item['enriched'] = {k: v for k, v in fields.items() if v not in (None, "")}
+    
+    return fetcher.stats
+
+def enriched_columns(item):
+    """Display columns for a result's typed fields (empty strings when unknown)."""
+    fields = posting_fields(item)
+    return {label: fields.get(field, "") for field, label in ENRICHED_DISPLAY_COLUMNS.items()}
+
+# --- ATS BOARD INGESTION ---
+# Greenhouse, Lever and Ashby publish complete public job boards, so companies on
+# those platforms can be harvested in one request per board without spending quota.
+ATS_BOARD_PLATFORMS = {
+    "greenhouse": {"site": "site:boards.greenhouse.io", "source": "Greenhouse"},
+    "lever": {"site": "site:jobs.lever.co", "source": "Lever"},
+    "ashby": {"site": "site:jobs.ashbyhq.com", "source": "Ashby"}
+}
+BOARD_RESOLVE_RETRY_DAYS = 7
+DATE_RESTRICT_DAYS = {"d1": 1, "d3": 3, "w1": 7, "m1": 31, "m3": 92}
+BOARDS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS boards (
+    company_key TEXT PRIMARY KEY,
+    company TEXT,
+    platform TEXT,
+    slug TEXT,
+    resolved_at TEXT
+);
+CREATE TABLE IF NOT EXISTS board_jobs (
+    platform TEXT NOT NULL,
+    slug TEXT NOT NULL,
+    job_id TEXT NOT NULL,
+    title TEXT,
+    url TEXT,
+    fields TEXT,
+    first_seen TEXT,
+    last_seen TEXT,
+    closed_at TEXT,
+    PRIMARY KEY (platform, slug, job_id)
+);
+"""
+
+def boards_connection():
+    """Open the ATS board store."""
+    conn = sqlite3.connect(ATS_BOARDS_DB)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(BOARDS_SCHEMA)
+    return conn
+
+def candidate_slugs(company):
+    """Board slugs a company is likely published under, canonical name first ('PANW' -> paloaltonetworks, ...)."""
+    canonical = company_index().name(canonical_company_key(company)) or company.strip()
+    names = [canonical, company.strip(), COMPANY_SUFFIX_RE.sub('', company.strip()).strip(' ,')]
+    for name, extra in COMPANY_ALIASES.items():
+        if normalize_company_key(name) == normalize_company_key(canonical):
+            names += [name] + extra
+    return board_slugs(names)
+
+def resolve_boards(conn, companies, fetcher, platforms):
+    """Resolve companies to (platform, slug) once, probing candidate boards concurrently for unknowns.
+    
+    Only definitive answers are stored; a company whose probes hit a network error is probed
+    again next time instead of being remembered as having no board.
+    """
+    resolved = {}
+    to_probe = []
+    retry_before = (datetime.now() - timedelta(days=BOARD_RESOLVE_RETRY_DAYS)).strftime("%Y-%m-%d %H:%M:%S")
+    for company in companies:
+        row = conn.execute("SELECT platform, slug, resolved_at FROM boards WHERE company_key = ?",
+                           (canonical_company_key(company),)).fetchone()
+        if row and row["platform"]:
+            resolved[company] = (row["platform"], row["slug"])
+        elif not row or row["resolved_at"] < retry_before:
+            to_probe.append(company)
+    
+    probes = {company: [(platform, slug) for platform in platforms for slug in candidate_slugs(company)]
+              for company in to_probe}
+    found, retry = probe_boards(fetcher, probes)
+    
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    with conn:
+        for company, board in found.items():
+            if board:
+                resolved[company] = board
+                company_index().link(board[1], canonical_company_key(company), "slug")
+            if company not in retry:
+                conn.execute("INSERT OR REPLACE INTO boards (company_key, company, platform, slug, resolved_at) VALUES (?, ?, ?, ?, ?)",
+                             (canonical_company_key(company), company, *(board or (None, None)), now))
+    
+    # Only platforms the caller asked for
+    return {company: board for company, board in resolved.items() if board[0] in platforms}
+
+def refresh_board(conn, platform, slug, jobs):
+    """Reconcile a fetched board with stored job ids. Returns (new, closed) counts."""
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    known = {row["job_id"] for row in conn.execute(
+        "SELECT job_id FROM board_jobs WHERE platform = ? AND slug = ? AND closed_at IS NULL", (platform, slug))}
+    current = {job["id"]: job for job in jobs}
+    new_ids = current.keys() - known
+    closed_ids = known - current.keys()
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO board_jobs (platform, slug, job_id, title, url, fields, first_seen, last_seen) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(platform, slug, i, current[i]["title"], current[i]["url"], json.dumps(current[i]["fields"]), now, now) for i in new_ids]
+        )
+        conn.executemany("UPDATE board_jobs SET last_seen = ? WHERE platform = ? AND slug = ? AND job_id = ?",
+                         [(now, platform, slug, i) for i in current.keys() & known])
+        conn.executemany("UPDATE board_jobs SET closed_at = ? WHERE platform = ? AND slug = ? AND job_id = ?",
+                         [(now, platform, slug, i) for i in closed_ids])
+    return len(new_ids), len(closed_ids)
+
+def ats_board_search(companies, job_titles, platforms=None, date_restrict=None):
+    """Harvest matching jobs straight from companies' public ATS boards (no quota).
+    
+    Returns (results, company_stats, unresolved companies). Results use the same shape as
+    Custom Search items (title/link/snippet) plus 'search_company' and 'enriched' fields.
+    """
+    platforms = platforms or list(ATS_BOARD_PLATFORMS)
+    titles = [t.lower() for t in job_titles]
+    max_age = DATE_RESTRICT_DAYS.get(date_restrict)
+    today = datetime.now().date()
+    results, company_stats = [], {}
+    
+    cache = PageCache(PAGE_CACHE_DB)
+    fetcher = PageFetcher(cache)
+    try:
+        with closing(boards_connection()) as conn:
+            resolved = resolve_boards(conn, companies, fetcher, platforms)
+            bodies = fetcher.fetch_many([board_url(p, slug) for p, slug in resolved.values()])
+            
+            for company, (platform, slug) in resolved.items():
+                jobs = parse_board(platform, bodies.get(board_url(platform, slug))) or []
+                refresh_board(conn, platform, slug, jobs)
+                matches = []
+                for job in jobs:
+                    if titles and not any(t in job["title"].lower() for t in titles):
+                        continue
+                    posted = job["fields"].get("postedDate")
+                    if max_age and posted:
+                        try:
+                            if (today - datetime.strptime(posted, "%Y-%m-%d").date()).days > max_age:
+                                continue
+                        except ValueError:
+                            pass
+                    matches.append({
+                        "title": job["title"],
+                        "link": job["url"],
+                        "snippet": job["fields"].get("location") or "",
+                        "search_company": company,
+                        "enriched": {k: v for k, v in job["fields"].items() if v not in (None, "")},
+                        "backend": platform
+                    })
+                company_stats[company] = len(matches)
+                results.extend(matches)
+    finally:
+        fetcher.close()
+        cache.close()
+    
+    unresolved = [c for c in companies if c not in resolved]
+    return results, company_stats, unresolved
+
+# --- QUOTA SCHEDULING ---
+# Every Custom Search call costs one unit of the daily quota. Runs are priced before they
+# start so the bill is shown up front, and queued jobs only start a sub-query when its
+# worst-case cost still fits today's budget; anything that doesn't waits for the next window.
+JOB_PRIORITIES = {"High": 2, "Normal": 1, "Low": 0}
+
+def next_quota_window(now=None):
+    """When the daily quota resets (local midnight, matching get_quota_status)."""
+    return datetime.combine((now or datetime.now()).date() + timedelta(days=1), datetime.min.time())
+
+def known_board_companies(companies, ats_sites):
+    """Companies already resolved to a board on a selected platform (harvested without quota)."""
+    platforms = [p for p, spec in ATS_BOARD_PLATFORMS.items() if spec["site"] in ats_sites]
+    if not platforms or not os.path.exists(ATS_BOARDS_DB):
+        return set()
+    with closing(boards_connection()) as conn:
+        rows = conn.execute(
+            f"SELECT company_key FROM boards WHERE platform IN ({','.join('?' * len(platforms))})", platforms
+        ).fetchall()
+    board_keys = {row["company_key"] for row in rows}
+    return {c for c in companies if canonical_company_key(c) in board_keys}
+
+def unit_cost(kind, params, unit, on_boards=frozenset()):
+    """(min, max) quota cost of one job sub-query."""
+    if kind == "competitor":
+        return len(unit), len(unit)
+    unit = [c for c in unit if c not in on_boards]
+    if not unit:
+        return 0, 0
+    if not params.get("pack"):
+        return len(unit), len(unit)
+    # One packed query, plus a follow-up for each company that fills its share of a full page
+    return 1, 1 + (len(unit) if len(unit) > 1 else 0)
+
+def estimate_cost(kind, params, units=None):
+    """(min, max) quota cost of a planned run: pages, or sub-queries x companies."""
+    if kind == "pages":
+        return params["pages"], params["pages"]
+    units = job_units(kind, params) if units is None else units
+    on_boards = known_board_companies(params["companies"], params["ats_sites"]) if params.get("use_boards") else set()
+    costs = [unit_cost(kind, params, unit, on_boards) for unit in units]
+    return sum(c[0] for c in costs), sum(c[1] for c in costs)
+
+def scheduled_cost():
+    """Worst-case quota still needed by the current tenant's queued, running and deferred jobs."""
+    with closing(jobs_connection()) as conn:
+        ids = [row["id"] for row in conn.execute(
+            "SELECT id FROM jobs WHERE tenant = ? AND status IN ('queued', 'running', 'deferred')", (current_tenant(),)
+        )]
+    total = 0
+    for job_id in ids:
+        job = get_job(job_id)
+        units = job_units(job["kind"], job["params"])[job["progress_done"]:]
+        total += estimate_cost(job["kind"], job["params"], units)[1] if units else 0
+    return total
+
+def format_cost(cost):
+    low, high = cost
+    return (f"{low}" if low == high else f"{low}–{high}") + (" search" if high == 1 else " searches")
+
+def render_quota_cost(cost, note=""):
+    """Show a run's quota cost before it starts. Returns True if today's remaining budget covers it."""
+    remaining, _ = get_quota_status()
+    backlog = scheduled_cost()
+    queued = f" Queued jobs need up to {backlog} more." if backlog else ""
+    if cost[1] <= remaining:
+        st.caption(f"💰 Costs {format_cost(cost)} of the {remaining} left today.{queued}")
+        return True
+    st.warning(f"💰 Costs {format_cost(cost)} but only {remaining} are left today. {note}".strip())
+    return False
+
+# --- BACKGROUND JOBS ---
+# Long Batch Company Search and Competitor Analysis runs go through a persistent SQLite
+# queue. Worker threads checkpoint after every sub-query, so a job interrupted by a
+# restart resumes where it stopped, and the UI polls progress instead of blocking.
+JOB_WORKERS = 2
+JOB_POLL_SECONDS = 1.0
+JOBS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tenant TEXT NOT NULL DEFAULT 'default',
+    kind TEXT NOT NULL,
+    label TEXT,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    priority INTEGER DEFAULT 1,
+    run_after TEXT,
+    progress_done INTEGER DEFAULT 0,
+    progress_total INTEGER DEFAULT 0,
+    checkpoint TEXT,
+    error TEXT,
+    created_at TEXT,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs (status, priority, id);
+CREATE INDEX IF NOT EXISTS idx_jobs_tenant ON jobs (tenant, id);
+"""
+
+def jobs_connection():
+    """Open the background job queue."""
+    conn = sqlite3.connect(JOBS_DB, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(JOBS_SCHEMA)
+    return conn
+
+def job_units(kind, params):
+    """Split a job into checkpointable sub-queries (company groups)."""
+    if kind == "batch" and params.get("pack"):
+        title_query = ' OR '.join([f'"{t}"' for t in params["job_titles"]])
+        return pack_companies(params["companies"], f'({" OR ".join(params["ats_sites"])}) ({title_query})')
+    return [[company] for company in params["companies"]]
+
+def run_job_unit(kind, params, unit):
+    """Run one sub-query of a job. Returns (result rows, per-company stats); raises SearchFailed."""
+    if kind == "batch":
+        results, stats = batch_company_search(
+            unit, params["job_titles"], params["ats_sites"],
+            num_results=params["num_results"], date_restrict=params["date_restrict"],
+            pack=params["pack"], use_boards=params["use_boards"]
+        )
+        archive_results(deduplicate_results(results), "Batch", f'{", ".join(unit)}: {" OR ".join(params["job_titles"])}')
+        record_batch_postings(results)
+        return results, stats
+    analysis_data, sampled_items = competitor_hiring_analysis(unit, params["role"], params["platforms"], params["timeframes"])
+    # Keep every successful observation so trends can be charted later without re-querying
+    for company, items in sampled_items.items():
+        record_hiring_counts(company, params["role"], params["platforms"],
+                             [row for row in analysis_data if row["Company"] == company], items)
+    return analysis_data, {}
+
+def submit_job(kind, params, label, priority=JOB_PRIORITIES["Normal"]):
+    """Queue a background job and return its id."""
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    with closing(jobs_connection()) as conn, conn:
+        cursor = conn.execute(
+            "INSERT INTO jobs (tenant, kind, label, params, priority, progress_total, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (current_tenant(), kind, label, json.dumps(params), priority, len(job_units(kind, params)), now, now)
+        )
+    job_runner()  # make sure workers are running
+    return cursor.lastrowid
+
+def get_job(job_id):
+    """Load a job with its params and checkpoint decoded."""
+    with closing(jobs_connection()) as conn:
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    if not row:
+        return None
+    job = dict(row)
+    job["params"] = json.loads(job["params"])
+    job["checkpoint"] = json.loads(job["checkpoint"] or '{"results": [], "stats": {}}')
+    return job
+
+def list_jobs(limit=10):
+    """The current tenant's most recent jobs (without their checkpoints)."""
+    with closing(jobs_connection()) as conn:
+        rows = conn.execute(
+            "SELECT id, kind, label, status, priority, run_after, progress_done, progress_total, error, created_at "
+            "FROM jobs WHERE tenant = ? ORDER BY id DESC LIMIT ?",
+            (current_tenant(), limit)
+        ).fetchall()
+    return [dict(row) for row in rows]
+
+def set_job_status(job_id, status, error=None, run_after=None):
+    """Cancel, defer or re-queue (resume) a job."""
+    with closing(jobs_connection()) as conn, conn:
+        conn.execute("UPDATE jobs SET status = ?, error = ?, run_after = ?, updated_at = ? WHERE id = ?",
+                     (status, error, run_after, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), job_id))
+
+class JobRunner:
+    """Worker threads that claim queued jobs by priority and checkpoint after each sub-query.
+    
+    Before a sub-query starts, its worst-case cost is reserved against both its tenant's and
+    the global remaining daily quota. If it doesn't fit, the job is deferred to the next quota
+    window rather than running a sub-query that would be cut off halfway.
+    """
+    
+    def __init__(self, workers=JOB_WORKERS):
+        self.reserved = Counter()  # per tenant
+        self.budget_lock = threading.Lock()
+        # Anything still 'running' was interrupted by a restart: queue it again to resume
+        with closing(jobs_connection()) as conn, conn:
+            conn.execute("UPDATE jobs SET status = 'queued' WHERE status = 'running'")
+        self.threads = [threading.Thread(target=self.loop, daemon=True, name=f"job-worker-{i}") for i in range(workers)]
+        for thread in self.threads:
+            thread.start()
     
-    # Must exclude (NOT logic)
-    if must_exclude:
-        terms = [t.strip() for t in must_exclude.split(',') if t.strip()]
-        if terms:
-            query_parts.extend([f'-{t}' if ' ' not in t else f'-"{t}"' for t in terms])
+    def claim(self):
+        """Atomically move the oldest queued job to running."""
+        with closing(jobs_connection()) as conn:
+            conn.isolation_level = None
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status IN ('queued', 'deferred') AND (run_after IS NULL OR run_after <= ?) "
+                "ORDER BY priority DESC, id LIMIT 1",
+                (datetime.now().strftime("%Y-%m-%d %H:%M:%S"),)
+            ).fetchone()
+            if row:
+                conn.execute("UPDATE jobs SET status = 'running', run_after = NULL, error = NULL WHERE id = ?", (row["id"],))
+            conn.execute("COMMIT")
+        return row["id"] if row else None
     
-    return ' '.join(query_parts)
-
-# --- BATCH COMPANY SEARCH ---
-def batch_company_search(companies, job_titles, ats_sites, num_results=10, date_restrict=None):
-    """Search multiple companies at once and aggregate results."""
-    all_results = []
-    company_stats = {}
+    def reserve(self, tenant, cost):
+        """Hold quota for a sub-query so concurrent jobs can't start work the budget can't finish."""
+        with self.budget_lock:
+            tenant_left, global_left, _ = quota_budgets(tenant)
+            if cost > tenant_left - self.reserved[tenant] or cost > global_left - sum(self.reserved.values()):
+                return False
+            self.reserved[tenant] += cost
+            return True
     
-    for company in companies:
-        company = company.strip()
-        if not company:
-            continue
-        
-        # Build query for this company
-        if len(job_titles) == 1:
-            title_query = f'"{job_titles[0]}"'
-        else:
-            title_query = '(' + ' OR '.join([f'"{t}"' for t in job_titles]) + ')'
-        
-        search_query = f'({" OR ".join(ats_sites)}) "{company}" {title_query}'
+    def release(self, tenant, cost):
+        with self.budget_lock:
+            self.reserved[tenant] -= cost
+    
+    def loop(self):
+        while True:
+            job_id = self.claim()
+            if job_id is None:
+                time.sleep(JOB_POLL_SECONDS)
+                continue
+            try:
+                self.run(job_id)
+            except Exception as e:
+                set_job_status(job_id, "failed", str(e))
+            finally:
+                TENANT_CONTEXT.tenant = None
+    
+    def run(self, job_id):
+        job = get_job(job_id)
+        TENANT_CONTEXT.tenant = job["tenant"]  # quota and journal writes are charged to the submitter
+        units = job_units(job["kind"], job["params"])
+        checkpoint = job["checkpoint"]
         
-        # Search
-        results = google_search(search_query, num_results=num_results, date_restrict=date_restrict)
+        params = job["params"]
+        on_boards = known_board_companies(params["companies"], params["ats_sites"]) if params.get("use_boards") else set()
         
-        # Track stats per company
-        company_stats[company] = len(results)
+        for index in range(job["progress_done"], len(units)):
+            current = get_job(job_id)
+            if current["status"] != "running":
+                return
+            if index > job["progress_done"] and self.higher_priority_waiting(current["priority"]):
+                set_job_status(job_id, "queued")  # yield the worker; resumes from the checkpoint
+                return
+            
+            _, cost = unit_cost(job["kind"], params, units[index], on_boards)
+            if not self.reserve(job["tenant"], cost):
+                run_after = next_quota_window().strftime("%Y-%m-%d %H:%M:%S")
+                set_job_status(job_id, "deferred", f"Out of today's quota; continues after {run_after}", run_after)
+                return
+            try:
+                results, stats = run_job_unit(job["kind"], params, units[index])
+            except SearchFailed as e:
+                # Leave the sub-query unchecked; pages it already paid for are in the response cache
+                if e.quota_exhausted:
+                    run_after = next_quota_window().strftime("%Y-%m-%d %H:%M:%S")
+                    set_job_status(job_id, "deferred", f"Out of today's quota; continues after {run_after}", run_after)
+                else:
+                    set_job_status(job_id, "failed", f"Sub-query {index + 1}/{len(units)} failed: {e}")
+                return
+            finally:
+                self.release(job["tenant"], cost)
+            checkpoint["results"].extend(results)
+            checkpoint["stats"].update(stats)
+            with closing(jobs_connection()) as conn, conn:
+                conn.execute(
+                    "UPDATE jobs SET checkpoint = ?, progress_done = ?, updated_at = ? WHERE id = ? AND status = 'running'",
+                    (json.dumps(checkpoint), index + 1, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), job_id)
+                )
         
-        # Tag results with company name
-        for result in results:
-            result['search_company'] = company
-            all_results.append(result)
+        set_job_status(job_id, "done")
     
-    return all_results, company_stats
+    def higher_priority_waiting(self, priority):
+        with closing(jobs_connection()) as conn:
+            return conn.execute(
+                "SELECT 1 FROM jobs WHERE status = 'queued' AND priority > ? LIMIT 1", (priority,)
+            ).fetchone() is not None
 
-# --- DEDUPLICATION ---
-def deduplicate_results(results):
-    """Remove duplicate job listings based on URL and title similarity."""
-    seen_urls = set()
-    seen_titles = set()
-    unique_results = []
+@st.cache_resource
+def job_runner():
+    """Start the worker pool once per server process."""
+    return JobRunner()
+
+def finish_job(job):
+    """Format a finished job's results and put them in its tool's result cache slot."""
+    params, partial = job["params"], job["checkpoint"]
+    if job["kind"] == "batch":
+        payload = build_batch_payload(partial["results"], partial["stats"], params["job_titles"], len(params["companies"]),
+                                      enrich=params["enrich"], boards=params["use_boards"])
+    else:
+        payload = partial["results"]
+    cache_results(job["kind"], params["cache_key"], payload)
+    return payload
+
+@st.fragment(run_every=2)
+def render_job_progress(slot):
+    """Poll a tool's background job, streaming progress and partial stats until it finishes."""
+    job_id = st.session_state.get(f"{slot}_job")
+    job = get_job(job_id) if job_id else None
+    if not job:
+        return
     
-    for item in results:
-        url = item.get('link', '')
-        title = item.get('title', '').lower().strip()
-        
-        # Normalize URL (remove tracking parameters)
-        base_url = url.split('?')[0].rstrip('/')
-        
-        # Create a simple title fingerprint (first 50 chars, lowercase)
-        title_key = ''.join(title[:50].split())
-        
-        # Skip if we've seen this URL or very similar title
-        if base_url in seen_urls:
-            continue
-        if title_key in seen_titles:
-            continue
-            
-        seen_urls.add(base_url)
-        seen_titles.add(title_key)
-        unique_results.append(item)
+    done, total = job["progress_done"], max(job["progress_total"], 1)
+    partial = job["checkpoint"]
+    st.progress(done / total, text=f"⏳ {job['label']}: {done}/{total} sub-queries · {len(partial['results'])} partial results · {job['status']}")
+    if partial["stats"]:
+        st.dataframe(pd.DataFrame([{"Company": c, "Jobs Found": n} for c, n in partial["stats"].items()]),
+                     use_container_width=True, hide_index=True)
+    if job["error"]:
+        st.warning(job["error"])
     
-    return unique_results
+    col1, col2 = st.columns(2)
+    with col1:
+        if job["status"] in ("queued", "running", "deferred") and st.button("⏹️ Cancel", key=f"{slot}_job_cancel"):
+            set_job_status(job_id, "cancelled")
+    with col2:
+        if job["status"] == "deferred" and done and st.button("📂 Use partial results", key=f"{slot}_job_partial"):
+            finish_job(job)
+            st.rerun()
+        if job["status"] not in ("queued", "running", "deferred") and st.button("✖️ Dismiss", key=f"{slot}_job_dismiss"):
+            st.session_state.pop(f"{slot}_job", None)
+            st.rerun()
+    
+    if job["status"] == "done":
+        # Hand over to the full script run, which formats and caches the results
+        st.session_state[f"{slot}_job_finished"] = job_id
+        st.session_state.pop(f"{slot}_job", None)
+        st.rerun()
 
-# --- EXPORT FUNCTIONS ---
-def convert_df_to_csv(df):
-    """Convert DataFrame to CSV for download."""
-    return df.to_csv(index=False).encode('utf-8')
+# --- OVERNIGHT PREFETCH ---
+# Quota left unused at midnight is lost, while the next morning's first searches pay full
+# latency and quota. Shortly before the reset, the leftover is spent on the requests most
+# likely to be asked again, and their responses are kept fresh until late morning.
+PREFETCH_ENABLED = (os.getenv("ATS_PREFETCH") or "on").lower() not in ("0", "off", "false")
+PREFETCH_LEAD_MINUTES = 30       # start this long before the quota resets
+PREFETCH_KEEP_HOURS = 12         # prefetched responses stay fresh until noon after the reset
+PREFETCH_RESERVE = 5             # global searches left untouched for late-night users
+PREFETCH_LOOKBACK_DAYS = 14
+PREFETCH_HALF_LIFE_DAYS = 3      # a request made 3 days ago counts half as much as one made today
+PREFETCH_TEMPLATE_BOOST = 1.5    # queries run from SEARCH_TEMPLATES tend to be re-run
+PREFETCH_EXTEND_SECONDS = 3600   # responses fetched this recently are kept, not fetched again
+PREFETCH_RESTRICT_SHARE = 0.25   # a dateRestrict response is served for at most this share of its window
+PREFETCH_SCHEMA = """
+CREATE TABLE IF NOT EXISTS prefetch_runs (
+    day TEXT PRIMARY KEY,
+    started_at TEXT,
+    finished_at TEXT,
+    candidates INTEGER,
+    fetched INTEGER DEFAULT 0,
+    extended INTEGER DEFAULT 0,
+    hits INTEGER DEFAULT 0,
+    error TEXT
+);
+"""
 
-def convert_df_to_excel(df):
-    """Convert DataFrame to Excel for download."""
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='Results')
-    return output.getvalue()
+def journal_signals(since):
+    """{(tenant, query): (new results per unit, run from a template)} from the search journal."""
+    if not os.path.exists(SEARCH_JOURNAL_DB):
+        return {}
+    with closing(journal_connection()) as conn:
+        rows = conn.execute(
+            "SELECT tenant, query, SUM(COALESCE(new_count, 0)) AS new_results, SUM(COALESCE(quota, 0)) AS quota, "
+            "MAX(template IS NOT NULL) AS templated FROM searches WHERE timestamp >= ? GROUP BY tenant, query",
+            (since,)
+        ).fetchall()
+    return {(row["tenant"], row["query"]): (row["new_results"] / max(row["quota"], 1), bool(row["templated"]))
+            for row in rows}
 
-# --- GOOGLE SEARCH ---
-def google_search(query, num_results=10, date_restrict=None, start=1):
-    """Search Google Custom Search API with pagination support."""
-    # 1. Check Quota First
-    remaining, _ = get_quota_status()
-    if remaining <= 0:
-        st.error("🚨 Daily Quota Exceeded (100/100). Try again tomorrow!")
-        return []
+def prefetch_candidates(now=None):
+    """Logged requests ranked by how likely they are to be asked again tomorrow morning.
+    
+    A request's score is its daily hit count decayed by age (PREFETCH_HALF_LIFE_DAYS), summed
+    over days and tenants, and raised for queries that keep finding new results and for
+    queries run from SEARCH_TEMPLATES. Each candidate lists its tenants by score (who pays).
+    """
+    now = now or datetime.now()
+    since = (now - timedelta(days=PREFETCH_LOOKBACK_DAYS)).strftime("%Y-%m-%d")
+    signals = journal_signals(since)
+    with closing(response_cache_connection()) as conn:
+        rows = conn.execute(
+            "SELECT l.key, l.tenant, l.day, l.query, l.num, l.date_restrict, l.start, l.hits, "
+            "r.fetched_at, r.expires_at FROM request_log l LEFT JOIN responses r ON r.key = l.key WHERE l.day >= ?",
+            (since,)
+        ).fetchall()
+    candidates = {}
+    for key, tenant, day, query, num, date_restrict, start, hits, fetched_at, expires_at in rows:
+        age = (now.date() - datetime.strptime(day, "%Y-%m-%d").date()).days
+        new_per_unit, templated = signals.get((tenant, query), (0, False))
+        weight = hits * 0.5 ** (age / PREFETCH_HALF_LIFE_DAYS) * (1 + min(new_per_unit, 10) / 10)
+        weight *= PREFETCH_TEMPLATE_BOOST if templated else 1
+        candidate = candidates.setdefault(key, {
+            "key": key, "query": query, "num": num, "date_restrict": date_restrict, "start": start,
+            "fetched_at": fetched_at, "expires_at": expires_at, "score": 0.0, "tenants": Counter()
+        })
+        candidate["score"] += weight
+        candidate["tenants"][tenant] += weight
+    ranked = sorted(candidates.values(), key=lambda c: c["score"], reverse=True)
+    for candidate in ranked:
+        candidate["tenants"] = [tenant for tenant, _ in candidate["tenants"].most_common()]
+    return ranked
 
-    url = "https://www.googleapis.com/customsearch/v1"
-    params = {
-        'key': API_KEY, 
-        'cx': SEARCH_ENGINE_ID, 
-        'q': query, 
-        'num': num_results,
-        'start': start  # Pagination: 1-based index
-    }
-    if date_restrict: 
-        params['dateRestrict'] = date_restrict
+def prefetch_expiry(date_restrict, fetched_at, keep_until):
+    """When a prefetched response goes stale: keep_until, or sooner for a short dateRestrict window.
     
-    try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        
-        # 2. Only increment if successful
-        increment_quota()
-        
-        return response.json().get('items', [])
-    except Exception as e:
-        st.error(f"Error: {e}")
-        return []
+    A "d1" response fetched at 23:30 stops covering the last 24 hours long before noon, so
+    it is only kept for PREFETCH_RESTRICT_SHARE of its window (until 05:30).
+    """
+    days = DATE_RESTRICT_DAYS.get(date_restrict)
+    if not days:
+        return keep_until
+    return min(keep_until, fetched_at + days * 86400 * PREFETCH_RESTRICT_SHARE)
+
+def prefetch_connection():
+    conn = response_cache_connection()
+    conn.row_factory = sqlite3.Row
+    conn.executescript(PREFETCH_SCHEMA)
+    return conn
+
+def jobs_pending():
+    """Queued or running background jobs get today's leftover before the prefetch does."""
+    if not os.path.exists(JOBS_DB):
+        return False
+    with closing(jobs_connection()) as conn:
+        return conn.execute("SELECT 1 FROM jobs WHERE status IN ('queued', 'running') LIMIT 1").fetchone() is not None
+
+@profiled("network: prefetch")
+def run_prefetch(now=None):
+    """Spend today's leftover quota warming the response cache. Returns the run's record, or None
+    if today's prefetch was already claimed (by this or another server process)."""
+    now = now or datetime.now()
+    day = now.strftime("%Y-%m-%d")
+    with closing(prefetch_connection()) as conn, conn:
+        claimed = conn.execute("INSERT OR IGNORE INTO prefetch_runs (day, started_at) VALUES (?, ?)",
+                               (day, now.strftime("%Y-%m-%d %H:%M:%S"))).rowcount
+        conn.execute("DELETE FROM request_log WHERE day < ?",
+                     ((now - timedelta(days=PREFETCH_LOOKBACK_DAYS)).strftime("%Y-%m-%d"),))
+    if not claimed:
+        return None
+    
+    reset = next_quota_window(now).timestamp()
+    keep_until = reset + PREFETCH_KEEP_HOURS * 3600
+    candidates = prefetch_candidates(now)
+    fetched = extended = 0
+    error = None
+    for candidate in candidates:
+        expires_at = prefetch_expiry(candidate["date_restrict"], now.timestamp(), keep_until)
+        if expires_at <= reset:
+            continue  # its window is too short to still be fresh after the reset
+        if candidate["expires_at"] and candidate["expires_at"] >= expires_at:
+            continue  # already warm for tomorrow
+        if candidate["fetched_at"] and candidate["fetched_at"] >= now.timestamp() - PREFETCH_EXTEND_SECONDS:
+            kept_until = prefetch_expiry(candidate["date_restrict"], candidate["fetched_at"], keep_until)
+            if kept_until > (candidate["expires_at"] or 0):
+                with closing(response_cache_connection()) as conn, conn:
+                    conn.execute("UPDATE responses SET expires_at = ?, prefetched = ? WHERE key = ?",
+                                 (kept_until, day, candidate["key"]))
+                extended += 1
+            continue
+        if jobs_pending():
+            break
+        budgets = [(tenant, *quota_budgets(tenant)[:2]) for tenant in candidate["tenants"]]
+        if budgets[0][2] <= PREFETCH_RESERVE:
+            break
+        payer = next((tenant for tenant, tenant_left, _ in budgets if tenant_left > 0), None)
+        if payer is None:
+            continue  # everyone who asks for this has spent their share
+        TENANT_CONTEXT.tenant = payer  # the quota is charged to the tenant who asks for it most
+        try:
+            data = fetch_search(candidate["query"], candidate["num"], candidate["date_restrict"], candidate["start"])
+        except Exception as e:
+            error = str(e)
+            break  # rate limited or offline: keep what is left for tomorrow's users
+        finally:
+            TENANT_CONTEXT.tenant = None
+        store_response(candidate["key"], data, expires_at=expires_at, prefetched=day)
+        fetched += 1
+    
+    with closing(prefetch_connection()) as conn, conn:
+        conn.execute("UPDATE prefetch_runs SET finished_at = ?, candidates = ?, fetched = ?, extended = ?, error = ? WHERE day = ?",
+                     (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), len(candidates), fetched, extended, error, day))
+    return {"day": day, "candidates": len(candidates), "fetched": fetched, "extended": extended, "error": error}
+
+def prefetch_summary():
+    """The latest finished prefetch run (fetched, extended, and cache hits on what it warmed)."""
+    with closing(prefetch_connection()) as conn:
+        run = conn.execute("SELECT * FROM prefetch_runs WHERE finished_at IS NOT NULL ORDER BY day DESC LIMIT 1").fetchone()
+    return dict(run) if run else None
+
+class Prefetcher:
+    """Daemon thread that runs the prefetch once a day, PREFETCH_LEAD_MINUTES before the reset."""
+    
+    def __init__(self):
+        self.thread = threading.Thread(target=self.loop, daemon=True, name="quota-prefetch")
+        self.thread.start()
+    
+    def loop(self):
+        while True:
+            starts_at = next_quota_window() - timedelta(minutes=PREFETCH_LEAD_MINUTES)
+            wait = (starts_at - datetime.now()).total_seconds()
+            if wait > 0:
+                time.sleep(min(wait, 60))  # re-check every minute in case the clock jumps
+                continue
+            try:
+                run_prefetch()
+            except Exception as e:
+                with closing(prefetch_connection()) as conn, conn:
+                    conn.execute("UPDATE prefetch_runs SET finished_at = ?, error = ? WHERE day = ?",
+                                 (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), str(e), datetime.now().strftime("%Y-%m-%d")))
+            time.sleep(max((next_quota_window() - datetime.now()).total_seconds(), 0) + 1)
+
+@st.cache_resource
+def prefetcher():
+    """Start the prefetch thread once per server process."""
+    return Prefetcher()
 
 # --- APP UI ---
+profile_mark("startup")
 st.set_page_config(page_title="Cyber Search Pro", layout="wide", page_icon="🔎")
 
 # --- MINIMAL CSS ---
@@ -470,28 +3394,62 @@ st.markdown("""
 # --- SIDEBAR ---
 with st.sidebar:
     st.title("🔎 Search Pro")
+    tenant = current_tenant()
+    if tenant != DEFAULT_TENANT:
+        st.caption(f"Signed in as {tenant}")
     remaining, used = get_quota_status()
     st.metric("Searches Left", remaining, delta=f"{used} used")
+    if TENANT_DAILY_LIMIT < DAILY_LIMIT:
+        st.caption(f"Your share: {TENANT_DAILY_LIMIT} of the {DAILY_LIMIT} daily searches")
+    if PREFETCH_ENABLED:
+        prefetcher()
+        last_prefetch = prefetch_summary()
+        if last_prefetch and last_prefetch["day"] >= (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d"):
+            st.caption(f"🌙 Leftover quota warmed {last_prefetch['fetched'] + last_prefetch['extended']} searches "
+                       f"on {last_prefetch['day']}; {last_prefetch['hits']} answered instantly since.")
+        else:
+            starts_at = next_quota_window() - timedelta(minutes=PREFETCH_LEAD_MINUTES)
+            st.caption(f"🌙 Searches left at {starts_at:%H:%M} warm tomorrow's likely queries.")
     
     # Saved Searches
     st.markdown("---")
     saved_searches = load_saved_searches()
     if saved_searches:
         st.markdown("**Saved Searches**")
-        for i, s in enumerate(saved_searches):
+        for s in saved_searches:
             col1, col2 = st.columns([4, 1])
             with col1:
-                result_count = len(s.get('results', []))
-                if st.button(f"📌 {s['name']} ({result_count})", key=f"load_{i}", use_container_width=True):
+                if st.button(f"📌 {s['name']} ({s['result_count']})", key=f"load_{s['id']}", use_container_width=True):
                     # Load saved results directly (no API call)
-                    st.session_state['people_results'] = s.get('results', [])
+                    # Keyed by id: two saved searches may share a name
+                    cache_results("people", f"saved:{s['id']}", load_saved_results(s['id']))
                     st.session_state['loaded_search_name'] = s['name']
                     st.rerun()
             with col2:
-                if st.button("🗑️", key=f"del_{i}"):
-                    delete_saved_search(i)
+                if st.button("🗑️", key=f"del_{s['id']}"):
+                    delete_saved_search(s['id'])
+                    st.rerun()
+    
+    # Background jobs survive reruns and restarts; finished ones can be loaded into their tool
+    recent_jobs = list_jobs()
+    if recent_jobs:
+        with st.expander("⏳ Background Jobs"):
+            backlog = scheduled_cost()
+            if backlog:
+                st.caption(f"Queued work needs up to {backlog} searches; whatever doesn't fit today runs after the reset.")
+            for job in recent_jobs:
+                priority = next((name for name, value in JOB_PRIORITIES.items() if value == job["priority"]), "Normal")
+                st.caption(f"#{job['id']} {job['label']} · {job['status']} ({job['progress_done']}/{job['progress_total']}) · {priority}")
+                if job["status"] == "done" and st.button("📂 Load", key=f"job_load_{job['id']}", use_container_width=True):
+                    finish_job(get_job(job["id"]))
+                    st.toast(f"Loaded {job['label']} into {'Batch Company Search' if job['kind'] == 'batch' else 'Competitor Analysis'}")
+                elif job["status"] in ("failed", "cancelled") and st.button("▶️ Resume", key=f"job_resume_{job['id']}", use_container_width=True):
+                    set_job_status(job["id"], "queued")
+                    job_runner()
                     st.rerun()
 
+profile_mark("sidebar")
+
 # --- MAIN TABS (People first as default) ---
 tab_people, tab_jobs, tab_company, tab_premium = st.tabs(["People", "Jobs", "Company Research", "🌟 Premium"])
 
@@ -545,19 +3503,12 @@ with tab_jobs:
         col1, col2 = st.columns(2)
         with col1:
             remote_only = st.checkbox("Remote Only", key="job_remote")
+            enrich_jobs = st.checkbox("Fetch posting details", key="job_enrich",
+                                      help="Fetch each posting for date, location, salary and type (no quota used)")
         with col2:
             num_pages = st.slider("Pages (more = more results)", 1, 3, 1, key="job_pages")
     
-    # Experience & Date mappings
-    experience_map = {
-        "Any": None,
-        "Entry Level": '("entry level" OR "junior" OR "associate" OR "new grad")',
-        "Mid Level": '("mid level" OR "2-5 years" OR "3+ years")',
-        "Senior": '("senior" OR "sr." OR "5+ years")',
-        "Lead": '("lead" OR "principal" OR "staff")',
-        "Manager": '("manager" OR "director")'
-    }
-    
+    # Date mappings
     date_map = {
         "24 Hours": "d1", 
         "3 Days": "d3",
@@ -591,74 +3542,83 @@ with tab_jobs:
             search_query += f' "{location}"'
         if target_company:
             search_query += f' "{target_company}"'
-        if experience_map.get(experience_level):
-            search_query += f' {experience_map[experience_level]}'
+        if EXPERIENCE_MAP.get(experience_level):
+            search_query += f' {EXPERIENCE_MAP[experience_level]}'
         if remote_only:
             search_query += ' (remote OR "work from home")'
         if exclude_keywords:
             exclusions = [f'-"{term.strip()}"' for term in exclude_keywords.split(",") if term.strip()]
             search_query += " " + " ".join(exclusions)
     
+    # Cache key: the canonical query plus the options that change its results
+    jobs_query = parse_query(search_query)
+    jobs_options = f"{freshness} | enrich={enrich_jobs}"
+    jobs_cache_key = f"{canonical_query(search_query)} | {jobs_options} | {num_pages}p"
+    
     # Search Button
     st.markdown("---")
-    if st.button("🔍 Search Jobs", type="primary", use_container_width=True, disabled=not search_query):
-        with st.spinner("Searching..."):
-            all_results = []
+    jobs_affordable = render_quota_cost(estimate_cost("pages", {"pages": num_pages}), "Lower the page count to fit.")
+    if (st.button("🔍 Search Jobs", type="primary", use_container_width=True, disabled=not search_query or not jobs_affordable)
+            and not reuse_cached_results("jobs", jobs_cache_key, jobs_query, jobs_options)):
+        started = time.perf_counter()
+        _, used_before = get_quota_status()
+        stream = ProgressiveResults("jobs", jobs_cache_key, job_row)
+        try:
             for page in range(num_pages):
                 start_index = page * num_results + 1
-                results = google_search(search_query, num_results=num_results, date_restrict=date_map.get(freshness), start=start_index)
-                if results:
-                    all_results.extend(results)
-                else:
+                page_results = google_search(search_query, num_results=num_results, date_restrict=date_map.get(freshness), start=start_index)
+                stream.add(page_results, f"Page {page + 1}/{num_pages}")
+                # A short page means Google has nothing more for this query
+                jobs_complete = 0 < len(page_results) < num_results
+                if len(page_results) < num_results:
                     break
+        finally:
+            # Journal what was paid for even if the search came back empty or was stopped
+            # (archived below, once enriched and tagged)
+            record_search(search_query, "Jobs", stream.items, raw_count=stream.raw_count, pages=num_pages,
+                          quota=get_quota_status()[1] - used_before, latency=time.perf_counter() - started,
+                          archive=False)
+        
+        results = stream.items
+        
+        if results:
+            # Snippet fields were extracted as pages arrived; fetched details override them
+            if enrich_jobs:
+                with st.spinner(f"Fetching details for {len(results)} postings..."):
+                    enrich_results(results)
             
-            # Deduplicate results
-            results = deduplicate_results(all_results)
+            # Rank against what the user asked for and tag with the title/skill taxonomy
+            classify_results(results)
+            archive_results(results, "Jobs", search_query)
+            results = rank_results(results, ranking_terms(
+                titles_to_search,
+                [s.strip() for s in keywords.split(",")] if keywords else field_data["skills"],
+                EXPERIENCE_MAP.get(experience_level) or "",
+                location
+            ))
+            data = [job_row(item) for item in results]
             
-            if results:
-                save_search_history(search_query, "Jobs", len(results))
-                st.success(f"Found {len(results)} jobs")
-                
-                data = []
-                for item in results:
-                    link = item.get('link', '#')
-                    company = ""
-                    source = "Other"
-                    
-                    if "greenhouse.io" in link:
-                        company = link.split("/")[3] if len(link.split("/")) > 3 else ""
-                        source = "Greenhouse"
-                    elif "lever.co" in link:
-                        company = link.split("/")[3] if len(link.split("/")) > 3 else ""
-                        source = "Lever"
-                    elif "linkedin.com" in link:
-                        source = "LinkedIn"
-                        title = item.get('title', '')
-                        if ' at ' in title:
-                            company = title.split(' at ')[-1].split(' - ')[0].strip()
-                    elif "myworkdayjobs.com" in link:
-                        source = "Workday"
-                    
-                    data.append({
-                        "Title": item.get('title', 'N/A'),
-                        "Company": company.replace("-", " ").title(),
-                        "Source": source,
-                        "Link": link
-                    })
-                
-                df = pd.DataFrame(data)
-                
-                st.dataframe(
-                    df,
-                    column_config={"Link": st.column_config.LinkColumn("Apply")},
-                    use_container_width=True,
-                    hide_index=True
-                )
-                
-                st.download_button("📥 Download CSV", convert_df_to_csv(df), 
-                                  f"jobs_{datetime.now().strftime('%Y%m%d')}.csv", "text/csv")
-            else:
-                st.warning("No jobs found. Try different filters.")
+            # Cache so facet filters and other widgets don't need a new search
+            cache_results("jobs", jobs_cache_key, data, query=jobs_query, options=jobs_options, complete=jobs_complete)
+        else:
+            cache_results("jobs", jobs_cache_key, None)
+            st.warning("No jobs found. Try different filters.")
+        stream.finish()
+    
+    # Display results from the session cache
+    data, shown_key = cached_results("jobs", jobs_cache_key)
+    if data and results_partial("jobs", shown_key):
+        st.info("⏹ Search stopped early; showing the jobs found so far (not ranked or enriched).")
+    if data:
+        st.success(f"Found {len(data)} jobs")
+        if shown_key != jobs_cache_key:
+            st.caption(f"Showing cached results for an earlier search: `{shown_key.split(' | ')[0]}`")
+        
+        df = render_faceted_table(pd.DataFrame(data), key="jobs")
+        
+        render_export(df, f"jobs_{datetime.now().strftime('%Y%m%d')}", key="jobs_export")
+
+profile_mark("tab: Jobs")
 
 # --- TAB 1: PEOPLE SEARCH (Main Feature) ---
 with tab_people:
@@ -700,6 +3660,7 @@ with tab_people:
             search_query += f' {seniority_terms.get(seniority, "")}'
         if target_school:
             search_query += f' "{target_school}"'
+        people_hints = {"company": [target_company], "school": [target_school]}
     
     elif search_type == "🎓 Alumni":
         col1, col2 = st.columns(2)
@@ -724,6 +3685,7 @@ with tab_people:
             search_query += f' {target_field}'
         if graduation_year:
             search_query += f' {graduation_year}'
+        people_hints = {"school": [my_school], "company": [c.strip() for c in target_companies.split(",") if c.strip()]}
     
     elif search_type == "👔 Recruiters":
         col1, col2 = st.columns(2)
@@ -751,6 +3713,7 @@ with tab_people:
             search_query += f' {recruiter_focus}'
         if not include_agency:
             search_query += ' -agency -staffing -consulting'
+        people_hints = {"company": [recruiter_company]}
     
     else:  # Custom Search
         st.info("Build your own LinkedIn X-Ray search")
@@ -770,6 +3733,7 @@ with tab_people:
             search_query += f' "{custom_location}"'
         if custom_school:
             search_query += f' "{custom_school}"'
+        people_hints = {"company": [custom_company], "school": [custom_school]}
     
     # Additional filters (collapsed)
     with st.expander("More Options"):
@@ -797,59 +3761,71 @@ with tab_people:
     # Search Button
     st.markdown("---")
     
-    search_clicked = st.button("🔍 Find People", type="primary", use_container_width=True, key="people_search_btn")
+    people_affordable = render_quota_cost(estimate_cost("pages", {"pages": num_pages}), "Lower the page count to fit.")
+    search_clicked = st.button("🔍 Find People", type="primary", use_container_width=True, key="people_search_btn",
+                               disabled=not people_affordable)
+    
+    people_query = parse_query(search_query)
+    people_cache_key = f"{canonical_query(search_query)} | {num_results}x{num_pages}p"
     
     # Handle save action first (before search)
-    if 'people_results' in st.session_state and st.session_state.people_results:
+    people_results, _ = cached_results("people", people_cache_key)
+    if people_results:
         if st.session_state.get('do_save_clicked'):
             save_name = st.session_state.get('save_name_input', '')
             if save_name:
                 # Save with full results (no API needed to reload)
                 save_search(save_name, st.session_state.get('last_search_type', ''), 
-                           st.session_state.people_results)
+                           people_results)
                 st.toast(f"✅ Saved: {save_name}")
                 st.session_state.do_save_clicked = False
     
-    if search_clicked:
-        with st.spinner("Searching..."):
-            all_results = []
+    if search_clicked and not reuse_cached_results("people", people_cache_key, people_query, None):
+        started = time.perf_counter()
+        _, used_before = get_quota_status()
+        stream = ProgressiveResults("people", people_cache_key, people_row,
+                                    column_config={"Profile": st.column_config.LinkColumn("View")})
+        stored = Counter()
+        try:
             for page in range(num_pages):
                 start_index = page * num_results + 1
                 page_results = google_search(search_query, num_results=num_results, start=start_index)
-                if page_results:
-                    all_results.extend(page_results)
-                else:
+                # Store each page before it is shown, so people_row can look up the companies it learned
+                stored.update(dict(zip(("new", "updated"), record_people(page_results, people_hints))))
+                stream.add(page_results, f"Page {page + 1}/{num_pages}")
+                # A short page means Google has nothing more for this query
+                people_complete = 0 < len(page_results) < num_results
+                if len(page_results) < num_results:
                     break
+        finally:
+            # Journal what was paid for even if the search came back empty or was stopped
+            record_search(search_query, "People", stream.items, raw_count=stream.raw_count, pages=num_pages,
+                          quota=get_quota_status()[1] - used_before, latency=time.perf_counter() - started)
+        
+        results = stream.items
+        
+        if results:
+            st.toast(f"👥 People store: {stored['new']} new, {stored['updated']} updated")
             
-            results = deduplicate_results(all_results)
-            
-            if results:
-                save_search_history(search_query, "People", len(results))
-                
-                data = []
-                for item in results:
-                    title = item.get('title', 'N/A')
-                    parts = title.replace(" | LinkedIn", "").split(" - ")
-                    name = parts[0].strip() if parts else "Unknown"
-                    headline = " - ".join(parts[1:]).strip() if len(parts) > 1 else ""
-                    data.append({
-                        "Name": name,
-                        "Title": headline,
-                        "Profile": item.get('link', '')
-                    })
-                
-                # Store in session state
-                st.session_state.people_results = data
-                st.session_state.last_query = search_query
-                st.session_state.last_search_type = search_type
-            else:
-                st.session_state.people_results = None
-                st.warning("No profiles found. Try broader search terms.")
+            # Store in the session cache
+            cache_results("people", people_cache_key, stream.rows, query=people_query, complete=people_complete)
+            st.session_state.last_query = search_query
+            st.session_state.last_search_type = search_type
+        else:
+            cache_results("people", people_cache_key, None)
+            st.warning("No profiles found. Try broader search terms.")
+        stream.finish()
     
-    # Display results from session state
-    if 'people_results' in st.session_state and st.session_state.people_results:
-        data = st.session_state.people_results
+    # Display results from the session cache
+    data, shown_key = cached_results("people", people_cache_key)
+    if data and results_partial("people", shown_key):
+        st.info("⏹ Search stopped early; showing the profiles found so far.")
+    if data:
         st.success(f"Found {len(data)} profiles")
+        if shown_key.startswith("saved:"):
+            st.caption(f"Loaded saved search: {st.session_state.get('loaded_search_name', '')}")
+        elif shown_key != people_cache_key:
+            st.caption(f"Showing cached results for an earlier search: `{shown_key.split(' | ')[0]}`")
         
         df = pd.DataFrame(data)
         
@@ -862,9 +3838,8 @@ with tab_people:
         
         col1, col2, col3 = st.columns([2, 2, 1])
         with col1:
-            st.download_button("📥 Download CSV", convert_df_to_csv(df), 
-                              f"people_{datetime.now().strftime('%Y%m%d')}.csv", "text/csv",
-                              use_container_width=True)
+            render_export(df, f"people_{datetime.now().strftime('%Y%m%d')}", key="people_export",
+                          use_container_width=True)
         with col2:
             save_name = st.text_input("Save as", placeholder="e.g., CrowdStrike Security", 
                                      label_visibility="collapsed", key="save_name_input")
@@ -872,6 +3847,39 @@ with tab_people:
             if st.button("💾 Save", use_container_width=True, key="do_save"):
                 st.session_state.do_save_clicked = True
                 st.rerun()
+    
+    # Everyone found so far, merged per profile across searches (no API call)
+    with st.expander("👥 People Directory"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            dir_company = st.text_input("Company", "", key="dir_company", placeholder="e.g., CrowdStrike")
+        with col2:
+            dir_school = st.text_input("School", "", key="dir_school", placeholder="e.g., Arizona State")
+        with col3:
+            dir_role = st.text_input("Role", "", key="dir_role", placeholder="e.g., Security Engineer")
+        
+        people = find_people(company=dir_company, school=dir_school, role=dir_role)
+        if people:
+            st.caption(f"{len(people)} people" + (" (most recent 500)" if len(people) >= 500 else ""))
+            directory_df = pd.DataFrame([{
+                "Name": p["name"], "Headline": p["headline"], "Company": p["company"], "School": p["school"],
+                "Location": p["location"], "First Seen": p["first_seen"], "Last Seen": p["last_seen"],
+                "Hits": p["seen_count"], "Headlines": p["headlines"],
+                "Profile": f"https://www.linkedin.com/in/{p['slug']}"
+            } for p in people])
+            st.dataframe(directory_df, column_config={"Profile": st.column_config.LinkColumn("View")},
+                         use_container_width=True, hide_index=True)
+            
+            changed = [p for p in people if p["headlines"] > 1]
+            if changed:
+                chosen = st.selectbox("Headline history", [p["slug"] for p in changed], key="dir_history",
+                                      format_func=lambda slug: next(p["name"] for p in changed if p["slug"] == slug))
+                st.dataframe(pd.DataFrame(headline_history(chosen)), use_container_width=True, hide_index=True)
+            render_export(directory_df, f"people_directory_{datetime.now().strftime('%Y%m%d')}", key="directory_export")
+        else:
+            st.caption("No people stored yet" if not (dir_company or dir_school or dir_role) else "No matches.")
+
+profile_mark("tab: People")
 
 # --- TAB 3: COMPANY RESEARCH ---
 with tab_company:
@@ -934,19 +3942,23 @@ with tab_company:
     st.markdown("---")
     search_company = st.button("🔍 Research Company", type="primary", use_container_width=True, disabled=not research_company)
     
+    base_query = f'"{research_company}" {focus_map.get(research_focus, "")}'
+    if custom_keywords:
+        base_query += " " + custom_keywords
+    if source_map.get(source_filter):
+        base_query = f"{source_map[source_filter]} {base_query}"
+    research_cache_key = f"{base_query} | {research_freshness} | {result_limit}"
+    
     if search_company:
-        base_query = f'"{research_company}" {focus_map.get(research_focus, "")}'
-        if custom_keywords:
-            base_query += " " + custom_keywords
-        if source_map.get(source_filter):
-            base_query = f"{source_map[source_filter]} {base_query}"
-        
         with st.spinner("Gathering intel..."):
-            results = google_search(base_query, num_results=result_limit, date_restrict=date_map_company.get(research_freshness))
-            results = deduplicate_results(results)
+            started = time.perf_counter()
+            _, used_before = get_quota_status()
+            raw_results = google_search(base_query, num_results=result_limit, date_restrict=date_map_company.get(research_freshness))
+            results = deduplicate_results(raw_results)
+            record_search(base_query, "Company Research", results, raw_count=len(raw_results),
+                          quota=get_quota_status()[1] - used_before, latency=time.perf_counter() - started)
             
             if results:
-                st.success(f"Top {len(results)} insights for {research_company}")
                 cards = []
                 for item in results:
                     cards.append({
@@ -954,21 +3966,29 @@ with tab_company:
                         "Snippet": item.get("snippet", ""),
                         "Link": item.get("link", "")
                     })
-                    title = item.get('title', 'Untitled')
-                    snippet = item.get('snippet', '')
-                    link = item.get('link', '#')
-                    st.markdown(f"**[{title}]({link})**\n\n{snippet}\n")
-                    st.markdown("---")
-                df_research = pd.DataFrame(cards)
-                st.download_button(
-                    "� Download summary",
-                    convert_df_to_csv(df_research),
-                    f"{research_company.lower().replace(' ', '_')}_intel.csv",
-                    "text/csv",
-                    use_container_width=True
-                )
+                company_id = canonical_company_key(research_company)
+                cache_results("research", research_cache_key, {"company": company_index().name(company_id) or research_company,
+                                                               "company_id": company_id, "cards": cards})
             else:
+                cache_results("research", research_cache_key, None)
                 st.warning("No recent intel found. Try a broader focus or 'Anytime'.")
+    
+    research, _ = cached_results("research", research_cache_key)
+    if research:
+        st.success(f"Top {len(research['cards'])} insights for {research['company']}")
+        for card in research["cards"]:
+            st.markdown(f"**[{card['Title'] or 'Untitled'}]({card['Link'] or '#'})**\n\n{card['Snippet']}\n")
+            st.markdown("---")
+        df_research = pd.DataFrame(research["cards"])
+        render_export(
+            df_research,
+            f"{research['company'].lower().replace(' ', '_')}_intel",
+            key="research_export",
+            label="📥 Download summary",
+            use_container_width=True
+        )
+
+profile_mark("tab: Company Research")
 
 # --- TAB 4: PREMIUM FEATURES ---
 with tab_premium:
@@ -977,7 +3997,8 @@ with tab_premium:
     
     premium_tool = st.radio(
         "Select Tool",
-        ["📚 Search Templates", "🔧 Boolean Builder", "🏢 Batch Company Search", "📊 Competitor Analysis"],
+        ["📚 Search Templates", "🔧 Boolean Builder", "🏢 Batch Company Search", "📊 Competitor Analysis", "📈 Query Yield",
+         "🗄️ Results Archive"],
         horizontal=True,
         key="premium_tool"
     )
@@ -998,7 +4019,9 @@ with tab_premium:
         templates = SEARCH_TEMPLATES[template_category]
         
         for template_name, template_data in templates.items():
-            with st.expander(f"{template_name}", expanded=False):
+            template_slot = f"template:{template_name}"
+            template_cached, _ = cached_results(template_slot)
+            with st.expander(f"{template_name}", expanded=bool(template_cached)):
                 st.caption(template_data['description'])
                 st.code(template_data['query'], language=None)
                 
@@ -1015,66 +4038,65 @@ with tab_premium:
                         5, 20, 10,
                         key=f"results_{template_name}"
                     )
+                
+                query = template_data['query']
+                if custom_value:
+                    query = query.replace('[COMPANY]', custom_value).replace('[YOUR_SCHOOL]', custom_value)
+                template_cache_key = f"{canonical_query(query)} | {num_results_template}"
+                
                 with col3:
-                    if st.button("🔍 Search", key=f"search_{template_name}", use_container_width=True):
-                        query = template_data['query']
-                        if custom_value:
-                            query = query.replace('[COMPANY]', custom_value).replace('[YOUR_SCHOOL]', custom_value)
+                    template_clicked = st.button("🔍 Search", key=f"search_{template_name}", use_container_width=True)
+                
+                if template_clicked:
+                    with st.spinner("Searching..."):
+                        started = time.perf_counter()
+                        _, used_before = get_quota_status()
+                        raw_results = google_search(query, num_results=num_results_template)
+                        results = deduplicate_results(raw_results)
+                        record_search(query, "Template", results, raw_count=len(raw_results),
+                                      quota=get_quota_status()[1] - used_before, latency=time.perf_counter() - started,
+                                      template=template_name)
                         
-                        with st.spinner("Searching..."):
-                            results = google_search(query, num_results=num_results_template)
-                            results = deduplicate_results(results)
+                        if results:
+                            record_people(results)
                             
-                            if results:
-                                st.success(f"Found {len(results)} results")
-                                
-                                # Display results based on template type
-                                if "linkedin.com/in" in query:
-                                    # People results
-                                    data = []
-                                    for item in results:
-                                        title = item.get('title', 'N/A')
-                                        parts = title.replace(" | LinkedIn", "").split(" - ")
-                                        name = parts[0].strip() if parts else "Unknown"
-                                        headline = " - ".join(parts[1:]).strip() if len(parts) > 1 else ""
-                                        data.append({
-                                            "Name": name,
-                                            "Title": headline,
-                                            "Profile": item.get('link', '')
-                                        })
-                                    df = pd.DataFrame(data)
-                                    st.dataframe(
-                                        df,
-                                        column_config={"Profile": st.column_config.LinkColumn("View")},
-                                        use_container_width=True,
-                                        hide_index=True
-                                    )
-                                else:
-                                    # Job or general results
-                                    data = []
-                                    for item in results:
-                                        data.append({
-                                            "Title": item.get('title', 'N/A'),
-                                            "Snippet": item.get('snippet', ''),
-                                            "Link": item.get('link', '')
-                                        })
-                                    df = pd.DataFrame(data)
-                                    st.dataframe(
-                                        df,
-                                        column_config={"Link": st.column_config.LinkColumn("View")},
-                                        use_container_width=True,
-                                        hide_index=True
-                                    )
-                                
-                                st.download_button(
-                                    "📥 Download CSV",
-                                    convert_df_to_csv(df),
-                                    f"{template_name.lower().replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.csv",
-                                    "text/csv",
-                                    key=f"download_{template_name}"
-                                )
+                            data = []
+                            if "linkedin.com/in" in query:
+                                # People results
+                                data = [people_row(item) for item in extract_fields(results)]
                             else:
-                                st.warning("No results found. Try customizing the query.")
+                                # Job or general results
+                                for item in extract_fields(results):
+                                    data.append({
+                                        "Title": item.get('title', 'N/A'),
+                                        "Snippet": item.get('snippet', ''),
+                                        **enriched_columns(item),
+                                        "Link": item.get('link', '')
+                                    })
+                            cache_results(template_slot, template_cache_key, data)
+                        else:
+                            cache_results(template_slot, template_cache_key, None)
+                            st.warning("No results found. Try customizing the query.")
+                
+                data, _ = cached_results(template_slot, template_cache_key)
+                if data:
+                    st.success(f"Found {len(data)} results")
+                    df = pd.DataFrame(data)
+                    
+                    # Display results based on template type
+                    link_column, link_label = ("Profile", "View") if "Profile" in df.columns else ("Link", "View")
+                    st.dataframe(
+                        df,
+                        column_config={link_column: st.column_config.LinkColumn(link_label)},
+                        use_container_width=True,
+                        hide_index=True
+                    )
+                    
+                    render_export(
+                        df,
+                        f"{template_name.lower().replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}",
+                        key=f"download_{template_name}"
+                    )
     
     # TOOL 2: Boolean Search Builder
     elif premium_tool == "🔧 Boolean Builder":
@@ -1156,9 +4178,13 @@ with tab_premium:
         if built_query:
             st.code(built_query, language=None)
             
+            bool_query = parse_query(built_query)
+            bool_cache_key = f"{canonical_query(built_query)} | {bool_date} | {bool_results}"
+            
             col1, col2, col3 = st.columns([2, 2, 1])
             with col1:
-                if st.button("🔍 Execute Search", type="primary", use_container_width=True, key="bool_search"):
+                if (st.button("🔍 Execute Search", type="primary", use_container_width=True, key="bool_search")
+                        and not reuse_cached_results("boolean", bool_cache_key, bool_query, bool_date)):
                     date_map_bool = {
                         "24 Hours": "d1",
                         "3 Days": "d3",
@@ -1168,40 +4194,33 @@ with tab_premium:
                     }
                     
                     with st.spinner("Searching..."):
-                        results = google_search(
+                        started = time.perf_counter()
+                        _, used_before = get_quota_status()
+                        raw_results = google_search(
                             built_query,
                             num_results=bool_results,
                             date_restrict=date_map_bool.get(bool_date)
                         )
-                        results = deduplicate_results(results)
+                        results = deduplicate_results(raw_results)
+                        record_search(built_query, "Boolean Builder", results, raw_count=len(raw_results),
+                                      quota=get_quota_status()[1] - used_before, latency=time.perf_counter() - started)
                         
                         if results:
-                            save_search_history(built_query, "Boolean Builder", len(results))
-                            st.success(f"Found {len(results)} results")
+                            record_people(results)
                             
                             data = []
-                            for item in results:
+                            for item in classify_results(extract_fields(results)):
                                 data.append({
                                     "Title": item.get('title', 'N/A'),
                                     "Snippet": item.get('snippet', ''),
+                                    **taxonomy_columns(item),
+                                    **enriched_columns(item),
                                     "Link": item.get('link', '')
                                 })
-                            
-                            df = pd.DataFrame(data)
-                            st.dataframe(
-                                df,
-                                column_config={"Link": st.column_config.LinkColumn("View")},
-                                use_container_width=True,
-                                hide_index=True
-                            )
-                            
-                            st.download_button(
-                                "📥 Download Results",
-                                convert_df_to_csv(df),
-                                f"boolean_search_{datetime.now().strftime('%Y%m%d_%H%M')}.csv",
-                                "text/csv"
-                            )
+                            cache_results("boolean", bool_cache_key, data, query=bool_query, options=bool_date,
+                                          complete=0 < len(raw_results) < bool_results)
                         else:
+                            cache_results("boolean", bool_cache_key, None)
                             st.warning("No results found. Try adjusting your filters.")
             
             with col2:
@@ -1210,6 +4229,21 @@ with tab_premium:
                     st.write(f"```{built_query}```")
         else:
             st.warning("Add some search terms to build a query")
+        
+        data, shown_key = cached_results("boolean", bool_cache_key if built_query else None)
+        if data:
+            st.success(f"Found {len(data)} results")
+            if shown_key != (bool_cache_key if built_query else None):
+                st.caption(f"Showing cached results for an earlier query: `{shown_key.split(' | ')[0]}`")
+            
+            df = render_faceted_table(pd.DataFrame(data), key="bool", link_label="View")
+            
+            render_export(
+                df,
+                f"boolean_search_{datetime.now().strftime('%Y%m%d_%H%M')}",
+                key="bool_export",
+                label="📥 Download Results"
+            )
     
     # TOOL 3: Batch Company Search
     elif premium_tool == "🏢 Batch Company Search":
@@ -1238,6 +4272,7 @@ with tab_premium:
                 [
                     "site:boards.greenhouse.io",
                     "site:jobs.lever.co",
+                    "site:jobs.ashbyhq.com",
                     "site:myworkdayjobs.com",
                     "site:linkedin.com/jobs"
                 ],
@@ -1252,20 +4287,54 @@ with tab_premium:
             )
             
             batch_num = st.slider("Results per company", 3, 10, 5, key="batch_num")
+            batch_pack = st.checkbox("Pack companies into shared queries", value=True, key="batch_pack",
+                                     help="OR several companies into one search and only re-query busy companies (uses far less quota)")
+            batch_boards = st.checkbox("Read ATS boards directly", value=True, key="batch_boards",
+                                       help="Pull Greenhouse/Lever/Ashby boards in full without using quota; other companies fall back to Google")
+            batch_enrich = st.checkbox("Fetch posting details", key="batch_enrich",
+                                       help="Fetch each posting for date, location, salary and type (no quota used)")
+            batch_background = st.checkbox("Run in background", key="batch_background",
+                                           help="Queue the search so it keeps running (and resumes after a restart) while you use other tools")
+            batch_priority = st.selectbox("Queue priority", list(JOB_PRIORITIES), index=1, key="batch_priority")
         
         st.markdown("---")
         
+        # Parse companies
+        companies = []
+        if '\n' in companies_input:
+            companies = [c.strip() for c in companies_input.split('\n') if c.strip()]
+        else:
+            companies = [c.strip() for c in companies_input.split(',') if c.strip()]
+        
+        # Parse job titles
+        job_titles = [t.strip() for t in job_titles_input.split(',') if t.strip()]
+        
+        batch_cache_key = " | ".join([
+            ", ".join(companies), ", ".join(job_titles), " OR ".join(batch_ats), batch_date,
+            f"{batch_num}/co", f"pack={batch_pack}", f"boards={batch_boards}", f"enrich={batch_enrich}"
+        ])
+        
+        date_map_batch = {
+            "24 Hours": "d1",
+            "3 Days": "d3",
+            "Past Week": "w1",
+            "Month": "m1",
+            "Anytime": None
+        }
+        batch_params = {
+            "companies": companies, "job_titles": job_titles, "ats_sites": batch_ats,
+            "num_results": batch_num, "date_restrict": date_map_batch.get(batch_date),
+            "pack": batch_pack, "use_boards": batch_boards, "enrich": batch_enrich,
+            "cache_key": batch_cache_key
+        }
+        batch_affordable = True
+        if companies and job_titles and batch_ats:
+            batch_affordable = render_quota_cost(
+                estimate_cost("batch", batch_params),
+                "It will be queued in the background and the overflow deferred until the quota resets."
+            )
+        
         if st.button("🔍 Search All Companies", type="primary", use_container_width=True, key="batch_search"):
-            # Parse companies
-            companies = []
-            if '\n' in companies_input:
-                companies = [c.strip() for c in companies_input.split('\n') if c.strip()]
-            else:
-                companies = [c.strip() for c in companies_input.split(',') if c.strip()]
-            
-            # Parse job titles
-            job_titles = [t.strip() for t in job_titles_input.split(',') if t.strip()]
-            
             if not companies:
                 st.error("Please enter at least one company")
             elif not job_titles:
@@ -1273,85 +4342,60 @@ with tab_premium:
             elif not batch_ats:
                 st.error("Please select at least one ATS platform")
             else:
-                date_map_batch = {
-                    "24 Hours": "d1",
-                    "3 Days": "d3",
-                    "Past Week": "w1",
-                    "Month": "m1",
-                    "Anytime": None
-                }
-                
-                with st.spinner(f"Searching {len(companies)} companies..."):
-                    all_results, company_stats = batch_company_search(
-                        companies,
-                        job_titles,
-                        batch_ats,
-                        num_results=batch_num,
-                        date_restrict=date_map_batch.get(batch_date)
-                    )
-                    
-                    all_results = deduplicate_results(all_results)
+                if batch_background or not batch_affordable:
+                    st.session_state["batch_job"] = submit_job("batch", batch_params, f"Batch: {len(companies)} companies",
+                                                               priority=JOB_PRIORITIES[batch_priority])
+                    st.toast("Batch search queued")
+                else:
+                    # Same company groups a background job checkpoints on, streamed as each finishes
+                    all_results, company_stats = [], {}
+                    units = job_units("batch", batch_params)
+                    stream = ProgressiveResults("batch", batch_cache_key, batch_row, to_payload=lambda rows: {
+                        "data": list(rows), "companies": len(companies),
+                        "stats": [{"Company": c, "Jobs Found": n} for c, n in sorted(company_stats.items(), key=lambda x: x[1], reverse=True)]
+                    })
+                    for index, unit in enumerate(units):
+                        unit_results, unit_stats = run_job_unit("batch", batch_params, unit)
+                        all_results.extend(unit_results)
+                        company_stats.update(unit_stats)
+                        stream.add(unit_results, f"{', '.join(unit)} ({index + 1}/{len(units)})")
                     
-                    if all_results:
-                        st.success(f"Found {len(all_results)} total jobs across {len(companies)} companies")
-                        
-                        # Show stats
-                        st.markdown("### 📊 Results by Company")
-                        stats_df = pd.DataFrame([
-                            {"Company": comp, "Jobs Found": count}
-                            for comp, count in sorted(company_stats.items(), key=lambda x: x[1], reverse=True)
-                        ])
-                        st.dataframe(stats_df, use_container_width=True, hide_index=True)
-                        
-                        st.markdown("---")
-                        st.markdown("### 📋 All Results")
-                        
-                        # Format results
-                        data = []
-                        for item in all_results:
-                            link = item.get('link', '#')
-                            company = item.get('search_company', '')
-                            
-                            # Try to extract company from URL if not set
-                            if not company:
-                                if "greenhouse.io" in link:
-                                    company = link.split("/")[3] if len(link.split("/")) > 3 else ""
-                                elif "lever.co" in link:
-                                    company = link.split("/")[3] if len(link.split("/")) > 3 else ""
-                            
-                            source = "Other"
-                            if "greenhouse.io" in link:
-                                source = "Greenhouse"
-                            elif "lever.co" in link:
-                                source = "Lever"
-                            elif "linkedin.com" in link:
-                                source = "LinkedIn"
-                            elif "myworkdayjobs.com" in link:
-                                source = "Workday"
-                            
-                            data.append({
-                                "Company": company.replace("-", " ").title(),
-                                "Title": item.get('title', 'N/A'),
-                                "Source": source,
-                                "Link": link
-                            })
-                        
-                        df = pd.DataFrame(data)
-                        st.dataframe(
-                            df,
-                            column_config={"Link": st.column_config.LinkColumn("Apply")},
-                            use_container_width=True,
-                            hide_index=True
-                        )
-                        
-                        st.download_button(
-                            "📥 Download All Results",
-                            convert_df_to_csv(df),
-                            f"batch_search_{datetime.now().strftime('%Y%m%d_%H%M')}.csv",
-                            "text/csv"
-                        )
-                    else:
+                    with st.spinner(f"Ranking {len(stream.items)} jobs from {len(companies)} companies..."):
+                        batch_payload = build_batch_payload(all_results, company_stats, job_titles, len(companies),
+                                                            enrich=batch_enrich, boards=batch_boards)
+                    cache_results("batch", batch_cache_key, batch_payload)
+                    stream.finish()
+                    if not batch_payload:
                         st.warning("No jobs found. Try different companies or date range.")
+        
+        if st.session_state.get("batch_job"):
+            render_job_progress("batch")
+        if st.session_state.get("batch_job_finished"):
+            finish_job(get_job(st.session_state.pop("batch_job_finished")))
+        
+        batch, batch_shown_key = cached_results("batch", batch_cache_key)
+        if batch and results_partial("batch", batch_shown_key):
+            st.info("⏹ Search stopped early; showing the jobs found so far (not ranked or enriched).")
+        if batch:
+            st.success(f"Found {len(batch['data'])} total jobs across {batch['companies']} companies")
+            
+            # Show stats
+            st.markdown("### 📊 Results by Company")
+            stats_df = pd.DataFrame(batch["stats"])
+            st.dataframe(stats_df, use_container_width=True, hide_index=True)
+            
+            st.markdown("---")
+            st.markdown("### 📋 All Results")
+            
+            df = render_faceted_table(pd.DataFrame(batch["data"]), key="batch")
+            
+            render_export(
+                df,
+                f"batch_search_{datetime.now().strftime('%Y%m%d_%H%M')}",
+                key="batch_export",
+                sheets={"Results": df, "By Company": stats_df},
+                label="📥 Download All Results"
+            )
     
     # TOOL 4: Competitor Analysis
     elif premium_tool == "📊 Competitor Analysis":
@@ -1393,99 +4437,218 @@ with tab_premium:
                 default=["Past Week", "Past Month"],
                 key="comp_timeframes"
             )
+            
+            comp_background = st.checkbox("Run in background", key="comp_background",
+                                          help="Queue the analysis so it keeps running (and resumes after a restart) while you use other tools")
+            comp_priority = st.selectbox("Queue priority", list(JOB_PRIORITIES), index=1, key="comp_priority")
         
         st.markdown("---")
         
+        # Parse companies
+        companies = [c.strip() for c in competitor_companies.split('\n') if c.strip()]
+        comp_cache_key = " | ".join([", ".join(companies), competitor_roles, " OR ".join(comp_platforms), ", ".join(comp_timeframes)])
+        comp_params = {
+            "companies": companies, "role": competitor_roles, "platforms": comp_platforms,
+            "timeframes": comp_timeframes or ["Past Week"], "cache_key": comp_cache_key
+        }
+        comp_affordable = True
+        if companies:
+            # One query per company covers every time period (they're split locally by posting date)
+            comp_affordable = render_quota_cost(
+                estimate_cost("competitor", comp_params),
+                "It will be queued in the background and the overflow deferred until the quota resets."
+            )
+        
         if st.button("📊 Analyze Competitors", type="primary", use_container_width=True, key="comp_analyze"):
-            # Parse companies
-            companies = [c.strip() for c in competitor_companies.split('\n') if c.strip()]
-            
             if not companies or len(companies) < 2:
                 st.error("Please enter at least 2 companies to compare")
             elif not competitor_roles:
                 st.error("Please enter a role category")
             elif not comp_platforms:
                 st.error("Please select at least one platform")
+            elif comp_background or not comp_affordable:
+                st.session_state["competitor_job"] = submit_job("competitor", comp_params, f"Competitors: {len(companies)} companies",
+                                                                priority=JOB_PRIORITIES[comp_priority])
+                st.toast("Competitor analysis queued")
+            else:
+                with st.spinner(f"Analyzing {len(companies)} competitors ({len(companies)} searches for {len(comp_timeframes or ['Past Week'])} time periods)..."):
+                    analysis_data, _ = run_job_unit("competitor", comp_params, companies)
+                cache_results("competitor", comp_cache_key, analysis_data)
+        
+        if st.session_state.get("competitor_job"):
+            render_job_progress("competitor")
+        if st.session_state.get("competitor_job_finished"):
+            finish_job(get_job(st.session_state.pop("competitor_job_finished")))
+        
+        analysis_data, _ = cached_results("competitor", comp_cache_key)
+        if analysis_data:
+            df_analysis = pd.DataFrame(analysis_data)
+            companies = list(df_analysis['Company'].unique())
+            
+            # Pivot for better visualization
+            pivot_df = df_analysis.pivot(index='Company', columns='Time Period', values='Job Postings')
+            
+            st.markdown("### 📈 Hiring Activity Comparison")
+            st.dataframe(
+                pivot_df.style.background_gradient(cmap='RdYlGn', axis=None),
+                use_container_width=True
+            )
+            st.caption("Postings are estimated from Google's total result count, split by the posting dates of the sampled results.")
+            
+            # Summary insights
+            st.markdown("### 💡 Key Insights")
+            
+            col1, col2, col3 = st.columns(3)
+            
+            with col1:
+                most_active = df_analysis.groupby('Company')['Job Postings'].sum().idxmax()
+                most_active_count = df_analysis.groupby('Company')['Job Postings'].sum().max()
+                st.metric(
+                    "Most Active Hiring",
+                    most_active,
+                    f"{int(most_active_count)} postings"
+                )
+            
+            with col2:
+                total_postings = df_analysis['Job Postings'].sum()
+                st.metric(
+                    "Total Opportunities",
+                    int(total_postings),
+                    f"Across {len(companies)} companies"
+                )
+            
+            with col3:
+                avg_postings = df_analysis['Job Postings'].mean()
+                st.metric(
+                    "Average per Company",
+                    f"{avg_postings:.1f}",
+                    "per time period"
+                )
+            
+            # Download option
+            st.markdown("---")
+            render_export(
+                df_analysis,
+                f"competitor_analysis_{datetime.now().strftime('%Y%m%d_%H%M')}",
+                key="comp_export",
+                sheets={"Analysis": df_analysis, "Comparison": pivot_df.reset_index()},
+                label="📥 Download Analysis"
+            )
+            
+            # Show detailed breakdown
+            with st.expander("📋 Detailed Breakdown"):
+                st.dataframe(
+                    df_analysis.sort_values(['Time Period', 'Job Postings'], ascending=[True, False]),
+                    use_container_width=True,
+                    hide_index=True
+                )
+        
+        # Trends come from the stored history, so viewing them costs no quota
+        if companies and competitor_roles:
+            st.markdown("### 📉 Hiring Trends")
+            col1, col2 = st.columns(2)
+            with col1:
+                trend_timeframe = st.selectbox("Count", list(COMPETITOR_TIMEFRAMES), key="trend_timeframe")
+            with col2:
+                trend_grain = st.radio("Grain", list(TREND_GRAINS), horizontal=True, key="trend_grain")
+            
+            trend = hiring_trend(companies, competitor_roles, comp_platforms, trend_timeframe, TREND_GRAINS[trend_grain])
+            if trend.empty:
+                st.caption("No history yet for these companies. Every analysis run adds a data point.")
             else:
-                date_map_comp = {
-                    "Past Week": "w1",
-                    "Past Month": "m1",
-                    "Past 3 Months": "m3"
+                st.line_chart(trend.pivot_table(index="period", columns="company", values="postings", aggfunc="last"))
+            
+            velocity = new_postings_trend(companies, TREND_GRAINS[trend_grain])
+            if not velocity.empty:
+                st.markdown("**Newly seen postings**")
+                st.bar_chart(velocity.pivot_table(index="period", columns="company", values="new_postings", aggfunc="sum"))
+    
+    # TOOL 5: Query Yield Analytics
+    elif premium_tool == "📈 Query Yield":
+        st.markdown("### Query Yield Analytics")
+        st.info("💡 Which searches are worth their quota? Ranked by unique results per quota unit, from the search journal.")
+        
+        yield_view = st.radio("Group by", ["Query", "Template"], horizontal=True, key="yield_view")
+        
+        if yield_view == "Template":
+            template_stats = {row["name"]: row for row in query_yield_stats(group_by="template")}
+            rows = []
+            for category, templates in SEARCH_TEMPLATES.items():
+                for template_name in templates:
+                    row = template_stats.get(template_name, {})
+                    rows.append({
+                        "Template": template_name,
+                        "Category": category,
+                        "Runs": row.get("runs", 0),
+                        "Quota": row.get("quota", 0),
+                        "Unique / Unit": row.get("unique_per_unit", 0.0),
+                        "New / Unit": row.get("new_per_unit", 0.0),
+                        "Last Run": row.get("last_run", "")
+                    })
+            df_yield = pd.DataFrame(rows).sort_values(["Unique / Unit", "Runs"], ascending=False)
+        else:
+            df_yield = pd.DataFrame([
+                {
+                    "Query": row["name"],
+                    "Mode": row["mode"],
+                    "Runs": row["runs"],
+                    "Quota": row["quota"],
+                    "Unique / Unit": row["unique_per_unit"],
+                    "New / Unit": row["new_per_unit"],
+                    "Avg Latency (ms)": round(row["avg_latency_ms"] or 0),
+                    "Last Run": row["last_run"]
                 }
-                
-                analysis_data = []
-                
-                with st.spinner(f"Analyzing {len(companies)} competitors across {len(comp_timeframes)} time periods..."):
-                    for timeframe in comp_timeframes:
-                        for company in companies:
-                            query = f'({" OR ".join(comp_platforms)}) "{company}" "{competitor_roles}"'
-                            results = google_search(
-                                query,
-                                num_results=10,
-                                date_restrict=date_map_comp.get(timeframe)
-                            )
-                            
-                            analysis_data.append({
-                                "Company": company,
-                                "Time Period": timeframe,
-                                "Job Postings": len(results)
-                            })
-                
-                if analysis_data:
-                    df_analysis = pd.DataFrame(analysis_data)
-                    
-                    # Pivot for better visualization
-                    pivot_df = df_analysis.pivot(index='Company', columns='Time Period', values='Job Postings')
-                    
-                    st.markdown("### 📈 Hiring Activity Comparison")
-                    st.dataframe(
-                        pivot_df.style.background_gradient(cmap='RdYlGn', axis=None),
-                        use_container_width=True
-                    )
-                    
-                    # Summary insights
-                    st.markdown("### 💡 Key Insights")
-                    
-                    col1, col2, col3 = st.columns(3)
-                    
-                    with col1:
-                        most_active = df_analysis.groupby('Company')['Job Postings'].sum().idxmax()
-                        most_active_count = df_analysis.groupby('Company')['Job Postings'].sum().max()
-                        st.metric(
-                            "Most Active Hiring",
-                            most_active,
-                            f"{int(most_active_count)} postings"
-                        )
-                    
-                    with col2:
-                        total_postings = df_analysis['Job Postings'].sum()
-                        st.metric(
-                            "Total Opportunities",
-                            int(total_postings),
-                            f"Across {len(companies)} companies"
-                        )
-                    
-                    with col3:
-                        avg_postings = df_analysis['Job Postings'].mean()
-                        st.metric(
-                            "Average per Company",
-                            f"{avg_postings:.1f}",
-                            "per time period"
-                        )
-                    
-                    # Download option
-                    st.markdown("---")
-                    st.download_button(
-                        "📥 Download Analysis",
-                        convert_df_to_csv(df_analysis),
-                        f"competitor_analysis_{datetime.now().strftime('%Y%m%d_%H%M')}.csv",
-                        "text/csv"
-                    )
-                    
-                    # Show detailed breakdown
-                    with st.expander("📋 Detailed Breakdown"):
-                        st.dataframe(
-                            df_analysis.sort_values(['Time Period', 'Job Postings'], ascending=[True, False]),
-                            use_container_width=True,
-                            hide_index=True
-                        )
\ No newline at end of file
+                for row in query_yield_stats()
+            ])
+        
+        if df_yield.empty:
+            st.warning("No searches journaled yet. Run a few searches first.")
+        else:
+            st.dataframe(df_yield, use_container_width=True, hide_index=True)
+        
+        with st.expander("🕘 Recent Searches"):
+            history = load_search_history(limit=50)
+            if history:
+                st.dataframe(pd.DataFrame(history), use_container_width=True, hide_index=True)
+                if st.button("🗑️ Clear History", key="clear_history"):
+                    clear_search_history()
+                    st.rerun()
+            else:
+                st.caption("No searches yet.")
+    
+    elif premium_tool == "🗄️ Results Archive":
+        st.markdown("### Results Archive")
+        st.info("💡 Every result you've harvested, queryable with SQL (DuckDB). Runs locally: no quota used.")
+        
+        if results_archive is None:
+            st.warning("The archive needs pyarrow: `pip install pyarrow duckdb`")
+        else:
+            archive_sql = st.text_area("SQL over the `results` view", ARCHIVE_EXAMPLE_SQL, height=160, key="archive_sql")
+            with st.expander("Columns"):
+                st.caption(", ".join(results_archive.ARCHIVE_SCHEMA.names + ["date (archive day)"]))
+            
+            if st.button("▶️ Run Query", type="primary", use_container_width=True, key="archive_run"):
+                try:
+                    started = time.perf_counter()
+                    archive_df = results_archive.query(archive_sql, root=RESULTS_ARCHIVE_DIR, tenant=current_tenant())
+                    st.session_state["archive_elapsed"] = time.perf_counter() - started
+                    cache_results("archive", archive_sql, archive_df.to_dict("records"))
+                    if archive_df.empty:
+                        st.warning("The query returned no rows.")
+                except ImportError:
+                    st.error("Querying the archive needs DuckDB: `pip install duckdb`")
+                except Exception as e:
+                    st.error(f"Query failed: {e}")
+            
+            archive_rows, shown_sql = cached_results("archive", archive_sql)
+            if archive_rows:
+                capped = len(archive_rows) >= results_archive.QUERY_MAX_ROWS
+                st.caption(f"{len(archive_rows):,} rows in {st.session_state.get('archive_elapsed', 0) * 1000:.0f} ms"
+                           + (f" (capped at {results_archive.QUERY_MAX_ROWS:,})" if capped else "")
+                           + ("" if shown_sql == archive_sql else " · from the previous query"))
+                archive_df = pd.DataFrame(archive_rows)
+                st.dataframe(archive_df, use_container_width=True, hide_index=True)
+                render_export(archive_df, f"archive_query_{datetime.now().strftime('%Y%m%d_%H%M')}", key="archive_export")
+
+profile_mark("tab: Premium")
+render_profile()
@@ -0,0 +1,344 @@
+"""HTTP fetching and parsers for public ATS job boards and posting pages.
+
+ATS XRAY SEARCHING.py uses these to enrich search results (Greenhouse and Lever board APIs,
+else the posting page's schema.org JSON-LD) and to harvest whole Greenhouse, Lever and Ashby
+boards without spending quota. Nothing here touches Streamlit, so it can be imported and
+tested on its own; the endpoint constants can be pointed at a local HTTP stand-in.
+"""
+import json
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+GREENHOUSE_API = "https://boards-api.greenhouse.io/v1/boards"
+LEVER_API = "https://api.lever.co/v0/postings"
+ASHBY_API = "https://api.ashbyhq.com/posting-api/job-board"
+ENRICH_WORKERS = 16
+ENRICH_TIMEOUT = 10
+ENRICH_HOST_RATE = 10.0   # sustained requests/second per host
+ENRICH_HOST_BURST = 20
+ENRICH_FRESH_SECONDS = 6 * 3600  # cached pages younger than this are used without revalidating
+ENRICH_USER_AGENT = "Mozilla/5.0 (compatible; CyberSearchPro/1.0)"
+JSON_LD_RE = re.compile(r'<script[^>]+type=["\']application/ld\+json["\'][^>]*>(.*?)</script>', re.IGNORECASE | re.DOTALL)
+SALARY_PERIODS = {"year": "year", "annual": "year", "month": "month", "week": "week", "day": "day", "hour": "hour"}
+
+
+class TokenBucket:
+    """Thread-safe token bucket limiting the request rate to one host."""
+
+    def __init__(self, rate=ENRICH_HOST_RATE, burst=ENRICH_HOST_BURST):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class PageCache:
+    """Persistent page cache keyed by URL, storing validators for conditional GETs."""
+
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL,
+                body TEXT
+            )
+        """)
+
+    def get(self, url):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT etag, last_modified, fetched_at, body FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+        if not row:
+            return None
+        return {"etag": row[0], "last_modified": row[1], "fetched_at": row[2], "body": row[3]}
+
+    def put(self, url, body, etag=None, last_modified=None):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pages (url, etag, last_modified, fetched_at, body) VALUES (?, ?, ?, ?, ?)",
+                (url, etag, last_modified, time.time(), body)
+            )
+
+    def touch(self, url):
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE pages SET fetched_at = ? WHERE url = ?", (time.time(), url))
+
+    def close(self):
+        self.conn.close()
+
+
+class PageFetcher:
+    """Pooled HTTP client with per-host rate limits and ETag/Last-Modified revalidation."""
+
+    def __init__(self, cache, workers=ENRICH_WORKERS, rate=ENRICH_HOST_RATE, burst=ENRICH_HOST_BURST):
+        self.cache = cache
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+        self.buckets_lock = threading.Lock()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["User-Agent"] = ENRICH_USER_AGENT
+        self.stats = {"network": 0, "not_modified": 0, "cached": 0, "errors": 0}
+        self.not_found = set()  # URLs that answered 404: gone for sure, unlike a timeout or a 5xx
+        self.stats_lock = threading.Lock()
+
+    def count(self, outcome):
+        with self.stats_lock:
+            self.stats[outcome] += 1
+
+    def bucket(self, url):
+        host = url.split('/')[2] if url.count('/') >= 2 else url
+        with self.buckets_lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.rate, self.burst)
+            return self.buckets[host]
+
+    def fetch(self, url):
+        """Return the body for `url`, from cache when fresh or unchanged. None on failure or a 404."""
+        cached = self.cache.get(url)
+        if cached and time.time() - cached["fetched_at"] < ENRICH_FRESH_SECONDS:
+            self.count("cached")
+            return cached["body"]
+
+        headers = {}
+        if cached and cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached and cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+        self.bucket(url).acquire()
+        try:
+            response = self.session.get(url, headers=headers, timeout=ENRICH_TIMEOUT)
+            if response.status_code == 304 and cached:
+                self.cache.touch(url)
+                self.count("not_modified")
+                return cached["body"]
+            if response.status_code == 404:
+                with self.stats_lock:
+                    self.not_found.add(url)
+            response.raise_for_status()
+        except Exception:
+            self.count("errors")
+            return cached["body"] if cached and url not in self.not_found else None
+
+        self.count("network")
+        self.cache.put(url, response.text, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        return response.text
+
+    def fetch_many(self, urls, workers=ENRICH_WORKERS):
+        """Fetch URLs concurrently, returning {url: body}."""
+        urls = list(dict.fromkeys(urls))
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(urls)))) as pool:
+            return dict(zip(urls, pool.map(self.fetch, urls)))
+
+    def close(self):
+        self.session.close()
+
+
+def salary_period(unit):
+    """Map salary unit labels ('YEAR', 'per-year-salary', 'hourly') onto target_cols salaryPeriod values."""
+    unit = (unit or '').lower()
+    for key, period in SALARY_PERIODS.items():
+        if key in unit:
+            return period
+    return None
+
+
+def parse_greenhouse_job(job):
+    """Structured fields from a Greenhouse board API job."""
+    posted = job.get("first_published") or job.get("updated_at") or ""
+    fields = {
+        "postedDate": posted[:10] or None,
+        "location": (job.get("location") or {}).get("name")
+    }
+    for meta in job.get("metadata") or []:
+        name = (meta.get("name") or "").lower()
+        if "employment type" in name and meta.get("value"):
+            fields["employmentType"] = meta["value"] if isinstance(meta["value"], str) else ", ".join(meta["value"])
+    return fields
+
+
+def parse_lever_posting(posting):
+    """Structured fields from a Lever postings API entry."""
+    categories = posting.get("categories") or {}
+    created = posting.get("createdAt")
+    fields = {
+        "postedDate": datetime.fromtimestamp(created / 1000).strftime("%Y-%m-%d") if created else None,
+        "location": categories.get("location"),
+        "employmentType": categories.get("commitment")
+    }
+    salary = posting.get("salaryRange") or {}
+    if salary:
+        fields.update({
+            "salaryMin": salary.get("min"),
+            "salaryMax": salary.get("max"),
+            "salaryCurrency": salary.get("currency"),
+            "salaryPeriod": salary_period(salary.get("interval"))
+        })
+    return fields
+
+
+def parse_job_posting_html(body):
+    """Structured fields from a page's schema.org JobPosting JSON-LD block."""
+    for block in JSON_LD_RE.findall(body or ''):
+        try:
+            data = json.loads(block.strip())
+        except ValueError:
+            continue
+        candidates = data if isinstance(data, list) else data.get("@graph", [data])
+        for node in candidates:
+            if not isinstance(node, dict) or node.get("@type") != "JobPosting":
+                continue
+            fields = {"postedDate": (node.get("datePosted") or "")[:10] or None}
+            locations = node.get("jobLocation") or []
+            if isinstance(locations, dict):
+                locations = [locations]
+            names = []
+            for loc in locations:
+                address = (loc or {}).get("address") or {}
+                if isinstance(address, str):
+                    names.append(address)
+                else:
+                    parts = [address.get(k) for k in ("addressLocality", "addressRegion", "addressCountry")]
+                    names.append(", ".join(p for p in parts if isinstance(p, str) and p))
+            if node.get("jobLocationType") == "TELECOMMUTE":
+                names.append("Remote")
+            fields["location"] = "; ".join(n for n in names if n) or None
+            employment = node.get("employmentType")
+            fields["employmentType"] = ", ".join(employment) if isinstance(employment, list) else employment
+            salary = node.get("baseSalary") or {}
+            if isinstance(salary, dict):
+                value = salary.get("value") or {}
+                if not isinstance(value, dict):
+                    value = {"value": value}
+                fields.update({
+                    "salaryMin": value.get("minValue", value.get("value")),
+                    "salaryMax": value.get("maxValue", value.get("value")),
+                    "salaryCurrency": salary.get("currency"),
+                    "salaryPeriod": salary_period(value.get("unitText"))
+                })
+            return fields
+    return {}
+
+
+def enrichment_source(link):
+    """Where to fetch structured data for a result: (kind, fetch url, job id)."""
+    parts = link.split('?')[0].rstrip('/').split('/')
+    host = parts[2].lower() if len(parts) > 2 else ""
+    if host.endswith("greenhouse.io") and len(parts) > 5 and parts[4] == "jobs":
+        return "greenhouse", f"{GREENHOUSE_API}/{parts[3]}/jobs", parts[5]
+    if host == "jobs.lever.co" and len(parts) > 4:
+        return "lever", f"{LEVER_API}/{parts[3]}?mode=json", parts[4]
+    return "html", link.split('#')[0], None
+
+
+def board_url(platform, slug):
+    """Public API URL listing every open job on a company's board."""
+    if platform == "greenhouse":
+        return f"{GREENHOUSE_API}/{slug}/jobs"
+    if platform == "lever":
+        return f"{LEVER_API}/{slug}?mode=json"
+    return f"{ASHBY_API}/{slug}?includeCompensation=true"
+
+
+def parse_ashby_job(job):
+    """Structured fields from an Ashby job board API entry."""
+    fields = {
+        "postedDate": (job.get("publishedAt") or "")[:10] or None,
+        "location": "Remote" if job.get("isRemote") and not job.get("location") else job.get("location"),
+        "employmentType": job.get("employmentType")
+    }
+    return fields
+
+
+def parse_board(platform, body):
+    """Parse a board payload into [{id, title, url, fields}], or None if it isn't a valid board."""
+    try:
+        payload = json.loads(body or 'null')
+    except ValueError:
+        return None
+    if platform == "greenhouse" and isinstance(payload, dict) and isinstance(payload.get("jobs"), list):
+        return [{"id": str(j.get("id")), "title": j.get("title", ""), "url": j.get("absolute_url", ""),
+                 "fields": parse_greenhouse_job(j)} for j in payload["jobs"]]
+    if platform == "lever" and isinstance(payload, list):  # a board with no open jobs is still a board
+        return [{"id": str(p.get("id")), "title": p.get("text", ""), "url": p.get("hostedUrl", ""),
+                 "fields": parse_lever_posting(p)} for p in payload]
+    if platform == "ashby" and isinstance(payload, dict) and isinstance(payload.get("jobs"), list):
+        return [{"id": str(j.get("id")), "title": j.get("title", ""), "url": j.get("jobUrl", ""),
+                 "fields": parse_ashby_job(j)} for j in payload["jobs"]]
+    return None
+
+
+def board_slugs(names):
+    """Board slugs to probe for a company's names, in order and without duplicates.
+
+    `names` starts with the canonical name ('Palo Alto Networks' -> paloaltonetworks,
+    palo-alto-networks). Other all-caps names of up to five letters are tickers ("PANW"),
+    which as slugs often belong to some other company's board, so they are skipped.
+    """
+    slugs = []
+    for position, name in enumerate(names):
+        if position and re.fullmatch(r'[A-Z]{1,5}', name or ''):
+            continue
+        words = re.findall(r'[a-z0-9]+', (name or '').lower())
+        for slug in ("".join(words), "-".join(words)):
+            if slug and slug not in slugs:
+                slugs.append(slug)
+    return slugs
+
+
+def probe_boards(fetcher, candidates):
+    """Find each company's board among its (platform, slug) candidates, fetched concurrently.
+
+    Returns ({company: (platform, slug) or None}, companies to retry). The first candidate with
+    open jobs wins, else the first empty board. None means no board: every candidate answered
+    404 or with something that isn't a board. Companies with a candidate that failed
+    transiently (timeout, 5xx) are in the retry set, so a miss or a second choice isn't
+    remembered because of a network error.
+    """
+    urls = [board_url(platform, slug) for pairs in candidates.values() for platform, slug in pairs]
+    bodies = fetcher.fetch_many(urls) if urls else {}
+    found, retry = {}, set()
+    for company, pairs in candidates.items():
+        boards = []
+        for platform, slug in pairs:
+            url = board_url(platform, slug)
+            if bodies.get(url) is None:
+                if url not in fetcher.not_found:
+                    retry.add(company)
+                continue
+            jobs = parse_board(platform, bodies[url])
+            if jobs is not None:
+                boards.append((platform, slug, bool(jobs)))
+        best = next((b for b in boards if b[2]), boards[0] if boards else None)
+        found[company] = best[:2] if best else None
+    return found, retry
@@ -0,0 +1,213 @@
+"""Rerun-latency benchmark for ATS XRAY SEARCHING.py, driven through Streamlit's AppTest.
+
+Seeds a scratch working directory with N saved searches (N results each) and N journaled
+searches, then times typical interactions at each scale: first load, switching the premium
+tool, changing a filter, running a Jobs search and loading a saved search. Google is stubbed
+at the transport level (requests.get returns a synthetic Custom Search payload), because
+AppTest re-executes the script on every run and module functions can't be patched directly.
+
+Each run appends its numbers to a JSON Lines history file and compares them with the previous
+run at the same scale, so rerun regressions show up before users notice them.
+
+    python "docs/ats_rerun_benchmark.py" --scales 10,100,1000 --repeat 3
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import requests
+from streamlit.testing.v1 import AppTest
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ATS XRAY SEARCHING.py")
+DEFAULT_HISTORY = "rerun_benchmark_history.jsonl"
+REGRESSION_THRESHOLD = 0.20  # flag interactions more than 20% slower than the previous run
+
+
+class FakeResponse:
+    """Just enough of requests.Response for google_search_response."""
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.status_code = 200
+        self.headers = {}
+        self.text = json.dumps(payload)
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+def synthetic_search(url, params=None, **kwargs):
+    """Synthetic Custom Search payload: a full page of job postings for any query."""
+    start = (params or {}).get("start", 1)
+    items = [
+        {
+            "title": f"Security Analyst {start + i} at Company{i % 7}",
+            "link": f"https://boards.greenhouse.io/company{i % 7}/jobs/{start + i}",
+            "snippet": f"{i + 1} days ago · Remote · Full-time · $90k - $120k a year. SIEM, Splunk, incident response.",
+            "pagemap": {"metatags": [{"og:description": "Join our SOC team. Location: Austin, TX"}]}
+        }
+        for i in range((params or {}).get("num", 10))
+    ]
+    return FakeResponse({"items": items, "searchInformation": {"totalResults": "250"}})
+
+
+def seed_data(scale):
+    """Write saved searches and legacy search history at the given scale into the cwd."""
+    saved = [
+        {
+            "name": f"Saved {n}",
+            "type": "🔍 Custom",
+            "results": [
+                {"Name": f"Person {n}-{i}", "Title": "Security Engineer at Company", "Location": "Austin, TX",
+                 "Profile": f"https://www.linkedin.com/in/person-{n}-{i}"}
+                for i in range(scale)
+            ],
+            "created": datetime.now().strftime("%Y-%m-%d %H:%M")
+        }
+        for n in range(scale)
+    ]
+    with open("saved_searches.json", "w") as f:
+        json.dump(saved, f)
+
+    # The journal imports the legacy history file the first time it is created
+    history = [
+        {"timestamp": datetime.now().strftime("%Y-%m-%d %H:%M"), "query": f"site:linkedin.com/in/ security {n}",
+         "mode": "People", "results": 10}
+        for n in range(scale)
+    ]
+    with open("search_history.json", "w") as f:
+        json.dump(history, f)
+
+
+def find_button(at, label):
+    return next(b for b in at.button if b.label == label)
+
+
+INTERACTIONS = [
+    ("first load", lambda at: at.run()),
+    ("switch tool", lambda at: at.radio(key="premium_tool").set_value("📈 Query Yield").run()),
+    ("change filter", lambda at: at.selectbox(key="job_exp").set_value("Senior").run()),
+    ("run search", lambda at: find_button(at, "🔍 Search Jobs").click().run()),
+    ("load saved search", lambda at: next(b for b in at.button if b.label.startswith("📌")).click().run()),
+]
+
+
+def measure(action, at):
+    """Wall time (ms) of one interaction's rerun, plus peak traced memory (MB) if tracemalloc is on."""
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+    started = time.perf_counter()
+    action(at)
+    elapsed = (time.perf_counter() - started) * 1000
+    peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024 if tracing else 0.0
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    return elapsed, peak
+
+
+def run_session(scale, timeout):
+    """One fresh app session seeded at `scale`: [(interaction, ms, peak MB)]."""
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        seed_data(scale)
+        at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        return [(name, *measure(action, at)) for name, action in INTERACTIONS]
+
+
+def run_scale(scale, repeat, timeout):
+    """Time every interaction over `repeat` sessions, then one traced session for peak memory.
+    
+    tracemalloc slows Python down several times over, so it stays off while timing.
+    """
+    timings = {name: [] for name, _ in INTERACTIONS}
+    for _ in range(repeat):
+        for name, elapsed, _ in run_session(scale, timeout):
+            timings[name].append(elapsed)
+    tracemalloc.start()
+    try:
+        peaks = {name: peak for name, _, peak in run_session(scale, timeout)}
+    finally:
+        tracemalloc.stop()
+    return [
+        {"scale": scale, "interaction": name, "median_ms": round(statistics.median(timings[name]), 1),
+         "max_ms": round(max(timings[name]), 1), "peak_mb": round(peaks[name], 1)}
+        for name, _ in INTERACTIONS
+    ]
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(APP_PATH), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def previous_results(history_path):
+    """Latest recorded row per (scale, interaction)."""
+    latest = {}
+    if os.path.exists(history_path):
+        with open(history_path) as f:
+            for line in f:
+                row = json.loads(line)
+                latest[(row["scale"], row["interaction"])] = row
+    return latest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", default="10,100,1000",
+                        help="comma-separated data scales (saved searches, results per saved search, history rows)")
+    parser.add_argument("--repeat", type=int, default=3, help="fresh app sessions per scale")
+    parser.add_argument("--timeout", type=float, default=120, help="AppTest timeout per rerun (seconds)")
+    parser.add_argument("--history", default=DEFAULT_HISTORY, help="JSON Lines file the results are appended to")
+    args = parser.parse_args()
+
+    history_path = os.path.abspath(args.history)
+    previous = previous_results(history_path)
+    os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+    os.environ.setdefault("GOOGLE_CX", "benchmark")
+    requests.get = synthetic_search
+    revision, run_at = git_revision(), datetime.now().isoformat(timespec="seconds")
+    home = os.getcwd()
+
+    rows = []
+    try:
+        for scale in [int(s) for s in args.scales.split(",") if s.strip()]:
+            rows.extend(run_scale(scale, args.repeat, args.timeout))
+    finally:
+        os.chdir(home)
+
+    regressions = []
+    print(f"{'scale':>6}  {'interaction':<18} {'median ms':>10} {'max ms':>8} {'peak MB':>8}  vs previous")
+    for row in rows:
+        before = previous.get((row["scale"], row["interaction"]))
+        change = ""
+        if before and before["median_ms"]:
+            ratio = row["median_ms"] / before["median_ms"] - 1
+            change = f"{ratio:+.0%}"
+            if ratio > REGRESSION_THRESHOLD:
+                change += "  <-- regression"
+                regressions.append(row)
+        print(f"{row['scale']:>6}  {row['interaction']:<18} {row['median_ms']:>10} {row['max_ms']:>8} {row['peak_mb']:>8}  {change}")
+
+    with open(history_path, "a") as f:
+        for row in rows:
+            f.write(json.dumps({"run_at": run_at, "revision": revision, **row}) + "\n")
+    print(f"\nAppended {len(rows)} rows to {history_path}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
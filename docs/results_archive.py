@@ -0,0 +1,207 @@
+"""Columnar archive of every normalized search result, queryable with DuckDB.
+
+ATS XRAY SEARCHING.py appends each search's results as a small Parquet file under
+results_archive/tenant=<tenant hash>/date=<YYYY-MM-DD>/. A posting is archived once per
+tenant and day (by url_key), however many searches return it; count postings over
+several days with COUNT(DISTINCT url_key). Small files in a partition are compacted
+into one, so scans over millions of archived rows stay fast. Queries run in an
+in-memory DuckDB that can only read the archive (one tenant's directory, or all of them
+from the CLI), so analytics cost no quota and never touch the SQLite stores.
+
+    python "docs/results_archive.py" query "SELECT company, COUNT(DISTINCT url_key) FROM results
+        WHERE source = 'Lever' AND role ILIKE '%SOC Analyst%'
+          AND date >= current_date - INTERVAL 90 DAY GROUP BY 1 ORDER BY 2 DESC"
+    python "docs/results_archive.py" compact
+"""
+import argparse
+import glob
+import hashlib
+import os
+import sys
+import threading
+import uuid
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+ARCHIVE_DIR = "results_archive"
+COMPACT_MIN_FILES = 16  # compact a day's partition once it has this many files
+QUERY_MAX_ROWS = 10_000
+ARCHIVE_SCHEMA = pa.schema([
+    ("archived_at", pa.timestamp("s")),
+    ("mode", pa.string()),
+    ("query", pa.string()),
+    ("template", pa.string()),
+    ("url", pa.string()),
+    ("url_key", pa.string()),
+    ("title", pa.string()),
+    ("snippet", pa.string()),
+    ("company", pa.string()),
+    ("source", pa.string()),
+    ("location", pa.string()),
+    ("employment_type", pa.string()),
+    ("salary_min", pa.float64()),
+    ("salary_max", pa.float64()),
+    ("salary_currency", pa.string()),
+    ("salary_period", pa.string()),
+    ("posted_date", pa.date32()),
+    ("remote", pa.bool_()),
+    ("field", pa.string()),
+    ("role", pa.string()),
+    ("seniority", pa.string()),
+    ("skills", pa.string()),
+])
+
+compact_lock = threading.Lock()
+append_lock = threading.Lock()  # the url_key check and the write must not interleave
+partition_keys = {}  # partition -> url_keys archived there (only today's are kept)
+
+
+def tenant_partition(tenant):
+    """Directory-safe partition value for a tenant (emails stay out of paths)."""
+    return hashlib.sha1(tenant.encode("utf-8")).hexdigest()[:12]
+
+
+def tenant_dir(tenant, root=ARCHIVE_DIR):
+    return os.path.join(root, f"tenant={tenant_partition(tenant)}")
+
+
+def archived_keys(partition):
+    """url_keys already in a partition, read from its files the first time it's appended to."""
+    if partition not in partition_keys:
+        day = os.path.basename(partition)
+        for stale in [p for p in partition_keys if os.path.basename(p) != day]:
+            del partition_keys[stale]
+        keys = set()
+        for path in glob.glob(os.path.join(partition, "*.parquet")):
+            keys.update(pq.read_table(path, columns=["url_key"]).column("url_key").to_pylist())
+        partition_keys[partition] = keys
+    return partition_keys[partition]
+
+
+def append(records, tenant, root=ARCHIVE_DIR, now=None):
+    """Write records (dicts keyed by ARCHIVE_SCHEMA names) as one Parquet file in today's partition.
+
+    Records whose url_key is already in the partition are dropped, so repeat searches
+    don't inflate posting counts. Returns the file written, or None if nothing was new.
+    """
+    now = now or datetime.now()
+    partition = os.path.join(tenant_dir(tenant, root), f"date={now:%Y-%m-%d}")
+    with append_lock:
+        seen = archived_keys(partition)
+        fresh = []
+        for record in records:
+            if record["url_key"] not in seen:
+                seen.add(record["url_key"])
+                fresh.append(record)
+        if not fresh:
+            return None
+        os.makedirs(partition, exist_ok=True)
+        table = pa.Table.from_pylist(fresh, schema=ARCHIVE_SCHEMA)
+        path = os.path.join(partition, f"part-{now:%H%M%S}-{uuid.uuid4().hex[:8]}.parquet")
+        pq.write_table(table, path + ".tmp")
+        os.replace(path + ".tmp", path)  # readers never see a half-written file
+    if len(glob.glob(os.path.join(partition, "*.parquet"))) >= COMPACT_MIN_FILES:
+        compact_partition(partition)
+    return path
+
+
+def compact_partition(partition):
+    """Merge a partition's files into one. Returns the number of files merged."""
+    with compact_lock:
+        files = sorted(glob.glob(os.path.join(partition, "*.parquet")))
+        if len(files) < 2:
+            return 0
+        table = pa.concat_tables([pq.read_table(f, schema=ARCHIVE_SCHEMA) for f in files])
+        path = os.path.join(partition, f"compacted-{datetime.now():%H%M%S}-{uuid.uuid4().hex[:8]}.parquet")
+        pq.write_table(table, path + ".tmp", row_group_size=128 * 1024)
+        os.replace(path + ".tmp", path)
+        for f in files:
+            try:
+                os.remove(f)
+            except FileNotFoundError:  # another process compacted it first
+                pass
+        return len(files)
+
+
+def compact(root=ARCHIVE_DIR, min_files=2):
+    """Compact every partition that has at least `min_files` files. Returns {partition: files merged}."""
+    merged = {}
+    for partition in sorted(glob.glob(os.path.join(root, "tenant=*", "date=*"))):
+        if len(glob.glob(os.path.join(partition, "*.parquet"))) >= min_files:
+            merged[partition] = compact_partition(partition)
+    return merged
+
+
+def connect(root=ARCHIVE_DIR, tenant=None):
+    """In-memory DuckDB with a `results` view over the archive (one tenant's, or all of it).
+
+    File access is locked to the archive directory, so SQL typed into the app can't read
+    other tenants' partitions or anything else on the server.
+    """
+    import duckdb
+    base = os.path.abspath(tenant_dir(tenant, root) if tenant else root)
+    conn = duckdb.connect()
+    conn.execute(f"SET allowed_directories = ['{base}/']")
+    conn.execute("SET enable_external_access = false")
+    conn.execute("SET lock_configuration = true")
+    if glob.glob(os.path.join(base, "**", "*.parquet"), recursive=True):
+        conn.execute(f"""CREATE VIEW results AS SELECT * FROM read_parquet('{base}/**/*.parquet',
+                         hive_partitioning = true, hive_types = {{'tenant': VARCHAR, 'date': DATE}},
+                         union_by_name = true)""")
+    else:
+        conn.execute(f"CREATE VIEW results AS SELECT * FROM ({empty_select()})")
+    return conn
+
+
+def empty_select():
+    """A zero-row SELECT with the archive's columns, for an archive with no files yet."""
+    duck_types = {pa.string(): "VARCHAR", pa.float64(): "DOUBLE", pa.date32(): "DATE",
+                  pa.bool_(): "BOOLEAN", pa.timestamp("s"): "TIMESTAMP"}
+    columns = [f"NULL::{duck_types[field.type]} AS {field.name}" for field in ARCHIVE_SCHEMA]
+    return f"SELECT {', '.join(columns)}, NULL::DATE AS date, NULL::VARCHAR AS tenant WHERE false"
+
+
+def query(sql, root=ARCHIVE_DIR, tenant=None, max_rows=QUERY_MAX_ROWS):
+    """Run one read-only SELECT against the archive and return a DataFrame (at most max_rows rows)."""
+    import duckdb
+    conn = connect(root, tenant)
+    try:
+        statements = conn.extract_statements(sql)
+        if len(statements) != 1 or statements[0].type != duckdb.StatementType.SELECT:
+            raise ValueError("Only a single SELECT statement can be run against the archive.")
+        return conn.sql(statements[0].query).limit(max_rows).df()
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--root", default=ARCHIVE_DIR, help="archive directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("query", help="run a SELECT over the `results` view")
+    run.add_argument("sql")
+    run.add_argument("--tenant", help="only this tenant's results (email, or 'default')")
+    run.add_argument("--max-rows", type=int, default=QUERY_MAX_ROWS)
+    run.add_argument("--out", help="write the result to .csv or .parquet instead of printing it")
+    packer = commands.add_parser("compact", help="merge small files in every partition")
+    packer.add_argument("--min-files", type=int, default=2)
+    args = parser.parse_args()
+
+    if args.command == "compact":
+        merged = compact(args.root, args.min_files)
+        print(f"Compacted {sum(merged.values())} files in {len(merged)} partitions")
+        return 0
+
+    df = query(args.sql, args.root, args.tenant, args.max_rows)
+    if args.out:
+        df.to_parquet(args.out, index=False) if args.out.endswith(".parquet") else df.to_csv(args.out, index=False)
+        print(f"Wrote {len(df):,} rows to {args.out}")
+    else:
+        print(df.to_string(index=False, max_colwidth=60))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# The app's helper modules live next to it in docs/ and are imported by bare name
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ats_fetch  # noqa: E402
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """Serves `routes` ({path: (status, body, headers)}) and records every request's headers."""
+
+    routes = {}
+    requests = []
+
+    def do_GET(self):
+        type(self).requests.append((self.path, dict(self.headers)))
+        status, body, headers = self.routes.get(self.path, (404, "", {}))
+        if headers.get("ETag") and self.headers.get("If-None-Match") == headers["ETag"]:
+            status, body = 304, ""
+        elif headers.get("Last-Modified") and self.headers.get("If-Modified-Since") == headers["Last-Modified"]:
+            status, body = 304, ""
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body.encode("utf-8"))
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    handler = type("Handler", (StandIn,), {"routes": {}, "requests": []})
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    handler.base = f"http://127.0.0.1:{httpd.server_port}"
+    yield handler
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def fetcher(tmp_path):
+    cache = ats_fetch.PageCache(str(tmp_path / "pages.db"))
+    fetcher = ats_fetch.PageFetcher(cache, workers=4)
+    yield fetcher
+    fetcher.close()
+    cache.close()
@@ -0,0 +1,127 @@
+"""ats_fetch against recorded board payloads and a local http.server stand-in for the ATS hosts."""
+import json
+import os
+import time
+
+import ats_fetch
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name)) as f:
+        return f.read()
+
+
+def test_greenhouse_board_fields():
+    jobs = ats_fetch.parse_board("greenhouse", fixture("greenhouse_board.json"))
+    assert [job["id"] for job in jobs] == ["4012345", "4019876"]
+    assert jobs[0]["url"] == "https://boards.greenhouse.io/acmesecurity/jobs/4012345"
+    assert jobs[0]["fields"] == {"postedDate": "2026-10-02", "location": "Austin, TX", "employmentType": "Full-time"}
+    # No first_published: fall back to updated_at; null metadata is no metadata
+    assert jobs[1]["fields"] == {"postedDate": "2026-10-16", "location": "Remote - US"}
+
+
+def test_lever_board_fields():
+    jobs = ats_fetch.parse_board("lever", fixture("lever_board.json"))
+    assert jobs[0]["title"] == "Threat Intelligence Analyst"
+    assert jobs[0]["fields"]["location"] == "New York, NY"
+    assert jobs[0]["fields"]["employmentType"] == "Full Time"
+    assert (jobs[0]["fields"]["salaryMin"], jobs[0]["fields"]["salaryMax"]) == (120000, 150000)
+    assert jobs[0]["fields"]["salaryPeriod"] == "year"
+    assert "salaryMin" not in jobs[1]["fields"]
+
+
+def test_ashby_board_fields():
+    jobs = ats_fetch.parse_board("ashby", fixture("ashby_board.json"))
+    assert jobs[0]["fields"] == {"postedDate": "2026-10-09", "location": "San Francisco, CA", "employmentType": "FullTime"}
+    assert jobs[1]["fields"]["location"] == "Remote"
+
+
+def test_invalid_boards():
+    assert ats_fetch.parse_board("greenhouse", "<html>Not found</html>") is None
+    assert ats_fetch.parse_board("greenhouse", None) is None
+    assert ats_fetch.parse_board("ashby", '{"error": "not found"}') is None
+
+
+def test_job_posting_json_ld():
+    fields = ats_fetch.parse_job_posting_html(fixture("job_posting.html"))
+    assert fields == {
+        "postedDate": "2026-10-11",
+        "location": "Denver, CO, US; Remote",
+        "employmentType": "FULL_TIME",
+        "salaryMin": 110000,
+        "salaryMax": 140000,
+        "salaryCurrency": "USD",
+        "salaryPeriod": "year",
+    }
+    assert ats_fetch.parse_job_posting_html("<html><body>No structured data</body></html>") == {}
+
+
+def test_conditional_get_with_etag(server, fetcher, monkeypatch):
+    server.routes["/board"] = (200, fixture("greenhouse_board.json"), {"ETag": '"v1"'})
+    url = f"{server.base}/board"
+    first = fetcher.fetch(url)
+    monkeypatch.setattr(ats_fetch, "ENRICH_FRESH_SECONDS", 0)  # force revalidation
+    second = fetcher.fetch(url)
+
+    assert first == second == fixture("greenhouse_board.json")
+    assert "If-None-Match" not in server.requests[0][1]
+    assert server.requests[1][1]["If-None-Match"] == '"v1"'
+    assert fetcher.stats == {"network": 1, "not_modified": 1, "cached": 0, "errors": 0}
+
+
+def test_conditional_get_with_last_modified(server, fetcher, monkeypatch):
+    stamp = "Wed, 14 Oct 2026 09:00:00 GMT"
+    server.routes["/page"] = (200, fixture("job_posting.html"), {"Last-Modified": stamp})
+    monkeypatch.setattr(ats_fetch, "ENRICH_FRESH_SECONDS", 0)
+    fetcher.fetch(f"{server.base}/page")
+    assert fetcher.fetch(f"{server.base}/page") == fixture("job_posting.html")
+    assert server.requests[1][1]["If-Modified-Since"] == stamp
+    assert fetcher.stats["not_modified"] == 1
+
+
+def test_fresh_pages_skip_the_network(server, fetcher):
+    server.routes["/board"] = (200, "[]", {})
+    fetcher.fetch(f"{server.base}/board")
+    fetcher.fetch(f"{server.base}/board")
+    assert len(server.requests) == 1
+    assert fetcher.stats["cached"] == 1
+
+
+def test_errors_fall_back_to_the_cached_body(server, fetcher, monkeypatch):
+    server.routes["/board"] = (200, "[]", {})
+    assert fetcher.fetch(f"{server.base}/board") == "[]"
+    server.routes["/board"] = (500, "oops", {})
+    monkeypatch.setattr(ats_fetch, "ENRICH_FRESH_SECONDS", 0)
+    assert fetcher.fetch(f"{server.base}/board") == "[]"
+    assert fetcher.fetch(f"{server.base}/missing") is None
+    assert fetcher.stats["errors"] == 2
+
+
+def test_per_host_rate_limit(server, tmp_path):
+    for n in range(8):
+        server.routes[f"/job/{n}"] = (200, "{}", {})
+    cache = ats_fetch.PageCache(str(tmp_path / "pages.db"))
+    fetcher = ats_fetch.PageFetcher(cache, workers=8, rate=20, burst=2)
+    try:
+        started = time.monotonic()
+        bodies = fetcher.fetch_many([f"{server.base}/job/{n}" for n in range(8)])
+        elapsed = time.monotonic() - started
+    finally:
+        fetcher.close()
+        cache.close()
+    assert len(bodies) == 8 and all(body == "{}" for body in bodies.values())
+    # A burst of 2, then 6 more at 20/s
+    assert elapsed >= 6 / 20 * 0.9
+
+
+def test_board_enrichment_through_the_stand_in(server, fetcher, monkeypatch):
+    monkeypatch.setattr(ats_fetch, "GREENHOUSE_API", f"{server.base}/v1/boards")
+    server.routes["/v1/boards/acmesecurity/jobs"] = (200, fixture("greenhouse_board.json"), {})
+    kind, url, job_id = ats_fetch.enrichment_source("https://boards.greenhouse.io/acmesecurity/jobs/4012345?gh_src=x")
+    assert (kind, job_id) == ("greenhouse", "4012345")
+    assert url == ats_fetch.board_url("greenhouse", "acmesecurity")
+    jobs = {job["id"]: job for job in ats_fetch.parse_board(kind, fetcher.fetch(url))}
+    assert jobs[job_id]["fields"]["location"] == "Austin, TX"
+    assert json.loads(fetcher.fetch(url))["meta"]["total"] == 2
@@ -0,0 +1,80 @@
+"""Board slug candidates and board probing, against recorded board payloads served locally."""
+import os
+
+import pytest
+
+import ats_fetch
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name)) as f:
+        return f.read()
+
+
+@pytest.fixture
+def boards(server, monkeypatch):
+    """Point every ATS API at the stand-in; returns a function that publishes a board."""
+    for name, prefix in [("GREENHOUSE_API", "/greenhouse"), ("LEVER_API", "/lever"), ("ASHBY_API", "/ashby")]:
+        monkeypatch.setattr(ats_fetch, name, server.base + prefix)
+
+    def publish(platform, slug, status=200, body=None):
+        path = ats_fetch.board_url(platform, slug)[len(server.base):]
+        server.routes[path] = (status, body, {})
+    return publish
+
+
+def test_board_slugs_put_the_canonical_name_first():
+    names = ["Palo Alto Networks", "palo alto", "Palo Alto", "Palo Alto", "paloaltonetworks", "PANW"]
+    assert ats_fetch.board_slugs(names) == ["paloaltonetworks", "palo-alto-networks", "paloalto", "palo-alto"]
+
+
+def test_board_slugs_skip_tickers_but_not_an_all_caps_canonical_name():
+    assert "panw" not in ats_fetch.board_slugs(["Palo Alto Networks", "PANW"])
+    assert ats_fetch.board_slugs(["IBM", "International Business Machines"])[0] == "ibm"
+
+
+def test_first_candidate_board_wins(boards, fetcher):
+    boards("greenhouse", "paloaltonetworks", body=fixture("greenhouse_board.json"))
+    boards("greenhouse", "palo-alto-networks", body=fixture("greenhouse_board.json"))
+    candidates = {"Palo Alto Networks": [("greenhouse", "paloaltonetworks"), ("greenhouse", "palo-alto-networks")]}
+    assert ats_fetch.probe_boards(fetcher, candidates) == ({"Palo Alto Networks": ("greenhouse", "paloaltonetworks")}, set())
+
+
+def test_empty_lever_board_is_a_board(boards, fetcher):
+    boards("lever", "acme", body="[]")
+    found, retry = ats_fetch.probe_boards(fetcher, {"Acme": [("greenhouse", "acme"), ("lever", "acme")]})
+    assert found == {"Acme": ("lever", "acme")} and not retry
+
+
+def test_board_with_jobs_beats_an_empty_one(boards, fetcher):
+    boards("lever", "acme", body="[]")
+    boards("ashby", "acme", body=fixture("ashby_board.json"))
+    found, _ = ats_fetch.probe_boards(fetcher, {"Acme": [("lever", "acme"), ("ashby", "acme")]})
+    assert found == {"Acme": ("ashby", "acme")}
+
+
+def test_404s_are_a_definitive_miss(boards, fetcher):
+    boards("lever", "nobody", status=404, body=fixture("lever_not_found.json"))
+    found, retry = ats_fetch.probe_boards(fetcher, {"Nobody": [("greenhouse", "nobody"), ("lever", "nobody")]})
+    assert found == {"Nobody": None} and retry == set()
+
+
+def test_network_errors_are_retried_not_remembered(boards, fetcher):
+    boards("greenhouse", "flaky", status=503, body="upstream timeout")
+    boards("lever", "flaky", body=fixture("lever_board.json"))
+    found, retry = ats_fetch.probe_boards(fetcher, {"Flaky": [("greenhouse", "flaky"), ("lever", "flaky")]})
+    # The Lever board is usable now, but Greenhouse ranks first and might exist: probe again next time
+    assert found == {"Flaky": ("lever", "flaky")} and retry == {"Flaky"}
+
+    found, retry = ats_fetch.probe_boards(fetcher, {"Down": [("greenhouse", "down")]})
+    assert found == {"Down": None} and retry == set()  # plain 404 from the stand-in
+
+
+def test_a_removed_board_is_not_served_from_cache(boards, fetcher, monkeypatch):
+    boards("greenhouse", "gone", body=fixture("greenhouse_board.json"))
+    assert ats_fetch.probe_boards(fetcher, {"Gone": [("greenhouse", "gone")]})[0] == {"Gone": ("greenhouse", "gone")}
+    boards("greenhouse", "gone", status=404, body="")
+    monkeypatch.setattr(ats_fetch, "ENRICH_FRESH_SECONDS", 0)
+    assert ats_fetch.probe_boards(fetcher, {"Gone": [("greenhouse", "gone")]}) == ({"Gone": None}, set())
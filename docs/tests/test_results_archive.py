@@ -0,0 +1,38 @@
+"""results_archive appends: one row per posting per tenant and day."""
+import glob
+import os
+from datetime import datetime
+
+import pyarrow.parquet as pq
+
+import results_archive
+
+
+def record(url_key, query="q"):
+    return {"archived_at": datetime(2026, 10, 19, 9), "mode": "Jobs", "query": query, "url_key": url_key,
+            "url": f"https://jobs.lever.co/acme/{url_key}"}
+
+
+def archived(root):
+    return sorted(key for path in glob.glob(os.path.join(root, "**", "*.parquet"), recursive=True)
+                  for key in pq.read_table(path, columns=["url_key"]).column("url_key").to_pylist())
+
+
+def test_repeat_search_is_not_archived_twice(tmp_path):
+    root = str(tmp_path)
+    day = datetime(2026, 10, 19, 9)
+    assert results_archive.append([record("a"), record("b"), record("a")], "default", root=root, now=day)
+    assert results_archive.append([record("a", "q2"), record("b", "q2")], "default", root=root, now=day) is None
+    results_archive.append([record("b"), record("c")], "default", root=root, now=day)
+    assert archived(root) == ["a", "b", "c"]
+
+
+def test_keys_are_read_back_from_disk_and_scoped_per_tenant_and_day(tmp_path):
+    root = str(tmp_path)
+    day = datetime(2026, 10, 19, 9)
+    results_archive.append([record("a")], "default", root=root, now=day)
+    results_archive.partition_keys.clear()  # as after a restart
+    assert results_archive.append([record("a")], "default", root=root, now=day) is None
+    assert results_archive.append([record("a")], "someone@example.com", root=root, now=day)
+    assert results_archive.append([record("a")], "default", root=root, now=datetime(2026, 10, 20, 9))
+    assert archived(root) == ["a", "a", "a"]
@@ -0,0 +1,96 @@
+"""Generate a synthetic jobs backup export with the source columns test.py reads.
+
+Rows look like a real tracker export: a few dozen tenants, repeated companies and titles,
+notes with commas/quotes/newlines, and created_at/updated_at in the mixed shapes Postgres
+exports produce (+00, +00:00, +05:30, -07:00, with and without microseconds) plus nulls.
+Rows are generated with numpy in chunks and appended to the CSV, so 10M rows never sit in
+memory at once.
+
+    python generate_jobs_export.py --rows 1000000 --out "jobs_rows_1m.csv"
+"""
+import argparse
+import uuid
+
+import numpy as np
+import pandas as pd
+
+CHUNK_ROWS = 500_000
+TENANTS = 40
+COMPANIES = ["CrowdStrike", "Palo Alto Networks", "Microsoft", "Google", "Amazon", "Okta", "Zscaler",
+             "Fortinet", "Cloudflare", "Datadog", "Snowflake", "Stripe", "Rapid7", "SentinelOne", "Tenable"]
+TITLES = ["Security Analyst", "SOC Analyst II", "Security Engineer", "Cloud Security Engineer",
+          "Detection Engineer", "GRC Analyst", "Penetration Tester", "Threat Intelligence Analyst"]
+LOCATIONS = ["Remote", "Austin, TX", "New York, NY", "San Francisco, CA", "Seattle, WA", "Remote - US", "Toronto, ON"]
+SLUGS = ["crowdstrike", "paloaltonetworks", "microsoft", "google", "amazon", "okta", "zscaler"]
+STATUSES = ["saved", "applied", "interviewing", "offer", "rejected"]
+PRIORITIES = ["low", "medium", "high"]
+NOTES = [
+    "Referred by a former teammate",
+    "Recruiter reached out, follow up next week",
+    'Asked about "on-call" expectations, rotation is 1 week in 6',
+    "Requires Splunk, SIEM tuning, and incident response experience",
+    "Phone screen done.\nTechnical round scheduled",
+]
+# Offsets as Postgres/Supabase exports write them
+TZ_SUFFIXES = ["+00", "+00:00", "+05:30", "-07:00", "-04", ""]
+START = pd.Timestamp("2023-01-01").value // 10**9
+SPAN_SECONDS = 3 * 365 * 24 * 3600
+
+
+def with_nulls(rng, values, rate):
+    """Blank out a fraction of a column."""
+    values = pd.Series(values, dtype=object)
+    values[rng.random(len(values)) < rate] = None
+    return values
+
+
+def timestamps(rng, seconds):
+    """Timestamp strings with random microseconds and timezone suffix shapes."""
+    base = pd.Series(pd.to_datetime(seconds, unit="s").strftime("%Y-%m-%d %H:%M:%S"))
+    micros = pd.Series(rng.integers(0, 1_000_000, len(seconds))).astype(str).str.zfill(6)
+    fraction = ("." + micros).where(rng.random(len(seconds)) < 0.7, "")
+    suffix = pd.Series(np.array(TZ_SUFFIXES, dtype=object)[rng.integers(0, len(TZ_SUFFIXES), len(seconds))])
+    return base + fraction + suffix
+
+
+def generate_chunk(rng, start, rows, tenants):
+    """One chunk of synthetic export rows, ids starting at `start`."""
+    pick = lambda pool: np.array(pool, dtype=object)[rng.integers(0, len(pool), rows)]
+    created = START + rng.integers(0, SPAN_SECONDS, rows)
+    updated = created + rng.integers(0, 90 * 24 * 3600, rows)
+    applied = pd.Series(pd.to_datetime(created + rng.integers(0, 14 * 24 * 3600, rows), unit="s").strftime("%Y-%m-%d"))
+    return pd.DataFrame({
+        "id": [f"00000000-0000-4000-8000-{i:012x}" for i in range(start, start + rows)],
+        "user_id": pick(tenants),
+        "company": pick(COMPANIES),
+        "title": pick(TITLES),
+        "location": with_nulls(rng, pick(LOCATIONS), 0.1),
+        "job_url": "https://boards.greenhouse.io/" + pd.Series(pick(SLUGS)) + "/jobs/"
+                   + pd.Series(rng.integers(1_000_000, 9_999_999, rows)).astype(str),
+        "notes": with_nulls(rng, pick(NOTES), 0.25),
+        "status": pick(STATUSES),
+        "priority": pick(PRIORITIES),
+        "applied_date": with_nulls(rng, applied, 0.3),
+        "created_at": with_nulls(rng, timestamps(rng, created), 0.02),
+        "updated_at": with_nulls(rng, timestamps(rng, updated), 0.02),
+    })
+
+
+def generate_export(path, rows, seed=0, chunk_rows=CHUNK_ROWS):
+    """Write `rows` synthetic export rows to `path` in chunks."""
+    rng = np.random.default_rng(seed)
+    tenants = [str(uuid.UUID(int=int(rng.integers(0, 2**63)) << 64 | n, version=4)) for n in range(TENANTS)]
+    for start in range(0, rows, chunk_rows):
+        chunk = generate_chunk(rng, start, min(chunk_rows, rows - start), tenants)
+        chunk.to_csv(path, mode="w" if start == 0 else "a", header=start == 0, index=False)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--out", default="jobs_rows_synthetic.csv")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    generate_export(args.out, args.rows, seed=args.seed)
+    print(f"Wrote {args.rows:,} rows to '{args.out}'")
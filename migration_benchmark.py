@@ -0,0 +1,181 @@
+"""Throughput benchmark for the test.py jobs migration at growing export sizes.
+
+For each size a synthetic export is generated once (generate_jobs_export.py, cached in
+--data-dir), along with a tracker export holding a share of the same jobs (some edited
+since), so the run exercises the real path: migrate_file streaming the export in chunks and
+hash-joining it against a TrackerIndex built from --existing. Each input format runs in a
+fresh subprocess, so every measurement gets its own peak RSS. Rows/sec and peak RSS are
+appended to a JSON Lines history and compared with the previous run, so we can see where the
+migration stops scaling before pointing it at every tenant's data.
+
+    python migration_benchmark.py --rows 10000,1000000 --formats csv,parquet
+    python migration_benchmark.py --rows 10000000 --formats csv   # the big one, opt-in
+"""
+import argparse
+import importlib.util
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from generate_jobs_export import generate_export
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_HISTORY = "migration_benchmark_history.jsonl"
+REGRESSION_THRESHOLD = 0.20  # flag runs whose rows/sec drop more than 20%
+FORMATS = ["csv", "parquet"]  # export formats migrate_file reads
+TRACKER_SHARE = 0.5   # share of the export's jobs already in the tracker
+TRACKER_EDITED = 0.2  # share of those whose export copy is newer and changed (updates)
+
+
+def load_migration():
+    """Import test.py by path (a plain `import test` would find the stdlib package)."""
+    spec = importlib.util.spec_from_file_location("jobs_migration", os.path.join(ROOT, "test.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def peak_rss_mb():
+    """This process's peak resident set size (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def run_worker(source, existing):
+    """Child process: time one migrate_file run against the tracker and print the numbers as JSON."""
+    migration = load_migration()
+    with tempfile.TemporaryDirectory() as workdir:
+        outputs = [os.path.join(workdir, name) for name in
+                   (migration.OUTPUT_FILE, migration.UPDATE_FILE, migration.SKIPPED_FILE)]
+        started = time.perf_counter()
+        counts = migration.migrate_file(source, existing, outputs)
+        total_s = time.perf_counter() - started
+        output_mb = sum(os.path.getsize(path) for path in outputs if os.path.exists(path)) / 1024 / 1024
+
+    print(json.dumps({"rows": sum(counts.values()), **counts, "output_mb": round(output_mb, 1),
+                      "peak_rss_mb": round(peak_rss_mb(), 1), "total_s": round(total_s, 3)}))
+
+
+def measure(source, existing):
+    """Run one migration in a fresh interpreter and return its numbers."""
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", source, existing],
+                            capture_output=True, text=True, cwd=ROOT)
+    if result.returncode != 0:
+        raise RuntimeError(f"Migration of {source} failed:\n{result.stderr}")
+    row = json.loads(result.stdout.strip().splitlines()[-1])
+    row["rows_per_s"] = round(row["rows"] / row["total_s"]) if row["total_s"] else None
+    return row
+
+
+def export_path(data_dir, rows, fmt):
+    """Generate (once) and return the synthetic export for a size, in `fmt`."""
+    path = os.path.join(data_dir, f"jobs_rows_{rows}.csv")
+    if not os.path.exists(path):
+        print(f"Generating {rows:,}-row export...", flush=True)
+        generate_export(path, rows)
+    if fmt == "csv":
+        return path
+    converted = os.path.join(data_dir, f"jobs_rows_{rows}.parquet")
+    if not os.path.exists(converted):
+        writer = None
+        for chunk in pd.read_csv(path, chunksize=500_000, dtype=str):
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            writer = writer or pq.ParquetWriter(converted, table.schema)
+            writer.write_table(table)
+        writer.close()
+    return converted
+
+
+def tracker_path(data_dir, rows, migration, seed=0):
+    """Generate (once) a tracker export holding TRACKER_SHARE of the export's jobs.
+
+    Tracker rows get their own ids. TRACKER_EDITED of them have an older updatedAt and a
+    different status than the export, so the migration has updates as well as skips.
+    """
+    path = os.path.join(data_dir, f"tracker_rows_{rows}.parquet")
+    if os.path.exists(path):
+        return path
+    rng = np.random.default_rng(seed)
+    writer = None
+    for chunk in migration.read_chunks(export_path(data_dir, rows, "csv")):
+        tracker = migration.migrate(chunk)[migration.INDEX_COLS]
+        tracker = tracker[rng.random(len(tracker)) < TRACKER_SHARE].copy()
+        tracker["id"] = [f"tracker-{n}" for n in rng.integers(0, 2**62, len(tracker))]
+        edited = rng.random(len(tracker)) < TRACKER_EDITED
+        tracker.loc[edited, "status"] = "saved"
+        tracker.loc[edited, "updatedAt"] = "2020-01-01 00:00:00"
+        table = pa.Table.from_pandas(tracker.fillna("").astype(str), preserve_index=False)
+        writer = writer or pq.ParquetWriter(path, table.schema)
+        writer.write_table(table)
+    writer.close()
+    return path
+
+
+def previous_results(history_path):
+    """Latest recorded row per (rows, format, tracker rows)."""
+    latest = {}
+    if os.path.exists(history_path):
+        with open(history_path) as f:
+            for line in f:
+                row = json.loads(line)
+                latest[(row["rows"], row["format"], row.get("existing_rows"))] = row
+    return latest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", default="10000,100000,1000000", help="comma-separated export sizes")
+    parser.add_argument("--formats", default="csv,parquet", help=f"export formats ({', '.join(FORMATS)})")
+    parser.add_argument("--data-dir", default="bench_data", help="where generated exports are cached")
+    parser.add_argument("--history", default=DEFAULT_HISTORY, help="JSON Lines file the results are appended to")
+    args = parser.parse_args()
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    history_path = os.path.abspath(args.history)
+    previous = previous_results(history_path)
+    run_at = datetime.now().isoformat(timespec="seconds")
+    migration = load_migration()
+
+    rows, regressions = [], []
+    print(f"{'rows':>10} {'format':<8} {'insert':>9} {'update':>9} {'skip':>9} {'total s':>8} {'rows/s':>10} "
+          f"{'peak MB':>8}  vs previous")
+    for size in [int(r) for r in args.rows.split(",") if r.strip()]:
+        existing = os.path.abspath(tracker_path(args.data_dir, size, migration))
+        existing_rows = pq.ParquetFile(existing).metadata.num_rows
+        for fmt in [f.strip() for f in args.formats.split(",") if f.strip()]:
+            source = os.path.abspath(export_path(args.data_dir, size, fmt))
+            row = {"run_at": run_at, "format": fmt, "existing_rows": existing_rows, **measure(source, existing)}
+            rows.append(row)
+            before = previous.get((row["rows"], fmt, existing_rows))
+            change = ""
+            if before and before.get("rows_per_s") and row["rows_per_s"]:
+                ratio = row["rows_per_s"] / before["rows_per_s"] - 1
+                change = f"{ratio:+.0%}"
+                if ratio < -REGRESSION_THRESHOLD:
+                    change += "  <-- regression"
+                    regressions.append(row)
+            print(f"{row['rows']:>10,} {fmt:<8} {row['insert']:>9,} {row['update']:>9,} {row['skip']:>9,} "
+                  f"{row['total_s']:>8} {row['rows_per_s']:>10,} {row['peak_rss_mb']:>8}  {change}", flush=True)
+
+    with open(history_path, "a") as f:
+        for row in rows:
+            f.write(json.dumps(row) + "\n")
+    print(f"\nAppended {len(rows)} rows to {history_path}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--worker":
+        run_worker(sys.argv[2], sys.argv[3])
+    else:
+        sys.exit(main())
@@ -1,7 +1,14 @@
+import argparse
+
+import numpy as np
 import pandas as pd
 
-# 1. Load your backup file
-df = pd.read_csv('jobs_rows (1).csv')
+SOURCE_FILE = 'jobs_rows (1).csv'
+OUTPUT_FILE = 'final_jobs_for_upload.csv'
+UPDATE_FILE = 'final_jobs_for_update.csv'
+SKIPPED_FILE = 'final_jobs_skipped.csv'
+TRACKER_TABLE = 'jt_applications'  # JobApplication in apps/server/prisma/schema.prisma
+CHUNK_ROWS = 200_000
 
 # 2. Define the target database columns
 target_cols = [
@@ -10,32 +17,235 @@ target_cols = [
     'status', 'priority', 'rating', 'appliedDate', 'notes', 'source',
     'createdAt', 'updatedAt', 'salaryPeriod', 'sourceUrl'
 ]
+# Fields an import would write; if they all match the tracker row, there is nothing to update
+CONTENT_COLS = ['company', 'jobTitle', 'location', 'jobUrl', 'jobDescription', 'status', 'priority', 'appliedDate']
+INDEX_COLS = ['id', 'userId', 'sourceUrl', 'updatedAt'] + CONTENT_COLS
+# Tracking parameters that don't change which posting a URL points at
+TRACKING_PARAMS = r'(?:utm_\w+|trk\w*|ref|refid|src|source|gh_src|lever-source\S*?)'
+NEW_ROW = -1     # no match: insert
+SEEN_ROW = -2    # matched a row inserted earlier in this run: duplicate in the export
+
+def migrate(df):
+    """Map a jobs backup export onto the target database columns."""
+    # 3. Create the new dataframe
+    new_df = pd.DataFrame(columns=target_cols)
+
+    # 4. Map the data with your specific correction (Source Notes -> Target JobDescription)
+    new_df['id'] = df['id']
+    new_df['userId'] = df['user_id']
+    new_df['company'] = df['company']
+    new_df['jobTitle'] = df['title']
+    new_df['location'] = df['location']
+    new_df['jobUrl'] = df['job_url']
+    new_df['jobDescription'] = df['notes']  # <--- YOUR CORRECTION APPLIED HERE
+    new_df['status'] = df['status']
+    new_df['priority'] = df['priority']
+    new_df['notes'] = "" # Leaving this blank as the data moved to Description
+
+    # 5. Add default values and format dates
+    new_df['salaryCurrency'] = 'USD'
+    new_df['salaryPeriod'] = 'year'
+    new_df['source'] = 'CSV Import'
+
+    # Format Dates for the database
+    new_df['appliedDate'] = df['applied_date'].apply(lambda x: f"{x} 00:00:00" if pd.notna(x) else "")
+    new_df['createdAt'] = df['created_at'].str.split('+').str[0].str[:23]
+    new_df['updatedAt'] = df['updated_at'].str.split('+').str[0].str[:23]
+    return new_df
+
+def text(values):
+    """Column as Arrow-backed strings (vectorized str ops), nulls blank."""
+    return values.astype('string[pyarrow]').fillna('')
+
+def normalize_url(values):
+    """Lowercase, no scheme/www, fragment, tracking parameters or trailing slash."""
+    urls = text(values).str.strip().str.lower()
+    urls = urls.str.replace(r'^https?://(?:www\.)?', '', regex=True).str.replace(r'#.*$', '', regex=True)
+    urls = urls.str.replace(rf'([?&]){TRACKING_PARAMS}=[^&]*(?:&|$)', r'\1', regex=True)
+    return urls.str.rstrip('?&/')
+
+def normalize_name(values):
+    return text(values).str.lower().str.replace(r'[\W_]+', ' ', regex=True).str.strip()
+
+def hash_keys(values):
+    """64-bit hash per string, the join key of the index."""
+    return pd.util.hash_array(values.to_numpy(dtype=object))
+
+def job_keys(df, url_col='jobUrl'):
+    """(url keys, has url, company+title keys, has company and title) for target-shaped rows."""
+    user = text(df['userId']) + '\x1f'
+    url = normalize_url(df[url_col])
+    company, title = normalize_name(df['company']), normalize_name(df['jobTitle'])
+    return (hash_keys(user + url), (url != '').to_numpy(),
+            hash_keys(user + company + '\x1f' + title), ((company != '') & (title != '')).to_numpy())
+
+def url_hosts(values):
+    """Hash of each URL's host, 0 where there is no URL."""
+    hosts = normalize_url(values).str.replace(r'/.*$', '', regex=True)
+    return np.where(hosts != '', hash_keys(hosts), 0).astype(np.uint64)
+
+def content_hash(df):
+    return pd.util.hash_pandas_object(pd.DataFrame({c: text(df[c]) for c in CONTENT_COLS}), index=False).to_numpy()
+
+def timestamp_ns(values):
+    """Naive timestamps as int64 nanoseconds (NaT, the minimum, for blanks or junk)."""
+    stamps = text(values).str.replace('T', ' ').str[:19]
+    return pd.to_datetime(stamps, format='%Y-%m-%d %H:%M:%S', errors='coerce').to_numpy('datetime64[ns]').view('int64')
+
+class KeyTable:
+    """Sorted 64-bit keys -> row numbers; lookups are one vectorized binary search per chunk."""
+
+    def __init__(self, keys=None, rows=None):
+        self.keys = np.empty(0, np.uint64) if keys is None else keys
+        self.rows = np.empty(0, np.int64) if rows is None else rows
+
+    def get(self, keys):
+        if not len(self.keys):
+            return np.full(len(keys), NEW_ROW, np.int64)
+        pos = np.searchsorted(self.keys, keys).clip(max=len(self.keys) - 1)
+        return np.where(self.keys[pos] == keys, self.rows[pos], NEW_ROW)
+
+    def add(self, keys, rows):
+        """Merge in new keys; on a collision the key already in the table wins."""
+        keys, rows = np.concatenate([self.keys, keys]), np.concatenate([self.rows, rows])
+        order = np.argsort(keys, kind='stable')  # timsort: near-linear on sorted table + small run
+        keys, rows = keys[order], rows[order]
+        first = np.concatenate([[True], keys[1:] != keys[:-1]])
+        self.keys, self.rows = keys[first], rows[first]
+
+class TrackerIndex:
+    """Compact index of the jobs already in the tracker: hashes, ids and updatedAt, no row payloads."""
+
+    def __init__(self):
+        self.by_url, self.by_name = KeyTable(), KeyTable()
+        self.ids = np.empty(0, object)
+        self.content = np.empty(0, np.uint64)
+        self.updated = np.empty(0, np.int64)
+        self.hosts = np.empty(0, np.uint64)
+        self.claimed = np.empty(0, bool)
+
+    def add_existing(self, df):
+        """Index a chunk of tracker rows under jobUrl, sourceUrl and company+title."""
+        df = df.reindex(columns=INDEX_COLS)
+        rows = np.arange(len(self.ids), len(self.ids) + len(df))
+        url_keys, has_url, name_keys, has_name = job_keys(df)
+        source_keys, has_source, _, _ = job_keys(df, 'sourceUrl')
+        self.by_url.add(np.concatenate([url_keys[has_url], source_keys[has_source]]),
+                        np.concatenate([rows[has_url], rows[has_source]]))
+        self.by_name.add(name_keys[has_name], rows[has_name])
+        self.ids = np.concatenate([self.ids, text(df['id']).to_numpy(dtype=object)])
+        self.content = np.concatenate([self.content, content_hash(df)])
+        self.updated = np.concatenate([self.updated, timestamp_ns(df['updatedAt'])])
+        self.hosts = np.concatenate([self.hosts, url_hosts(df['jobUrl'])])
+        self.claimed = np.concatenate([self.claimed, np.zeros(len(df), bool)])
+
+    def classify(self, migrated):
+        """Hash-join a migrated chunk against the tracker: (action per row, matched tracker id per row).
+
+        A jobUrl match wins. Company+title only matches when the two URLs can't be told apart
+        by site (one is missing, or e.g. LinkedIn vs the ATS); two different URLs on the same
+        ATS are two postings. Each tracker row is claimed by the first export row that matches
+        it. Matched rows are skipped when nothing would change or the tracker copy is at least
+        as recent, and updated otherwise. URLs inserted earlier in the run are remembered, so
+        repeats inside the export are skipped.
+        """
+        url_keys, has_url, name_keys, has_name = job_keys(migrated)
+        match = np.where(has_url, self.by_url.get(url_keys), NEW_ROW)
+        match[(match >= 0) & ~self.claim(match)] = SEEN_ROW
+
+        by_name = np.where(has_name & (match == NEW_ROW), self.by_name.get(name_keys), NEW_ROW)
+        if (by_name >= 0).any():
+            hosts, tracker_hosts = url_hosts(migrated['jobUrl']), self.hosts[np.maximum(by_name, 0)]
+            by_name[(hosts != 0) & (hosts == tracker_hosts)] = NEW_ROW
+            match = np.where(self.claim(by_name), by_name, match)
+
+        inserted = np.flatnonzero((match == NEW_ROW) & has_url)
+        repeats = np.ones(len(inserted), bool)
+        repeats[np.unique(url_keys[inserted], return_index=True)[1]] = False
+        match[inserted[repeats]] = SEEN_ROW
+
+        existing = match >= 0
+        unchanged, newer = np.zeros(len(match), bool), np.zeros(len(match), bool)
+        tracker_id = np.full(len(match), '', object)
+        if existing.any():
+            at = match[existing]
+            unchanged[existing] = content_hash(migrated[existing]) == self.content[at]
+            newer[existing] = timestamp_ns(migrated['updatedAt'][existing]) > self.updated[at]
+            tracker_id[existing] = self.ids[at]
+        action = np.select([match == NEW_ROW, match == SEEN_ROW, unchanged, ~newer],
+                           ['insert', 'skip: duplicate in export', 'skip: unchanged', 'skip: tracker not older'],
+                           'update')
+
+        inserted = (match == NEW_ROW) & has_url
+        self.by_url.add(url_keys[inserted], np.full(inserted.sum(), SEEN_ROW))
+        return action, tracker_id
+
+    def claim(self, rows):
+        """Claim the tracker rows matched in `rows` (>= 0). Only the first claim of a row succeeds."""
+        claimed = np.zeros(len(rows), bool)
+        candidates = np.flatnonzero(rows >= 0)
+        first = candidates[np.unique(rows[candidates], return_index=True)[1]]
+        first = first[~self.claimed[rows[first]]]
+        self.claimed[rows[first]] = True
+        claimed[first] = True
+        return claimed
+
+def read_chunks(path, columns=None):
+    """Stream a CSV or Parquet export, or a database table via its SQLAlchemy URL, in chunks."""
+    if '://' in path:
+        quoted = ', '.join(f'"{c}"' for c in columns)
+        yield from pd.read_sql(f'SELECT {quoted} FROM {TRACKER_TABLE}', path, chunksize=CHUNK_ROWS)
+    elif path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        parquet = pq.ParquetFile(path)
+        wanted = [c for c in columns if c in parquet.schema_arrow.names] if columns else None
+        for batch in parquet.iter_batches(batch_size=CHUNK_ROWS, columns=wanted):
+            yield batch.to_pandas()
+    else:
+        wanted = (lambda c: c in columns) if columns else None
+        yield from pd.read_csv(path, usecols=wanted, chunksize=CHUNK_ROWS)
+
+def load_tracker_index(path):
+    index = TrackerIndex()
+    for chunk in read_chunks(path, INDEX_COLS):
+        index.add_existing(chunk)
+    return index
+
+def migrate_file(source, existing=None, outputs=(OUTPUT_FILE, UPDATE_FILE, SKIPPED_FILE)):
+    """Migrate `source` chunk by chunk into insert / update / skipped CSVs. Returns row counts.
+
+    With `existing` (a tracker export or database URL), rows already in the tracker are
+    updated in place (they keep the tracker's id) or skipped instead of being inserted again.
+    Memory stays proportional to the tracker index plus 16 bytes per inserted row.
+    """
+    index = load_tracker_index(existing) if existing else TrackerIndex()
+    insert_file, update_file, skipped_file = outputs
+    counts = {'insert': 0, 'update': 0, 'skip': 0}
+    for chunk in read_chunks(source):
+        new_df = migrate(chunk)
+        action, tracker_id = index.classify(new_df)
+
+        update, skip = action == 'update', np.char.startswith(action, 'skip')
+        updates = new_df[update].assign(id=tracker_id[update])
+        skipped = new_df[skip].assign(trackerId=tracker_id[skip], reason=[a[len('skip: '):] for a in action[skip]])
+        for path, rows, key in [(insert_file, new_df[action == 'insert'], 'insert'),
+                                (update_file, updates, 'update'), (skipped_file, skipped, 'skip')]:
+            rows.to_csv(path, mode='a' if counts[key] else 'w', header=not counts[key], index=False)
+            counts[key] += len(rows)
+    return counts
+
+if __name__ == "__main__":
+    # 1. Load your backup file (and, optionally, what is already in the tracker)
+    parser = argparse.ArgumentParser(description='Migrate a jobs backup export into tracker upload files.')
+    parser.add_argument('source', nargs='?', default=SOURCE_FILE)
+    parser.add_argument('--existing', help=f'tracker export (.csv/.parquet) or database URL ({TRACKER_TABLE}) '
+                                           'to dedupe against')
+    args = parser.parse_args()
+
+    counts = migrate_file(args.source, args.existing)
 
-# 3. Create the new dataframe
-new_df = pd.DataFrame(columns=target_cols)
-
-# 4. Map the data with your specific correction (Source Notes -> Target JobDescription)
-new_df['id'] = df['id']
-new_df['userId'] = df['user_id']
-new_df['company'] = df['company']
-new_df['jobTitle'] = df['title']
-new_df['location'] = df['location']
-new_df['jobUrl'] = df['job_url']
-new_df['jobDescription'] = df['notes']  # <--- YOUR CORRECTION APPLIED HERE
-new_df['status'] = df['status']
-new_df['priority'] = df['priority']
-new_df['notes'] = "" # Leaving this blank as the data moved to Description
-
-# 5. Add default values and format dates
-new_df['salaryCurrency'] = 'USD'
-new_df['salaryPeriod'] = 'year'
-new_df['source'] = 'CSV Import'
-
-# Format Dates for the database
-new_df['appliedDate'] = df['applied_date'].apply(lambda x: f"{x} 00:00:00" if pd.notna(x) else "")
-new_df['createdAt'] = df['created_at'].str.split('+').str[0].str[:23]
-new_df['updatedAt'] = df['updated_at'].str.split('+').str[0].str[:23]
-
-# 6. Save the final file
-new_df.to_csv('final_jobs_for_upload.csv', index=False)
-print("Migration complete: 'final_jobs_for_upload.csv' is ready.")
\ No newline at end of file
+    # 6. Save the final files
+    print(f"Migration complete: '{OUTPUT_FILE}' is ready ({counts['insert']:,} new jobs).")
+    if counts['update'] or counts['skip']:
+        print(f"{counts['update']:,} jobs to update in '{UPDATE_FILE}', "
+              f"{counts['skip']:,} skipped (already in the tracker, or repeated) in '{SKIPPED_FILE}'.")